@@ -1,9 +1,34 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
 import os
 import sys
 import datetime
 from dotenv import load_dotenv
+import numpy as np
+
+from ascendant_grid import ASCENDANT_MAX_ERROR, get_ascendant_grid
+from aspects import TRANSIT_ORB_FACTOR, AspectSet, list_aspects
+from astrocartography import LINE_ANGLES, LINE_BODIES, angle_lines
+from celestial_events import EVENT_TYPES, get_event_index, iso_to_jd, jd_to_iso
+from chart_cache import ChartCache
+from compatibility_index import get_compatibility_index
+from electional import parse_constraints, search_windows
+from ephemeris_backends import calculation_method, get_backend, julian_day
+from ephemeris_stream import (EphemerisRequestError, iter_positions, ndjson, parse_bodies,
+                              parse_moment, parse_step, step_count)
+from gazetteer import get_gazetteer
+from lunar_tables import ECLIPSE_KINDS, date_to_jd, get_lunar_tables
+from moon_timetable import get_moon_timetable
+from timezone_resolver import zone_at
+from natal_chart import (PLANETS, BirthDataError, birth_julian_day, cached_natal_chart, calculate_angles,
+                         calculate_batch, describe_timezone, parse_birth_data, parse_extended, sign_of)
+from progressions import month_starts, position_source, progressed_chart, progression_timeline
+from rectification import clock_minutes, rectify
+from relationship_charts import cached_relationship_chart
+from returns import return_charts, search_source
+from sky_snapshot import get_sky_service
+from synastry import SYNASTRY_ORB_FACTOR, chart_longitudes, cross_aspects, synastry_scores
+from tiles import TILE_SIZE, get_tile_cache
 
 # Load environment variables
 load_dotenv()
@@ -26,6 +51,69 @@ app.config['STRIPE_SECRET_KEY'] = os.environ.get('STRIPE_SECRET_KEY')
 # AI Configuration (for Phase 3)
 app.config['OPENAI_API_KEY'] = os.environ.get('OPENAI_API_KEY')
 
+# Natal batch configuration - her gunicorn worker kendi process pool'unu kullanir
+app.config['NATAL_BATCH_MAX_RECORDS'] = int(os.environ.get('NATAL_BATCH_MAX_RECORDS', 100))
+app.config['NATAL_BATCH_WORKERS'] = int(os.environ.get('NATAL_BATCH_WORKERS', os.cpu_count() or 1))
+
+# Ephemeris backend for chart calculations: flatlib, swisseph or chebyshev
+app.config['EPHEMERIS_BACKEND'] = os.environ.get('EPHEMERIS_BACKEND', 'swisseph')
+
+# Natal chart cache - ayni dogum verisi icin haritayi tekrar hesaplama
+app.config['NATAL_CACHE_MAX_ENTRIES'] = int(os.environ.get('NATAL_CACHE_MAX_ENTRIES', 4096))
+app.config['NATAL_CACHE_PRECISION'] = int(os.environ.get('NATAL_CACHE_PRECISION', 4))
+
+natal_cache = ChartCache(max_entries=app.config['NATAL_CACHE_MAX_ENTRIES'],
+                         precision=app.config['NATAL_CACHE_PRECISION'])
+
+# Planet positions keyed by instant - sadece sehir degisirse yalnizca yukselen hesaplanir
+app.config['PLANET_CACHE_MAX_ENTRIES'] = int(os.environ.get('PLANET_CACHE_MAX_ENTRIES', 4096))
+
+planet_cache = ChartCache(max_entries=app.config['PLANET_CACHE_MAX_ENTRIES'])
+
+# Composite/Davison cache - iki dogum haritasinin parmak izi ciftine gore
+app.config['RELATIONSHIP_CACHE_MAX_ENTRIES'] = int(os.environ.get('RELATIONSHIP_CACHE_MAX_ENTRIES', 1024))
+
+relationship_cache = ChartCache(max_entries=app.config['RELATIONSHIP_CACHE_MAX_ENTRIES'],
+                                precision=app.config['NATAL_CACHE_PRECISION'])
+
+# Synastry ranking - tek istekte en fazla aday ve aday basina gosterilen aci
+app.config['SYNASTRY_MAX_CANDIDATES'] = int(os.environ.get('SYNASTRY_MAX_CANDIDATES', 100))
+app.config['SYNASTRY_TOP_ASPECTS'] = int(os.environ.get('SYNASTRY_TOP_ASPECTS', 3))
+
+# Compatibility ranking - istek basina en fazla profil ve en fazla k
+app.config['COMPATIBILITY_MAX_PROFILES'] = int(os.environ.get('COMPATIBILITY_MAX_PROFILES', 1000))
+app.config['COMPATIBILITY_MAX_K'] = int(os.environ.get('COMPATIBILITY_MAX_K', 100))
+
+# Progression timeline - en fazla yil
+app.config['PROGRESSIONS_MAX_YEARS'] = int(os.environ.get('PROGRESSIONS_MAX_YEARS', 100))
+
+# Rectification - istek basina en fazla olay ve donen en iyi saat sayisi
+app.config['RECTIFICATION_MAX_EVENTS'] = int(os.environ.get('RECTIFICATION_MAX_EVENTS', 50))
+app.config['RECTIFICATION_MAX_TOP'] = int(os.environ.get('RECTIFICATION_MAX_TOP', 20))
+
+# Ephemeris streaming - tek istekte en fazla adim sayisi
+app.config['EPHEMERIS_MAX_STEPS'] = int(os.environ.get('EPHEMERIS_MAX_STEPS', 1000000))
+
+# Celestial event queries - tek yanitta en fazla olay
+app.config['EVENTS_MAX_RESULTS'] = int(os.environ.get('EVENTS_MAX_RESULTS', 5000))
+
+# Moon phase queries - tek istekte en fazla gun
+app.config['LUNAR_PHASES_MAX_DAYS'] = int(os.environ.get('LUNAR_PHASES_MAX_DAYS', 3660))
+
+# Moon timetable queries - tek istekte en fazla gun
+app.config['MOON_TIMETABLE_MAX_DAYS'] = int(os.environ.get('MOON_TIMETABLE_MAX_DAYS', 366))
+
+# Electional search - aranan en fazla gun ve donen en fazla pencere
+app.config['ELECTIONAL_MAX_DAYS'] = int(os.environ.get('ELECTIONAL_MAX_DAYS', 366))
+app.config['ELECTIONAL_MAX_RESULTS'] = int(os.environ.get('ELECTIONAL_MAX_RESULTS', 100))
+
+# Relocation heatmap tiles - en yuksek zoom ve tarayici/CDN onbellek suresi (saniye)
+app.config['TILES_MAX_ZOOM'] = int(os.environ.get('TILES_MAX_ZOOM', 12))
+app.config['TILES_MAX_AGE'] = int(os.environ.get('TILES_MAX_AGE', 31536000))
+
+# Place autocomplete - tek istekte donen en fazla sonuc
+app.config['PLACES_SEARCH_MAX_LIMIT'] = int(os.environ.get('PLACES_SEARCH_MAX_LIMIT', 20))
+
 # CORS Configuration - Production ready
 cors_origins = os.environ.get('CORS_ORIGINS', '*').split(',')
 CORS(app, 
@@ -100,6 +188,18 @@ def environment_diagnostics():
         "timestamp": datetime.datetime.now().isoformat()
     }), 200
 
+# Diagnostics endpoint for the natal chart cache
+@app.route('/diagnostics/cache', methods=['GET'])
+def cache_diagnostics():
+    return jsonify({
+        "natal_cache": natal_cache.stats(),
+        "planet_cache": planet_cache.stats(),
+        "relationship_cache": relationship_cache.stats(),
+        "sky_snapshot": get_sky_service(app.config['EPHEMERIS_BACKEND']).stats(),
+        "tile_cache": get_tile_cache().stats(),
+        "timestamp": datetime.datetime.now().isoformat()
+    }), 200
+
 # Root endpoint
 @app.route('/', methods=['GET'])
 def root():
@@ -109,11 +209,34 @@ def root():
         "status": "healthy",
         "python_version": sys.version.split()[0],
         "build_timestamp": datetime.datetime.now().isoformat(),
-        "calculation_method": "flatlib Swiss Ephemeris",
+        "calculation_method": calculation_method(app.config['EPHEMERIS_BACKEND']),
         "endpoints": {
             "health": "/health",
             "test": "/test",
             "natal_chart": "/natal",
+            "natal_batch": "/natal/batch",
+            "natal_locations": "/natal/locations",
+            "natal_preview": "/natal/preview",
+            "places_search": "/places/search",
+            "places_reverse": "/places/reverse",
+            "sky_now": "/sky/now",
+            "horary": "/horary",
+            "transits": "/transits",
+            "ephemeris": "/ephemeris",
+            "events": "/events",
+            "moon_phases": "/moon/phases",
+            "eclipses": "/eclipses",
+            "moon_timetable": "/moon/timetable",
+            "electional": "/electional",
+            "synastry": "/synastry",
+            "composite": "/composite",
+            "davison": "/davison",
+            "returns": "/returns",
+            "progressions": "/progressions",
+            "rectification": "/rectification",
+            "astrocartography": "/astrocartography",
+            "tiles": "/tiles/<chart>/<z>/<x>/<y>",
+            "compatibility_rank": "/compatibility/rank",
             "status": "/status"
         }
     })
@@ -126,7 +249,7 @@ def health():
         "version": "2.1.3-real-calculations",
         "service": "AstroYorumAI API",
         "python_version": sys.version.split()[0],
-        "calculation_method": "flatlib Swiss Ephemeris"
+        "calculation_method": calculation_method(app.config['EPHEMERIS_BACKEND'])
     })
 
 # Test endpoint
@@ -149,7 +272,7 @@ def status():
         "flatlib_available": True,
         "status": "PRODUCTION_READY_WITH_REAL_CALCULATIONS",
         "api_endpoints": 4,
-        "calculation_method": "flatlib Swiss Ephemeris"
+        "calculation_method": calculation_method(app.config['EPHEMERIS_BACKEND'])
     })
 
 # Real Natal chart endpoint with flatlib calculations
@@ -158,82 +281,1078 @@ def status():
 def natal():
     try:
         data = request.json
+
+        try:
+            birth = parse_birth_data(data)
+            extended = parse_extended(data.get('extended'))
+        except BirthDataError as e:
+            return jsonify({"error": str(e)}), 400
+
+        chart, served_from_cache = cached_natal_chart(birth, natal_cache, app.config['EPHEMERIS_BACKEND'],
+                                                      planet_cache, extended)
+
+        response = {
+            "planets": chart["planets"],
+            "ascendant": chart["ascendant"],
+            "ascendant_degree": chart["ascendant_degree"],
+            "input_data": birth,
+            "message": "Real astrological calculation using flatlib",
+            "version": "2.1.3-real-calculations",
+            "calculation_method": calculation_method(app.config['EPHEMERIS_BACKEND']),
+            "timezone": describe_timezone(birth),
+            "ephemeris_backend": app.config['EPHEMERIS_BACKEND'],
+            "served_from_cache": served_from_cache
+        }
+        # Uranus..Chiron, MC, ev cuspleri - sadece istenirse
+        if extended:
+            response["extended"] = chart["extended"]
+        return jsonify(response)
         
-        # Flutter'dan gelen veri formatını destekle  
-        # Flutter: date, time, latitude, longitude gönderir
-        # Eski format: birth_date, birth_time, birth_location için backward compatibility
-        
-        # Required fields - multiple formats supported
-        date_str = data.get('date') or data.get('birth_date')
-        time_str = data.get('time') or data.get('birth_time')
+    except Exception as e:
+        return jsonify({
+            "error": str(e),
+            "version": "2.1.3-real-calculations",
+            "calculation_method": calculation_method(app.config['EPHEMERIS_BACKEND'])
+        }), 500
+
+# Batch natal chart endpoint - profile sync icin tek istekte birden fazla harita
+@app.route('/natal/batch', methods=['POST'])
+def natal_batch():
+    """Calculate natal charts for a list of birth records in input order"""
+    try:
+        data = request.json
+        records = data.get('records') if isinstance(data, dict) else data
+
+        if not isinstance(records, list) or not records:
+            return jsonify({"error": "A non-empty 'records' list is required"}), 400
+
+        max_records = app.config['NATAL_BATCH_MAX_RECORDS']
+        if len(records) > max_records:
+            return jsonify({"error": f"At most {max_records} records are allowed per batch"}), 400
+
+        results = calculate_batch(records, max_workers=app.config['NATAL_BATCH_WORKERS'],
+                                  cache=natal_cache, backend=app.config['EPHEMERIS_BACKEND'],
+                                  planet_cache=planet_cache)
+        results = [dict(result, index=index) for index, result in enumerate(results)]
+
+        return jsonify({
+            "results": results,
+            "count": len(results),
+            "errors": sum(1 for r in results if "error" in r),
+            "version": "2.1.3-real-calculations",
+            "calculation_method": calculation_method(app.config['EPHEMERIS_BACKEND']),
+            "ephemeris_backend": app.config['EPHEMERIS_BACKEND']
+        })
+
+    except Exception as e:
+        health_status["errors_count"] += 1
+        return jsonify({
+            "error": str(e),
+            "version": "2.1.3-real-calculations",
+            "calculation_method": calculation_method(app.config['EPHEMERIS_BACKEND'])
+        }), 500
+
+# Same birth time, several candidate cities - gezegenler bir kez, yukselen her sehir icin
+@app.route('/natal/locations', methods=['POST'])
+def natal_locations():
+    """Calculate one birth instant for several candidate locations"""
+    try:
+        data = request.json
+        if not isinstance(data, dict):
+            return jsonify({"error": "Birth data must be a JSON object"}), 400
+
+        locations = data.get('locations')
+        if not isinstance(locations, list) or not locations:
+            return jsonify({"error": "A non-empty 'locations' list is required"}), 400
+
+        max_records = app.config['NATAL_BATCH_MAX_RECORDS']
+        if len(locations) > max_records:
+            return jsonify({"error": f"At most {max_records} locations are allowed per request"}), 400
+
+        base = {k: v for k, v in data.items() if k != 'locations'}
+        results = []
+        for index, location in enumerate(locations):
+            try:
+                if not isinstance(location, dict):
+                    raise BirthDataError("Location must be a JSON object")
+                birth = parse_birth_data(dict(base, **location))
+                chart, served_from_cache = cached_natal_chart(
+                    birth, natal_cache, app.config['EPHEMERIS_BACKEND'], planet_cache)
+            except BirthDataError as e:
+                results.append({"index": index, "error": str(e)})
+                continue
+            results.append(dict(chart, index=index, input_data=birth,
+                                served_from_cache=served_from_cache))
+
+        return jsonify({
+            "results": results,
+            "count": len(results),
+            "errors": sum(1 for r in results if "error" in r),
+            "version": "2.1.3-real-calculations",
+            "calculation_method": calculation_method(app.config['EPHEMERIS_BACKEND']),
+            "ephemeris_backend": app.config['EPHEMERIS_BACKEND']
+        })
+
+    except Exception as e:
+        health_status["errors_count"] += 1
+        return jsonify({
+            "error": str(e),
+            "version": "2.1.3-real-calculations",
+            "calculation_method": calculation_method(app.config['EPHEMERIS_BACKEND'])
+        }), 500
+
+# Live rising sign preview - dogum formu her tusta sorar, ephemeris cagrisi yok
+@app.route('/natal/preview', methods=['POST'])
+def natal_preview():
+    """Approximate ascendant from the precomputed grid, birth data as for /natal"""
+    try:
+        try:
+            birth = parse_birth_data(request.json)
+        except BirthDataError as e:
+            return jsonify({"error": str(e)}), 400
+
+        ascendant, interpolated = get_ascendant_grid().preview(
+            birth_julian_day(birth), birth['latitude'], birth['longitude'])
+
+        return jsonify({
+            "ascendant": sign_of(ascendant),
+            "ascendant_degree": round(ascendant, 2),
+            "interpolated": interpolated,
+            "max_error_degrees": ASCENDANT_MAX_ERROR,
+            "timezone": describe_timezone(birth),
+            "version": "2.1.3-real-calculations"
+        })
+
+    except Exception as e:
+        health_status["errors_count"] += 1
+        return jsonify({
+            "error": str(e),
+            "version": "2.1.3-real-calculations",
+            "calculation_method": calculation_method(app.config['EPHEMERIS_BACKEND'])
+        }), 500
+
+# Birth place autocomplete - Nominatim yerine sunucudaki offline gazetteer
+@app.route('/places/search', methods=['GET'])
+def places_search():
+    """Prefix search over the bundled cities, diacritics and case insensitive"""
+    try:
+        query = (request.args.get('q') or '').strip()
+        if not query:
+            return jsonify({"error": "Query parameter 'q' is required"}), 400
+
+        try:
+            limit = int(request.args.get('limit', 10))
+        except ValueError:
+            return jsonify({"error": "limit must be an integer"}), 400
+        limit = max(1, min(limit, app.config['PLACES_SEARCH_MAX_LIMIT']))
+
+        try:
+            results = get_gazetteer().search(query, limit, country=request.args.get('country'))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        return jsonify({
+            "query": query,
+            "results": results,
+            "count": len(results)
+        })
+
+    except Exception as e:
+        health_status["errors_count"] += 1
+        return jsonify({"error": str(e)}), 500
+
+# Reverse geocoding - Flutter'in gonderdigi koordinatlar icin yer ve saat dilimi
+@app.route('/places/reverse', methods=['GET'])
+def places_reverse():
+    """Nearest bundled place and the IANA zone for a coordinate"""
+    try:
+        try:
+            latitude = float(request.args.get('lat', request.args.get('latitude')))
+            longitude = float(request.args.get('lon', request.args.get('longitude')))
+        except (TypeError, ValueError):
+            return jsonify({"error": "Numeric 'lat' and 'lon' parameters are required"}), 400
+        if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+            return jsonify({"error": "Coordinates are out of range"}), 400
+
+        return jsonify({
+            "latitude": latitude,
+            "longitude": longitude,
+            "place": get_gazetteer().reverse(latitude, longitude),
+            "timezone": zone_at(latitude, longitude)
+        })
+
+    except Exception as e:
+        health_status["errors_count"] += 1
+        return jsonify({"error": str(e)}), 500
+
+# Current sky - ayni dakika icindeki tum istekler tek hesaplamayi paylasir
+@app.route('/sky/now', methods=['GET'])
+def sky_now():
+    """Planet positions for the current minute from the shared snapshot"""
+    try:
+        return jsonify(get_sky_service(app.config['EPHEMERIS_BACKEND']).current().to_dict())
+
+    except Exception as e:
+        health_status["errors_count"] += 1
+        return jsonify({"error": str(e)}), 500
+
+# Horary chart - soru soruldugu an, soran kisinin konumu icin
+@app.route('/horary', methods=['POST'])
+def horary():
+    """Chart for the current minute at the asker's location"""
+    try:
+        data = request.json
+        if not isinstance(data, dict):
+            return jsonify({"error": "Request body must be a JSON object"}), 400
+
+        place = None
         latitude = data.get('latitude')
         longitude = data.get('longitude')
-        
-        # Location string'den latitude/longitude çıkarma (future use)
-        if not latitude or not longitude:
-            location = data.get('birth_location', '')
-            # Basit Istanbul koordinatları default
-            if 'istanbul' in location.lower() or 'İstanbul' in location:
-                latitude = 41.0082
-                longitude = 28.9784
+        if latitude is None or longitude is None:
+            place = get_gazetteer().resolve(data.get('location') or '') if data.get('location') else None
+            if place is None:
+                return jsonify({"error": "Latitude and longitude or a known location are required"}), 400
+            latitude, longitude = place['latitude'], place['longitude']
+        try:
+            latitude, longitude = float(latitude), float(longitude)
+        except (TypeError, ValueError):
+            return jsonify({"error": "Latitude and longitude must be numbers"}), 400
+
+        sky = get_sky_service(app.config['EPHEMERIS_BACKEND']).current()
+        angles = calculate_angles(sky.jd, latitude, longitude, app.config['EPHEMERIS_BACKEND'])
+
+        return jsonify(dict(
+            sky.to_dict(),
+            ascendant=angles["ascendant"],
+            ascendant_degree=angles["ascendant_degree"],
+            latitude=latitude,
+            longitude=longitude,
+            place=place and place['name'],
+            question=data.get('question'),
+            version="2.1.3-real-calculations",
+            calculation_method=calculation_method(app.config['EPHEMERIS_BACKEND'])
+        ))
+
+    except Exception as e:
+        health_status["errors_count"] += 1
+        return jsonify({
+            "error": str(e),
+            "version": "2.1.3-real-calculations",
+            "calculation_method": calculation_method(app.config['EPHEMERIS_BACKEND'])
+        }), 500
+
+# Transits - dogum haritasina gokyuzunun (varsayilan: su an) acilari
+@app.route('/transits', methods=['POST'])
+def transits():
+    """Aspects from transiting planets to a natal chart, now or at a given UTC moment"""
+    try:
+        data = request.json
+        try:
+            birth = parse_birth_data(data)
+            aspect_set = AspectSet.from_request(data.get('aspects'), data.get('orbs'),
+                                                orb_factor=TRANSIT_ORB_FACTOR)
+        except (BirthDataError, ValueError, TypeError, AttributeError) as e:
+            return jsonify({"error": str(e)}), 400
+
+        backend = app.config['EPHEMERIS_BACKEND']
+        chart, served_from_cache = cached_natal_chart(birth, natal_cache, backend, planet_cache)
+
+        if data.get('transit_date'):
+            try:
+                jd = julian_day(data['transit_date'], data.get('transit_time') or '12:00', '+00:00')
+            except (TypeError, ValueError):
+                return jsonify({"error": "transit_date must be YYYY-MM-DD and transit_time HH:MM (UTC)"}), 400
+            positions = get_backend(backend).planets(jd, PLANETS)
+            moment = f"{data['transit_date']}T{data.get('transit_time') or '12:00'}+00:00"
+        else:
+            sky = get_sky_service(backend).current()
+            positions, moment = sky.positions, sky.moment.isoformat()
+
+        natal_names = PLANETS + ['Ascendant']
+        natal_lons = [chart["planets"][p]["degree"] for p in PLANETS] + [chart["ascendant_degree"]]
+        aspects = list_aspects(natal_names, natal_lons, PLANETS,
+                               [positions[p]['lon'] for p in PLANETS],
+                               transit_speed=[positions[p]['speed'] for p in PLANETS],
+                               aspects=aspect_set)
+
+        return jsonify({
+            "transits": aspects,
+            "count": len(aspects),
+            "transit_moment": moment,
+            "transit_planets": {p: {"sign": sign_of(positions[p]['lon']),
+                                    "degree": round(positions[p]['lon'], 2),
+                                    "retrograde": positions[p]['speed'] < 0} for p in PLANETS},
+            "orbs": dict(zip(aspect_set.names, aspect_set.orbs.tolist())),
+            "input_data": birth,
+            "served_from_cache": served_from_cache,
+            "version": "2.1.3-real-calculations",
+            "calculation_method": calculation_method(backend),
+            "ephemeris_backend": backend
+        })
+
+    except Exception as e:
+        health_status["errors_count"] += 1
+        return jsonify({
+            "error": str(e),
+            "version": "2.1.3-real-calculations",
+            "calculation_method": calculation_method(app.config['EPHEMERIS_BACKEND'])
+        }), 500
+
+# Synastry - iki harita arasindaki capraz acilar ve uyum puani; tek kisi karsisinda birden fazla aday
+@app.route('/synastry', methods=['POST'])
+def synastry():
+    """Cross-aspects and compatibility score for a pair, or a ranking of candidates"""
+    try:
+        data = request.json
+        if not isinstance(data, dict) or not isinstance(data.get('person'), dict):
+            return jsonify({"error": "A 'person' birth record is required"}), 400
+        candidates = data.get('candidates')
+        if candidates is None:
+            if not isinstance(data.get('partner'), dict):
+                return jsonify({"error": "Either a 'partner' birth record or a 'candidates' list is required"}), 400
+        elif not isinstance(candidates, list) or not candidates:
+            return jsonify({"error": "'candidates' must be a non-empty list"}), 400
+        elif len(candidates) > app.config['SYNASTRY_MAX_CANDIDATES']:
+            return jsonify({"error": f"At most {app.config['SYNASTRY_MAX_CANDIDATES']} candidates are allowed"}), 400
+
+        try:
+            birth = parse_birth_data(data['person'])
+            aspect_set = AspectSet.from_request(data.get('aspects'), data.get('orbs'),
+                                                orb_factor=SYNASTRY_ORB_FACTOR)
+            partner = parse_birth_data(data['partner']) if candidates is None else None
+        except (BirthDataError, ValueError, TypeError, AttributeError) as e:
+            return jsonify({"error": str(e)}), 400
+
+        backend = app.config['EPHEMERIS_BACKEND']
+        chart, _ = cached_natal_chart(birth, natal_cache, backend, planet_cache)
+
+        if candidates is None:
+            partner_chart, _ = cached_natal_chart(partner, natal_cache, backend, planet_cache)
+            index, orb, score, harmony, tension = synastry_scores(
+                chart_longitudes(chart), chart_longitudes(partner_chart), aspect_set)
+            aspects = cross_aspects(index[0], orb[0], aspect_set)
+            return jsonify({
+                "score": round(float(score[0]), 1),
+                "harmony": round(float(harmony[0]), 3),
+                "tension": round(float(tension[0]), 3),
+                "aspects": aspects,
+                "count": len(aspects),
+                "person": dict(chart, input_data=birth),
+                "partner": dict(partner_chart, input_data=partner),
+                "orbs": dict(zip(aspect_set.names, aspect_set.orbs.tolist())),
+                "version": "2.1.3-real-calculations",
+                "calculation_method": calculation_method(backend),
+                "ephemeris_backend": backend
+            })
+
+        # Candidate charts through the batch path: caches first, the pool for the rest
+        results = calculate_batch(candidates, max_workers=app.config['NATAL_BATCH_WORKERS'],
+                                  cache=natal_cache, backend=backend, planet_cache=planet_cache)
+        valid = [i for i, r in enumerate(results) if "error" not in r]
+        ranking = []
+        if valid:
+            others = np.array([chart_longitudes(results[i]) for i in valid])
+            index, orb, score, harmony, tension = synastry_scores(chart_longitudes(chart), others, aspect_set)
+            top = app.config['SYNASTRY_TOP_ASPECTS']
+            for k in np.argsort(-score, kind='stable'):
+                candidate = candidates[valid[k]]
+                ranking.append({
+                    "index": valid[k],
+                    "id": candidate.get('id') if isinstance(candidate, dict) else None,
+                    "score": round(float(score[k]), 1),
+                    "harmony": round(float(harmony[k]), 3),
+                    "tension": round(float(tension[k]), 3),
+                    "top_aspects": cross_aspects(index[k], orb[k], aspect_set)[:top],
+                })
+
+        return jsonify({
+            "ranking": ranking,
+            "count": len(ranking),
+            "errors": [{"index": i, "error": r["error"]} for i, r in enumerate(results) if "error" in r],
+            "person": dict(chart, input_data=birth),
+            "orbs": dict(zip(aspect_set.names, aspect_set.orbs.tolist())),
+            "version": "2.1.3-real-calculations",
+            "calculation_method": calculation_method(backend),
+            "ephemeris_backend": backend
+        })
+
+    except Exception as e:
+        health_status["errors_count"] += 1
+        return jsonify({
+            "error": str(e),
+            "version": "2.1.3-real-calculations",
+            "calculation_method": calculation_method(app.config['EPHEMERIS_BACKEND'])
+        }), 500
+
+# Composite ve Davison iliski haritalari - cift parmak izine gore onbellekte
+@app.route('/composite', methods=['POST'])
+@app.route('/davison', methods=['POST'])
+def relationship_chart():
+    """Composite (midpoint) or Davison (midpoint in time and space) chart of two birth records"""
+    try:
+        data = request.json
+        if not isinstance(data, dict) or not isinstance(data.get('person'), dict) \
+                or not isinstance(data.get('partner'), dict):
+            return jsonify({"error": "'person' and 'partner' birth records are required"}), 400
+        try:
+            person = parse_birth_data(data['person'])
+            partner = parse_birth_data(data['partner'])
+        except BirthDataError as e:
+            return jsonify({"error": str(e)}), 400
+
+        kind = request.path.strip('/')
+        backend = app.config['EPHEMERIS_BACKEND']
+        chart, served_from_cache = cached_relationship_chart(kind, person, partner, relationship_cache,
+                                                             natal_cache, backend, planet_cache)
+        return jsonify(dict(chart, kind=kind, input_data={"person": person, "partner": partner},
+                            served_from_cache=served_from_cache,
+                            version="2.1.3-real-calculations",
+                            calculation_method=calculation_method(backend),
+                            ephemeris_backend=backend))
+
+    except Exception as e:
+        health_status["errors_count"] += 1
+        return jsonify({
+            "error": str(e),
+            "version": "2.1.3-real-calculations",
+            "calculation_method": calculation_method(app.config['EPHEMERIS_BACKEND'])
+        }), 500
+
+# Solar/lunar return - Gunes veya Ay'in natal boylamina donus ani ve o an icin harita
+@app.route('/returns', methods=['POST'])
+def returns_chart():
+    """Solar return or a year of lunar returns, charts cast for the birth or a given location"""
+    try:
+        data = request.json
+        try:
+            birth = parse_birth_data(data)
+        except BirthDataError as e:
+            return jsonify({"error": str(e)}), 400
+
+        kind = data.get('kind') or 'solar'
+        try:
+            year = int(data.get('year') or datetime.datetime.now(datetime.timezone.utc).year)
+        except (TypeError, ValueError):
+            return jsonify({"error": "year must be a number"}), 400
+
+        # Return charts are often cast where the person lives now
+        place = None
+        latitude, longitude = data.get('return_latitude'), data.get('return_longitude')
+        if latitude is None or longitude is None:
+            if data.get('return_location'):
+                place = get_gazetteer().resolve(data['return_location'])
+                if place is None:
+                    return jsonify({"error": "Unknown return_location"}), 400
+                latitude, longitude = place['latitude'], place['longitude']
             else:
-                return jsonify({"error": "Latitude and longitude are required"}), 400
-        
-        if not date_str or not time_str:
-            return jsonify({"error": "Date and time are required"}), 400
-        
-        # Import flatlib for real astrological calculations
-        from flatlib.chart import Chart
-        from flatlib.datetime import Datetime
-        from flatlib.geopos import GeoPos
-        
-        # Flatlib tarihi "/" formatında bekliyor, "-" formatını dönüştür
-        date_str_flatlib = date_str.replace('-', '/')
-        
-        # Türkiye için varsayılan UTC+3 (daha sonra kullanıcı timezone'u eklenebilir)
-        dt = Datetime(date_str_flatlib, time_str, '+03:00')
-        pos = GeoPos(float(latitude), float(longitude))
-        
-        chart = Chart(dt, pos)
-        
-        # Flatlib'de geçerli planet isimleri
-        planets_to_get = ['Sun', 'Moon', 'Mercury', 'Venus', 'Mars', 'Jupiter', 'Saturn']
-        
-        # Her gezegen için hem burç hem derece bilgisini döndür
-        planet_positions = {}
-        for p in planets_to_get:
-            obj = chart.get(p)
-            planet_positions[p] = {
-                'sign': obj.sign,
-                'degree': round(obj.lon, 2)  # Burç içi derece (0-30)
-            }
-        
-        # Yükselen için de aynı format
-        asc_obj = chart.get('Asc')
-        ascendant = asc_obj.sign
-        asc_deg = round(asc_obj.lon, 2)
-        
+                latitude, longitude = birth['latitude'], birth['longitude']
+        try:
+            latitude, longitude = float(latitude), float(longitude)
+        except (TypeError, ValueError):
+            return jsonify({"error": "return_latitude and return_longitude must be numbers"}), 400
+
+        backend = app.config['EPHEMERIS_BACKEND']
+        natal_jd = birth_julian_day(birth)
+        try:
+            charts = return_charts(kind, natal_jd, year, latitude, longitude, backend)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
         return jsonify({
-            "planets": planet_positions,
-            "ascendant": ascendant,
-            "ascendant_degree": asc_deg,
-            "input_data": {
-                "date": date_str,
-                "time": time_str,
-                "latitude": float(latitude),
-                "longitude": float(longitude)
-            },
-            "message": "Real astrological calculation using flatlib",
+            "kind": kind,
+            "year": year,
+            "returns": charts,
+            "count": len(charts),
+            "location": {"latitude": latitude, "longitude": longitude, "place": place and place['name']},
+            "input_data": birth,
             "version": "2.1.3-real-calculations",
-            "calculation_method": "flatlib Swiss Ephemeris",
-            "timezone": "UTC+3 (Turkey)"
+            "calculation_method": calculation_method(backend),
+            # Charts are cast with the configured backend, the instants found with the Chebyshev lookups
+            "ephemeris_backend": backend,
+            "return_search_backend": search_source(natal_jd, [c["jd"] for c in charts])
         })
-        
+
+    except Exception as e:
+        health_status["errors_count"] += 1
+        return jsonify({
+            "error": str(e),
+            "version": "2.1.3-real-calculations",
+            "calculation_method": calculation_method(app.config['EPHEMERIS_BACKEND'])
+        }), 500
+
+# Progressions - ikincil progresyon ve solar arc; timeline modu aylik degerleri tek seferde dondurur
+@app.route('/progressions', methods=['POST'])
+def progressions():
+    """Secondary progressions and solar arc directions for a date, or a monthly timeline"""
+    try:
+        data = request.json
+        try:
+            birth = parse_birth_data(data)
+        except BirthDataError as e:
+            return jsonify({"error": str(e)}), 400
+
+        timeline = data.get('timeline')
+        try:
+            if timeline is not None:
+                if not isinstance(timeline, dict):
+                    raise ValueError("timeline must be an object with 'start' and 'years'")
+                start = datetime.date.fromisoformat(str(timeline.get('start')))
+                years = int(timeline.get('years', 10))
+                max_years = app.config['PROGRESSIONS_MAX_YEARS']
+                if not 1 <= years <= max_years:
+                    raise ValueError(f"timeline years must be between 1 and {max_years}")
+            else:
+                target = data.get('target_date') or datetime.datetime.now(datetime.timezone.utc).date().isoformat()
+                target = datetime.date.fromisoformat(str(target))
+        except (TypeError, ValueError) as e:
+            message = str(e) if 'must' in str(e) else "Dates must be YYYY-MM-DD"
+            return jsonify({"error": message}), 400
+
+        backend = app.config['EPHEMERIS_BACKEND']
+        chart, served_from_cache = cached_natal_chart(birth, natal_cache, backend, planet_cache)
+        natal_jd = birth_julian_day(birth)
+        if timeline is not None:
+            result = {"timeline": progression_timeline(natal_jd, chart["ascendant_degree"], start, years)}
+            target_jds = [date_to_jd(d) for d in month_starts(start, years)]
+        else:
+            result = progressed_chart(natal_jd, chart["ascendant_degree"], target)
+            target_jds = [date_to_jd(target)]
+        source = position_source(natal_jd, target_jds)
+
+        return jsonify(dict(
+            result,
+            natal=chart,
+            input_data=birth,
+            served_from_cache=served_from_cache,
+            version="2.1.3-real-calculations",
+            calculation_method=calculation_method(source),
+            # Progressed positions always come from the Chebyshev lookups, the natal chart from the configured backend
+            ephemeris_backend=source,
+            natal_ephemeris_backend=backend
+        ))
+
+    except Exception as e:
+        health_status["errors_count"] += 1
+        return jsonify({
+            "error": str(e),
+            "version": "2.1.3-real-calculations",
+            "calculation_method": calculation_method(app.config['EPHEMERIS_BACKEND'])
+        }), 500
+
+# Birth-time rectification - bilinmeyen dogum saati, hayat olaylarina gore aday saatler
+@app.route('/rectification', methods=['POST'])
+def rectification():
+    """Rank birth times in a window by transit, progression and solar arc hits at life events"""
+    try:
+        data = request.json
+        if not isinstance(data, dict):
+            return jsonify({"error": "Birth data must be a JSON object"}), 400
+
+        window = data.get('window') or {}
+        events = data.get('events')
+        max_events = app.config['RECTIFICATION_MAX_EVENTS']
+        try:
+            if not isinstance(window, dict):
+                raise ValueError("window must be an object with 'start' and 'end'")
+            start = clock_minutes(window.get('start', '00:00'))
+            end = clock_minutes(window.get('end', '23:59'))
+            if not isinstance(events, list) or not events:
+                raise ValueError("A non-empty 'events' list is required")
+            if len(events) > max_events:
+                raise ValueError(f"At most {max_events} events are allowed per request")
+            try:
+                top = int(data.get('top', 5))
+            except (TypeError, ValueError):
+                top = 0
+            if not 1 <= top <= app.config['RECTIFICATION_MAX_TOP']:
+                raise ValueError(f"top must be between 1 and {app.config['RECTIFICATION_MAX_TOP']}")
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        # Events are dated to the day, transits are taken at noon UT
+        events = [e if isinstance(e, dict) else {"date": e} for e in events]
+        try:
+            event_jds = [julian_day(str(e.get('date')), '12:00', '+00:00') for e in events]
+        except (TypeError, ValueError):
+            return jsonify({"error": "Event dates must be YYYY-MM-DD"}), 400
+
+        try:
+            # Time zone and place resolved for the start of the window
+            birth = parse_birth_data(dict(data, time=f"{start // 60:02d}:{start % 60:02d}"))
+        except BirthDataError as e:
+            return jsonify({"error": str(e)}), 400
+
+        labels = [e.get('label') or e.get('date') for e in events]
+        midnight_jd = julian_day(birth['date'], '00:00', birth['utc_offset'])
+        try:
+            candidates, scored = rectify(midnight_jd, start, end, event_jds, birth['latitude'], birth['longitude'],
+                                         labels, top, app.config['EPHEMERIS_BACKEND'],
+                                         app.config['NATAL_BATCH_WORKERS'])
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        for candidate in candidates:
+            candidate["ascendant"] = sign_of(candidate["ascendant_degree"])
+
+        return jsonify({
+            "candidates": candidates,
+            "candidates_scored": scored,
+            "window": {"start": f"{start // 60:02d}:{start % 60:02d}", "end": f"{end // 60:02d}:{end % 60:02d}"},
+            "input_data": dict(birth, time=None),
+            "version": "2.1.3-real-calculations",
+            "calculation_method": calculation_method(app.config['EPHEMERIS_BACKEND']),
+            "ephemeris_backend": app.config['EPHEMERIS_BACKEND']
+        })
+
+    except Exception as e:
+        health_status["errors_count"] += 1
+        return jsonify({
+            "error": str(e),
+            "version": "2.1.3-real-calculations",
+            "calculation_method": calculation_method(app.config['EPHEMERIS_BACKEND'])
+        }), 500
+
+# Astrocartography - gezegenlerin ASC/DSC/MC/IC oldugu dunya cizgileri, encoded polyline
+@app.route('/astrocartography', methods=['POST'])
+def astrocartography():
+    """World lines of the natal planets on the four angles"""
+    try:
+        data = request.json
+        try:
+            birth = parse_birth_data(data)
+        except BirthDataError as e:
+            return jsonify({"error": str(e)}), 400
+
+        bodies = data.get('bodies') or LINE_BODIES
+        angles = data.get('angles') or LINE_ANGLES
+        if not isinstance(bodies, list) or not set(bodies) <= set(LINE_BODIES):
+            return jsonify({"error": f"bodies must be a list of {LINE_BODIES}"}), 400
+        if not isinstance(angles, (list, tuple)) or not set(angles) <= set(LINE_ANGLES):
+            return jsonify({"error": f"angles must be a list of {list(LINE_ANGLES)}"}), 400
+        encoding = data.get('encoding') or 'polyline'
+        if encoding not in ('polyline', 'coordinates'):
+            return jsonify({"error": "encoding must be 'polyline' or 'coordinates'"}), 400
+
+        backend = app.config['EPHEMERIS_BACKEND']
+        jd = birth_julian_day(birth)
+        lines = angle_lines(jd, bodies, tuple(angles), backend=backend, encoded=encoding == 'polyline')
+
+        result = {
+            "lines": lines,
+            "count": len(lines),
+            "encoding": encoding,
+            "input_data": birth,
+            "version": "2.1.3-real-calculations",
+            "calculation_method": calculation_method(backend),
+            "ephemeris_backend": backend
+        }
+        # Heatmap registration only on request, it is stored on disk
+        if data.get('tiles'):
+            result["tiles"] = _tile_url(get_tile_cache().register(jd, backend))
+        return jsonify(result)
+
+    except Exception as e:
+        health_status["errors_count"] += 1
+        return jsonify({
+            "error": str(e),
+            "version": "2.1.3-real-calculations",
+            "calculation_method": calculation_method(app.config['EPHEMERIS_BACKEND'])
+        }), 500
+
+def _tile_url(chart):
+    return f"/tiles/{chart}/{{z}}/{{x}}/{{y}}"
+
+
+# Relocation heatmap tiles - haritayi bir kez kaydet, karolar ilk istekte cizilip diskte saklanir
+@app.route('/tiles', methods=['POST'])
+def register_tiles():
+    """Register a natal chart for heatmap tiles, returns the tile URL template"""
+    try:
+        try:
+            birth = parse_birth_data(request.json)
+        except BirthDataError as e:
+            return jsonify({"error": str(e)}), 400
+
+        chart = get_tile_cache().register(birth_julian_day(birth), app.config['EPHEMERIS_BACKEND'])
+        return jsonify({
+            "chart": chart,
+            "tiles": _tile_url(chart),
+            "max_zoom": app.config['TILES_MAX_ZOOM'],
+            "tile_size": TILE_SIZE
+        })
+
+    except Exception as e:
+        health_status["errors_count"] += 1
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/tiles/<chart>/<int:z>/<int:x>/<int:y>', methods=['GET'])
+def heatmap_tile(chart, z, x, y):
+    """Favorability heatmap PNG of a registered chart, rendered once and cached on disk"""
+    try:
+        # Chart ids are hex digests; anything else never reaches the file system
+        if len(chart) != 24 or any(c not in '0123456789abcdef' for c in chart):
+            return jsonify({"error": "Unknown chart"}), 404
+        if not 0 <= z <= app.config['TILES_MAX_ZOOM'] or not (0 <= x < 2 ** z and 0 <= y < 2 ** z):
+            return jsonify({"error": "Tile out of range"}), 404
+
+        etag = f'"{chart}-{z}-{x}-{y}"'
+        headers = {"Cache-Control": f"public, max-age={app.config['TILES_MAX_AGE']}, immutable", "ETag": etag}
+        if request.headers.get('If-None-Match') == etag:
+            return Response(status=304, headers=headers)
+
+        result = get_tile_cache().tile(chart, z, x, y)
+        if result is None:
+            return jsonify({"error": "Unknown chart, register it with POST /tiles"}), 404
+        data, cached = result
+        headers["X-Tile-Cache"] = "hit" if cached else "miss"
+        return Response(data, mimetype='image/png', headers=headers)
+
+    except Exception as e:
+        health_status["errors_count"] += 1
+        return jsonify({"error": str(e)}), 500
+
+# Compatibility ranking - kayitli profiller tek matriste, sorgu haritasina gore en uyumlu k profil
+@app.route('/compatibility/profiles', methods=['POST'])
+def compatibility_profiles():
+    """Store or update profiles (birth data with an 'id') in the compatibility index"""
+    try:
+        data = request.json
+        profiles = data.get('profiles') if isinstance(data, dict) else data
+        if not isinstance(profiles, list) or not profiles:
+            return jsonify({"error": "A non-empty 'profiles' list is required"}), 400
+        max_profiles = app.config['COMPATIBILITY_MAX_PROFILES']
+        if len(profiles) > max_profiles:
+            return jsonify({"error": f"At most {max_profiles} profiles are allowed per request"}), 400
+        if not all(isinstance(p, dict) and p.get('id') not in (None, '') for p in profiles):
+            return jsonify({"error": "Every profile needs an 'id'"}), 400
+
+        results = calculate_batch(profiles, max_workers=app.config['NATAL_BATCH_WORKERS'],
+                                  cache=natal_cache, backend=app.config['EPHEMERIS_BACKEND'],
+                                  planet_cache=planet_cache)
+        stored = [(profiles[i]['id'], chart_longitudes(r)) for i, r in enumerate(results) if "error" not in r]
+        index = get_compatibility_index()
+        try:
+            index.upsert(stored)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        return jsonify({
+            "stored": len(stored),
+            "errors": [{"index": i, "id": profiles[i]['id'], "error": r["error"]}
+                       for i, r in enumerate(results) if "error" in r],
+            "profiles": len(index)
+        })
+
     except Exception as e:
+        health_status["errors_count"] += 1
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/compatibility/profiles/<profile_id>', methods=['DELETE'])
+def compatibility_profile_delete(profile_id):
+    """Remove a profile from the compatibility index"""
+    try:
+        try:
+            removed = get_compatibility_index().remove(profile_id)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        if not removed:
+            return jsonify({"error": "Profile not found"}), 404
+        return jsonify({"removed": profile_id})
+
+    except Exception as e:
+        health_status["errors_count"] += 1
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/compatibility/rank', methods=['POST'])
+def compatibility_rank():
+    """Top k stored profiles by synastry score against a birth record or a stored profile"""
+    try:
+        data = request.json
+        if not isinstance(data, dict):
+            return jsonify({"error": "Request must be a JSON object"}), 400
+        index = get_compatibility_index()
+        exclude = data.get('exclude') or []
+        try:
+            k = int(data.get('k', 20))
+            if not 1 <= k <= app.config['COMPATIBILITY_MAX_K']:
+                raise ValueError(f"k must be between 1 and {app.config['COMPATIBILITY_MAX_K']}")
+            if not isinstance(exclude, list):
+                raise ValueError("exclude must be a list of profile ids")
+            if data.get('profile_id') not in (None, ''):
+                longitudes = index.longitudes(data['profile_id'])
+                if longitudes is None:
+                    return jsonify({"error": "Profile not found"}), 404
+                exclude = exclude + [data['profile_id']]
+            else:
+                birth = parse_birth_data(data.get('person'))
+                chart, _ = cached_natal_chart(birth, natal_cache, app.config['EPHEMERIS_BACKEND'], planet_cache)
+                longitudes = chart_longitudes(chart)
+        except (BirthDataError, ValueError, TypeError, AttributeError) as e:
+            return jsonify({"error": str(e)}), 400
+
+        ranking = [{"id": profile_id, "score": round(score, 1), "harmony": round(harmony, 3),
+                    "tension": round(tension, 3)}
+                   for profile_id, score, harmony, tension in index.rank(longitudes, k, exclude)]
+        return jsonify({"ranking": ranking, "count": len(ranking), "profiles": len(index)})
+
+    except Exception as e:
+        health_status["errors_count"] += 1
+        return jsonify({"error": str(e)}), 500
+
+# Ephemeris time series - takvim ve animasyon icin NDJSON olarak akitilir
+@app.route('/ephemeris', methods=['GET'])
+def ephemeris():
+    """Stream positions from start to end (UTC) every step as NDJSON"""
+    try:
+        try:
+            start = parse_moment(request.args.get('start'), 'start')
+            end = parse_moment(request.args.get('end') or request.args.get('start'), 'end')
+            step = parse_step(request.args.get('step'))
+            bodies = parse_bodies(request.args.get('bodies'))
+            count = step_count(start, end, step)
+        except EphemerisRequestError as e:
+            return jsonify({"error": str(e)}), 400
+
+        max_steps = app.config['EPHEMERIS_MAX_STEPS']
+        if count > max_steps:
+            return jsonify({"error": f"At most {max_steps} steps are allowed per request, "
+                                     f"this range has {count}"}), 400
+
+        rows = iter_positions(start, end, step, bodies, app.config['EPHEMERIS_BACKEND'])
+        response = Response(stream_with_context(ndjson(rows)), mimetype='application/x-ndjson')
+        response.headers['X-Ephemeris-Steps'] = str(count)
+        return response
+
+    except Exception as e:
+        health_status["errors_count"] += 1
+        return jsonify({"error": str(e)}), 500
+
+# Celestial events - takvim icin onceden hesaplanmis indeks (celestial_events.py build)
+@app.route('/events', methods=['GET'])
+def events():
+    """Ingresses, stations, lunations and exact aspects between two UTC dates"""
+    try:
+        index = get_event_index()
+        if index is None:
+            return jsonify({"error": "Event index has not been built"}), 503
+
+        try:
+            start = parse_moment(request.args.get('start'), 'start')
+            end = parse_moment(request.args.get('end'), 'end')
+            types = [t for t in (request.args.get('types') or '').split(',') if t]
+            bodies = parse_bodies(request.args.get('bodies')) if request.args.get('bodies') else None
+        except EphemerisRequestError as e:
+            return jsonify({"error": str(e)}), 400
+        unknown = [t for t in types if t not in EVENT_TYPES]
+        if unknown:
+            return jsonify({"error": f"Unknown event types {unknown}, expected some of {EVENT_TYPES}"}), 400
+
+        start_jd, end_jd = iso_to_jd(start), iso_to_jd(end)
+        if not index.covers(start_jd, end_jd):
+            return jsonify({"error": "Range is outside the event index "
+                                     f"({jd_to_iso(index.start_jd)} - {jd_to_iso(index.end_jd)})"}), 400
+
+        max_results = app.config['EVENTS_MAX_RESULTS']
+        results = index.query(start_jd, end_jd, types, bodies, limit=max_results + 1)
+        return jsonify({
+            "events": results[:max_results],
+            "count": min(len(results), max_results),
+            "truncated": len(results) > max_results,
+            "start": start.isoformat(),
+            "end": end.isoformat()
+        })
+
+    except Exception as e:
+        health_status["errors_count"] += 1
+        return jsonify({"error": str(e)}), 500
+
+# Moon phases and eclipses - onceden hesaplanmis tablolar (lunar_tables.py build)
+def _lunar_tables_or_error():
+    tables = get_lunar_tables()
+    if tables is None:
+        return None, (jsonify({"error": "Lunar tables have not been built"}), 503)
+    return tables, None
+
+
+def _date_arg(name, default=None):
+    value = request.args.get(name) or default
+    try:
+        return datetime.date.fromisoformat(str(value))
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must be YYYY-MM-DD")
+
+
+@app.route('/moon/phases', methods=['GET'])
+def moon_phases():
+    """Daily Moon phase and illumination between two dates (00:00 UT)"""
+    try:
+        tables, error = _lunar_tables_or_error()
+        if error:
+            return error
+        try:
+            start = _date_arg('start')
+            end = _date_arg('end', start)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        max_days = app.config['LUNAR_PHASES_MAX_DAYS']
+        if end < start or (end - start).days >= max_days:
+            return jsonify({"error": f"end must be after start and at most {max_days} days later"}), 400
+        if not tables.covers(start, end):
+            return jsonify({"error": "Dates are outside the lunar tables (1900-2100)"}), 400
+
+        phases = tables.phases(start, end)
+        return jsonify({"phases": phases, "count": len(phases)})
+
+    except Exception as e:
+        health_status["errors_count"] += 1
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/eclipses', methods=['GET'])
+def eclipses():
+    """Solar and lunar eclipses with greatest eclipse between two dates"""
+    try:
+        tables, error = _lunar_tables_or_error()
+        if error:
+            return error
+        try:
+            start = _date_arg('start')
+            end = _date_arg('end')
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        kind = request.args.get('kind')
+        if kind and kind not in ECLIPSE_KINDS:
+            return jsonify({"error": f"kind must be one of {ECLIPSE_KINDS}"}), 400
+
+        results = tables.eclipses(date_to_jd(start), date_to_jd(end), kind)
+        return jsonify({"eclipses": results, "count": len(results)})
+
+    except Exception as e:
+        health_status["errors_count"] += 1
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/eclipses/next', methods=['GET'])
+@app.route('/eclipses/previous', methods=['GET'])
+def eclipse_next():
+    """Closest eclipse after (or before) a date, today by default"""
+    try:
+        tables, error = _lunar_tables_or_error()
+        if error:
+            return error
+        try:
+            date = _date_arg('date', datetime.datetime.now(datetime.timezone.utc).date())
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        kind = request.args.get('kind')
+        if kind and kind not in ECLIPSE_KINDS:
+            return jsonify({"error": f"kind must be one of {ECLIPSE_KINDS}"}), 400
+
+        previous = request.path.endswith('/previous')
+        eclipse = tables.next_eclipse(date_to_jd(date), kind, previous=previous)
+        return jsonify({"eclipse": eclipse, "date": date.isoformat()})
+
+    except Exception as e:
+        health_status["errors_count"] += 1
+        return jsonify({"error": str(e)}), 500
+
+# Moon sign and void-of-course timetable - her gece ileri uzatilir (moon_timetable.py extend)
+@app.route('/moon/timetable', methods=['GET'])
+def moon_timetable():
+    """Moon sign periods with last aspect and void-of-course interval overlapping a UTC range"""
+    try:
+        timetable = get_moon_timetable()
+        if timetable is None:
+            return jsonify({"error": "Moon timetable has not been built"}), 503
+        try:
+            start = parse_moment(request.args.get('start'), 'start')
+            end = parse_moment(request.args.get('end'), 'end') if request.args.get('end') \
+                else start + datetime.timedelta(days=1)
+        except EphemerisRequestError as e:
+            return jsonify({"error": str(e)}), 400
+
+        max_days = app.config['MOON_TIMETABLE_MAX_DAYS']
+        if end <= start or end - start > datetime.timedelta(days=max_days):
+            return jsonify({"error": f"end must be after start and at most {max_days} days later"}), 400
+        start_jd, end_jd = iso_to_jd(start), iso_to_jd(end)
+        if not timetable.covers(start_jd, end_jd):
+            return jsonify({"error": "Range is outside the timetable",
+                            "covered": [jd_to_iso(timetable.start_jd), jd_to_iso(timetable.end_jd)]}), 400
+
+        void_only = request.args.get('void', '').lower() in ('1', 'true', 'yes')
+        periods = timetable.periods(start_jd, end_jd, void_only=void_only)
+        return jsonify({"periods": periods, "count": len(periods)})
+
+    except Exception as e:
+        health_status["errors_count"] += 1
+        return jsonify({"error": str(e)}), 500
+
+# Electional search - kisitlarin hepsinin saglandigi zaman pencereleri, en iyiden baslayarak
+@app.route('/electional', methods=['POST'])
+def electional():
+    """Ranked windows in a date range where every constraint holds"""
+    try:
+        data = request.json
+        if not isinstance(data, dict):
+            return jsonify({"error": "Request must be a JSON object"}), 400
+
+        # Aspect constraints refer to a natal chart
+        natal_points, natal = None, None
+        if data.get('natal_chart') is not None:
+            try:
+                birth = parse_birth_data(data['natal_chart'])
+            except BirthDataError as e:
+                return jsonify({"error": f"natal_chart: {e}"}), 400
+            natal, _ = cached_natal_chart(birth, natal_cache, app.config['EPHEMERIS_BACKEND'], planet_cache)
+            natal_points = dict({p: natal["planets"][p]["degree"] for p in PLANETS},
+                                Ascendant=natal["ascendant_degree"])
+
+        max_days = app.config['ELECTIONAL_MAX_DAYS']
+        max_results = app.config['ELECTIONAL_MAX_RESULTS']
+        try:
+            start = parse_moment(data.get('start') or datetime.datetime.now(datetime.timezone.utc).date().isoformat(),
+                                 'start')
+            days = float(data.get('days', 30))
+            step_minutes = float(data.get('step_minutes', 60))
+            min_hours = float(data.get('min_hours', 0))
+            limit = int(data.get('limit', 10))
+        except EphemerisRequestError as e:
+            return jsonify({"error": str(e)}), 400
+        except (TypeError, ValueError):
+            return jsonify({"error": "days, step_minutes, min_hours and limit must be numbers"}), 400
+        if not 0 < days <= max_days:
+            return jsonify({"error": f"days must be between 0 and {max_days}"}), 400
+        if not 10 <= step_minutes <= 240:
+            return jsonify({"error": "step_minutes must be between 10 and 240"}), 400
+        if not 1 <= limit <= max_results:
+            return jsonify({"error": f"limit must be between 1 and {max_results}"}), 400
+        try:
+            constraints = parse_constraints(data.get('constraints'), natal_points)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        start_jd = iso_to_jd(start)
+        windows, found = search_windows(constraints, start_jd, start_jd + days, step_minutes, min_hours, limit,
+                                get_moon_timetable())
+
+        return jsonify({
+            "windows": windows,
+            "count": len(windows),
+            "windows_found": found,
+            "constraints": [c.description for c in constraints],
+            "range": [jd_to_iso(start_jd), jd_to_iso(start_jd + days)],
+            "version": "2.1.3-real-calculations",
+            "calculation_method": calculation_method(app.config['EPHEMERIS_BACKEND'])
+        })
+
+    except Exception as e:
+        health_status["errors_count"] += 1
         return jsonify({
             "error": str(e),
             "version": "2.1.3-real-calculations",
-            "calculation_method": "flatlib Swiss Ephemeris"
+            "calculation_method": calculation_method(app.config['EPHEMERIS_BACKEND'])
         }), 500
 
 # Phase 3 - Stripe Payment Endpoints
@@ -346,6 +1465,9 @@ def health_detailed():
             "database": "configured"
         },
         "metrics": health_status,
+        "natal_cache": natal_cache.stats(),
+        "planet_cache": planet_cache.stats(),
+        "relationship_cache": relationship_cache.stats(),
         "environment": os.environ.get('FLASK_ENV', 'production')
     })
 
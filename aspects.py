@@ -0,0 +1,152 @@
+"""
+Vectorized aspect engine.
+
+Natal and transit longitudes go in as NumPy arrays and every pair is
+checked at once: the angular separation matrix, the closest aspect within
+its orb and whether the aspect is applying (orb shrinking) or separating.
+Natal input may carry a leading chart axis, so thousands of stored charts
+can be matched against one sky in a single pass for notification jobs.
+"""
+import numpy as np
+
+# name: (angle in degrees, default orb in degrees)
+MAJOR_ASPECTS = {
+    'conjunction': (0.0, 8.0),
+    'sextile': (60.0, 4.0),
+    'square': (90.0, 6.0),
+    'trine': (120.0, 6.0),
+    'opposition': (180.0, 8.0),
+}
+
+MINOR_ASPECTS = {
+    'semisextile': (30.0, 2.0),
+    'semisquare': (45.0, 2.0),
+    'quintile': (72.0, 2.0),
+    'sesquiquadrate': (135.0, 2.0),
+    'quincunx': (150.0, 3.0),
+}
+
+# Transits are read with tighter orbs than natal aspects
+TRANSIT_ORB_FACTOR = 0.5
+
+# Widest orb override accepted from requests, in degrees
+MAX_ORB = 15.0
+
+
+class AspectSet:
+    """Aspect names, exact angles and orbs in matching order"""
+
+    def __init__(self, aspects=None, orbs=None, orb_factor=1.0):
+        aspects = dict(aspects or MAJOR_ASPECTS)
+        orbs = orbs or {}
+        unknown = set(orbs) - set(aspects)
+        if unknown:
+            raise ValueError(f"Orbs given for unknown aspects: {sorted(unknown)}")
+        self.names = list(aspects)
+        self.angles = np.array([aspects[n][0] for n in self.names], dtype=float)
+        self.orbs = np.array([parse_orb(orbs[n], n) if n in orbs else aspects[n][1] * orb_factor
+                              for n in self.names], dtype=float)
+
+    @classmethod
+    def from_request(cls, names=None, orbs=None, orb_factor=1.0):
+        """Aspect set from user input: names from the major and minor tables, orb overrides"""
+        known = dict(MAJOR_ASPECTS, **MINOR_ASPECTS)
+        if names is not None and not isinstance(names, list):
+            raise ValueError("aspects must be a list of aspect names")
+        if orbs is not None and not isinstance(orbs, dict):
+            raise ValueError("orbs must map aspect names to degrees")
+        if names:
+            unknown = [n for n in names if n not in known]
+            if unknown:
+                raise ValueError(f"Unknown aspects {unknown}, expected some of {sorted(known)}")
+            aspects = {n: known[n] for n in names}
+        else:
+            aspects = MAJOR_ASPECTS
+        return cls(aspects, orbs, orb_factor)
+
+
+def parse_orb(value, name='orb'):
+    """Orb override in degrees, a finite number in (0, MAX_ORB]"""
+    try:
+        orb = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"The {name} orb must be a number of degrees")
+    # NaN fails the comparison too
+    if not 0.0 < orb <= MAX_ORB:
+        raise ValueError(f"The {name} orb must be between 0 and {MAX_ORB:g} degrees")
+    return orb
+
+
+def _signed_difference(a, b):
+    """a - b wrapped into [-180, 180)"""
+    return (a - b + 180.0) % 360.0 - 180.0
+
+
+def aspect_matrix(natal, transit, transit_speed=None, natal_speed=None, aspects=None):
+    """Aspects between every natal and transit point
+
+    natal is (..., N) longitudes, transit is (T,) longitudes; speeds are in
+    degrees per day and default to zero (a natal chart does not move).
+    Returns three (..., N, T) arrays: the index into aspects.names of the
+    closest aspect within orb (-1 for none), its signed orb in degrees
+    (separation minus the exact angle) and an applying flag.
+    """
+    aspects = aspects or AspectSet()
+    natal = np.asarray(natal, dtype=float)
+    transit = np.asarray(transit, dtype=float)
+
+    # Separation in [0, 180] and how fast it changes
+    diff = _signed_difference(transit, natal[..., None])
+    separation = np.abs(diff)
+    relative_speed = np.zeros_like(diff)
+    if transit_speed is not None:
+        relative_speed = relative_speed + np.asarray(transit_speed, dtype=float)
+    if natal_speed is not None:
+        relative_speed = relative_speed - np.asarray(natal_speed, dtype=float)[..., None]
+    separation_rate = np.sign(diff) * relative_speed
+
+    # (..., N, T, A): distance of the separation from every aspect angle
+    delta = separation[..., None] - aspects.angles
+    distance = np.abs(delta)
+    within = distance <= aspects.orbs
+    best = np.argmin(np.where(within, distance, np.inf), axis=-1)
+    found = np.take_along_axis(within, best[..., None], axis=-1)[..., 0]
+    orb = np.take_along_axis(delta, best[..., None], axis=-1)[..., 0]
+
+    index = np.where(found, best, -1)
+    # Applying while |orb| shrinks
+    applying = found & (np.sign(orb) * separation_rate < 0)
+    return index, np.where(found, orb, np.nan), applying
+
+
+def find_aspects(natal, transit, transit_speed=None, natal_speed=None, aspects=None):
+    """Flat arrays of matches: (chart, natal point, transit point, aspect, orb, applying)
+
+    Meant for many charts at once; natal is (C, N). Only pairs in orb are
+    returned, so the output size follows the number of hits.
+    """
+    aspects = aspects or AspectSet()
+    natal = np.atleast_2d(np.asarray(natal, dtype=float))
+    index, orb, applying = aspect_matrix(natal, transit, transit_speed, natal_speed, aspects)
+    chart, natal_point, transit_point = np.nonzero(index >= 0)
+    return (chart, natal_point, transit_point, index[chart, natal_point, transit_point],
+            orb[chart, natal_point, transit_point], applying[chart, natal_point, transit_point])
+
+
+def list_aspects(natal_names, natal, transit_names, transit, transit_speed=None,
+                 natal_speed=None, aspects=None):
+    """Aspects of one chart as dicts, tightest orb first"""
+    aspects = aspects or AspectSet()
+    index, orb, applying = aspect_matrix(natal, transit, transit_speed, natal_speed, aspects)
+    rows, cols = np.nonzero(index >= 0)
+    result = []
+    for i, j in zip(rows.tolist(), cols.tolist()):
+        result.append({
+            "transit": transit_names[j],
+            "natal": natal_names[i],
+            "aspect": aspects.names[index[i, j]],
+            "orb": round(float(orb[i, j]), 2),
+            "applying": bool(applying[i, j]),
+        })
+    result.sort(key=lambda a: abs(a["orb"]))
+    return result
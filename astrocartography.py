@@ -0,0 +1,148 @@
+"""
+Astrocartography: the world lines where a natal planet was on an angle.
+
+A planet is on the MC where local sidereal time equals its right
+ascension, so MC and IC lines are meridians. It is on the ASC (rising)
+or DSC (setting) where its hour angle is -H0 or +H0, with
+cos H0 = -tan(latitude) tan(declination); those lines are curves, one
+longitude per latitude, solved in closed form for a whole array of
+sample latitudes at once instead of contouring a sampled map. The natal
+positions come from one ephemeris call per chart; lines are cut where
+they cross the antimeridian and returned as encoded polylines (the
+Google polyline format map SDKs decode natively).
+"""
+import numpy as np
+
+from ascendant_grid import sidereal_obliquity
+from ephemeris_backends import get_backend
+from natal_chart import DEFAULT_EPHEMERIS_BACKEND, PLANETS
+
+LINE_BODIES = PLANETS + ['Uranus', 'Neptune', 'Pluto']
+LINE_ANGLES = ('ASC', 'DSC', 'MC', 'IC')
+
+# Web Mercator maps end here
+MAX_LATITUDE = 85.0
+POLYLINE_PRECISION = 5
+
+
+def equatorial(lon, lat, obliquity):
+    """Right ascension and declination in degrees from ecliptic longitude and latitude"""
+    lon, lat, obliquity = np.radians(lon), np.radians(lat), np.radians(obliquity)
+    ra = np.arctan2(np.sin(lon) * np.cos(obliquity) - np.tan(lat) * np.sin(obliquity), np.cos(lon))
+    dec = np.arcsin(np.sin(lat) * np.cos(obliquity) + np.cos(lat) * np.sin(obliquity) * np.sin(lon))
+    return np.degrees(ra) % 360.0, np.degrees(dec)
+
+
+def body_coordinates(jd, bodies=None, backend=None):
+    """(right ascensions, declinations, Greenwich sidereal time) of bodies at a UT julian day
+
+    The planets come from one grouped backend call.
+    """
+    bodies = bodies or LINE_BODIES
+    backend = get_backend(backend or DEFAULT_EPHEMERIS_BACKEND)
+    planets = backend.planets(jd, bodies)
+    sidereal, obliquity = sidereal_obliquity(jd)
+    ra, dec = equatorial(np.array([planets[b]['lon'] for b in bodies]),
+                         np.array([planets[b]['lat'] for b in bodies]), obliquity)
+    return ra, dec, float(sidereal)
+
+
+def _longitude(value):
+    return (value + 180.0) % 360.0 - 180.0
+
+
+def horizon_longitudes(ra, dec, sidereal, latitudes):
+    """(bodies, latitudes) longitudes of the ASC and DSC lines, NaN where a body never rises or sets"""
+    tangent = -np.tan(np.radians(latitudes))[None, :] * np.tan(np.radians(dec))[:, None]
+    semi_arc = np.degrees(np.arccos(np.where(np.abs(tangent) <= 1.0, tangent, np.nan)))
+    meridian = (ra - sidereal)[:, None]
+    return _longitude(meridian - semi_arc), _longitude(meridian + semi_arc)
+
+
+def _latitudes(dec, step):
+    """Sample latitudes for the horizon lines of one body, ending at its circumpolar limit
+
+    Even latitude steps plus the latitudes of even semi-arc steps, which
+    crowd where the line bends towards the limit.
+    """
+    limit = min(MAX_LATITUDE, 90.0 - abs(float(dec)))
+    latitudes = [np.arange(-limit, limit, step), [limit]]
+    if abs(dec) > 1e-6:
+        semi_arc = np.radians(np.arange(0.0, 180.0 + step, step))
+        latitudes.append(np.degrees(np.arctan(-np.cos(semi_arc) / np.tan(np.radians(dec)))))
+    latitudes = np.unique(np.concatenate(latitudes))
+    return latitudes[np.abs(latitudes) <= limit]
+
+
+def split_antimeridian(latitudes, longitudes):
+    """Segments [(lat, lon) arrays] of a line, cut where it wraps across +-180"""
+    keep = ~np.isnan(longitudes)
+    latitudes, longitudes = latitudes[keep], longitudes[keep]
+    if len(latitudes) < 2:
+        return []
+    jumps = np.nonzero(np.abs(np.diff(longitudes)) > 180.0)[0]
+    segments = []
+    start = 0
+    for i in jumps:
+        # Close the segment on the antimeridian and open the next one there
+        side = np.sign(longitudes[i])
+        step = _longitude(longitudes[i + 1] - longitudes[i])
+        fraction = (side * 180.0 - longitudes[i]) / step
+        crossing = latitudes[i] + fraction * (latitudes[i + 1] - latitudes[i])
+        segments.append(np.column_stack([np.append(latitudes[start:i + 1], crossing),
+                                         np.append(longitudes[start:i + 1], side * 180.0)]))
+        latitudes[i], longitudes[i] = crossing, -side * 180.0
+        start = i
+    segments.append(np.column_stack([latitudes[start:], longitudes[start:]]))
+    return [s for s in segments if len(s) > 1]
+
+
+def encode_polyline(points, precision=POLYLINE_PRECISION):
+    """Google encoded polyline of (lat, lon) points"""
+    values = np.round(np.asarray(points, dtype=float) * 10 ** precision).astype(np.int64)
+    deltas = np.diff(values, axis=0, prepend=0).ravel()
+    # Zigzag: sign into the lowest bit
+    deltas = np.where(deltas < 0, ~(deltas << 1), deltas << 1)
+    chars = []
+    for value in deltas.tolist():
+        while value >= 0x20:
+            chars.append(chr((0x20 | (value & 0x1f)) + 63))
+            value >>= 5
+        chars.append(chr(value + 63))
+    return ''.join(chars)
+
+
+def decode_polyline(text, precision=POLYLINE_PRECISION):
+    """(lat, lon) points of a Google encoded polyline"""
+    values, value, shift = [], 0, 0
+    for char in text:
+        byte = ord(char) - 63
+        value |= (byte & 0x1f) << shift
+        shift += 5
+        if byte < 0x20:
+            values.append(~(value >> 1) if value & 1 else value >> 1)
+            value, shift = 0, 0
+    return np.cumsum(np.array(values, dtype=np.int64).reshape(-1, 2), axis=0) / 10 ** precision
+
+
+def angle_lines(jd, bodies=None, angles=LINE_ANGLES, latitude_step=1.0, backend=None, encoded=True):
+    """Lines of every body on the requested angles as {"body", "angle", "polylines"} dicts"""
+    bodies = bodies or LINE_BODIES
+    ra, dec, sidereal = body_coordinates(jd, bodies, backend)
+    lines = []
+    for i, body in enumerate(bodies):
+        segments = {}
+        if 'MC' in angles or 'IC' in angles:
+            meridian = _longitude(ra[i] - sidereal)
+            poles = np.array([-MAX_LATITUDE, MAX_LATITUDE])
+            segments['MC'] = [np.column_stack([poles, [meridian, meridian]])]
+            segments['IC'] = [np.column_stack([poles, np.full(2, _longitude(meridian + 180.0))])]
+        if 'ASC' in angles or 'DSC' in angles:
+            latitudes = _latitudes(dec[i], latitude_step)
+            rising, setting = horizon_longitudes(ra[i:i + 1], dec[i:i + 1], sidereal, latitudes)
+            segments['ASC'] = split_antimeridian(latitudes, rising[0])
+            segments['DSC'] = split_antimeridian(latitudes, setting[0])
+        for angle in angles:
+            polylines = [encode_polyline(s) if encoded else np.round(s, 4).tolist() for s in segments[angle]]
+            lines.append({"body": body, "angle": angle, "polylines": polylines})
+    return lines
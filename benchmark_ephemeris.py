@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Benchmark the ephemeris backends behind the natal endpoint.
+
+Times calculate_natal_chart() per backend on the same random birth data
+and counts responses that differ from the flatlib path.
+
+    python benchmark_ephemeris.py --charts 2000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from ephemeris_backends import BACKENDS
+from natal_chart import calculate_natal_chart, parse_birth_data
+
+
+def random_births(count, seed=0):
+    """Parsed birth data (timezone resolved) for random dates and places"""
+    rng = random.Random(seed)
+    return [parse_birth_data({
+        "date": f"{rng.randint(1901, 2099)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+        "time": f"{rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}",
+        "latitude": rng.uniform(-60, 60),
+        "longitude": rng.uniform(-180, 180),
+    }) for _ in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--charts', type=int, default=2000)
+    parser.add_argument('--backends', nargs='+', default=list(BACKENDS))
+    args = parser.parse_args()
+
+    births = random_births(args.charts)
+    reference = None
+    print(f"{args.charts} charts per backend")
+    for name in args.backends:
+        calculate_natal_chart(births[0], name)  # load ephemeris files
+        start = time.perf_counter()
+        charts = [calculate_natal_chart(b, name) for b in births]
+        elapsed = time.perf_counter() - start
+
+        if reference is None:
+            reference = charts
+        # 0.01 degree rounding makes a handful of boundary cases differ
+        differing = sum(1 for a, b in zip(reference, charts) if a != b)
+        print(f"{name:<10} {elapsed / len(births) * 1e6:8.1f} us/chart   "
+              f"{differing} responses differ from {args.backends[0]}")
+
+
+if __name__ == '__main__':
+    main()
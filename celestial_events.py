@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+"""
+Precomputed index of celestial events for the calendar.
+
+The builder scans the ephemeris on a coarse grid, brackets every sign
+change and refines it by bisection (to about a second):
+
+- ingress:  a planet enters a sign (retrograde re-entries included)
+- station:  a planet turns retrograde or direct
+- lunation: new moon, first quarter, full moon, last quarter
+- aspect:   two planets reach an exact major aspect
+
+Events are written sorted by time as fixed 16 byte records after a small
+header. The file is memory-mapped and a date range is two binary searches
+on the time column, so a month view is a slice rather than a search.
+
+    python celestial_events.py build
+    python celestial_events.py query 2024-03-01 2024-03-31
+"""
+import argparse
+import datetime
+import os
+import struct
+import threading
+
+import numpy as np
+
+from aspects import MAJOR_ASPECTS
+from natal_chart import PLANETS, SIGNS
+
+DATA_DIR = os.environ.get('ASTRO_DATA_DIR',
+                          os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data'))
+DEFAULT_PATH = os.environ.get('EVENT_INDEX_PATH', os.path.join(DATA_DIR, 'celestial_events.bin'))
+
+# 1900-01-01 and 2100-01-01 00:00 UT, the Chebyshev file's range
+DEFAULT_START_JD = 2415020.5
+DEFAULT_END_JD = 2488069.5
+
+EVENT_TYPES = ['ingress', 'station', 'lunation', 'aspect']
+STATIONS = ['retrograde', 'direct']
+LUNATIONS = ['new_moon', 'first_quarter', 'full_moon', 'last_quarter']
+ASPECT_NAMES = list(MAJOR_ASPECTS)
+NO_BODY = 255
+
+# Sampling step in days, small enough that a body or pair cannot cross
+# the same boundary twice between samples
+_STEP = {'Moon': 0.25}
+_DEFAULT_STEP = 1.0
+_TOLERANCE_DAYS = 1e-5
+
+_MAGIC = b'EVTS'
+_VERSION = 1
+_HEADER = struct.Struct('<4sHHddQ')
+RECORD = np.dtype([('jd', '<f8'), ('type', 'u1'), ('body', 'u1'), ('other', 'u1'),
+                   ('detail', 'u1'), ('lon', '<f4')])
+
+# Julian day of the Unix epoch, for every julian day <-> datetime conversion
+UNIX_EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+UNIX_EPOCH_JD = 2440587.5
+
+
+def jd_to_iso(jd):
+    """UT julian day to an ISO timestamp rounded to the second"""
+    moment = UNIX_EPOCH + datetime.timedelta(days=float(jd) - UNIX_EPOCH_JD)
+    return (moment + datetime.timedelta(microseconds=500000)).replace(microsecond=0).isoformat()
+
+
+def iso_to_jd(moment):
+    """UT julian day of a timezone-aware datetime"""
+    return UNIX_EPOCH_JD + (moment - UNIX_EPOCH).total_seconds() / 86400.0
+
+
+def date_to_jd(date):
+    """Julian day of 00:00 UT on a date"""
+    return UNIX_EPOCH_JD + (date - UNIX_EPOCH.date()).days
+
+
+class EventIndex:
+    """Read-only view of an event index file"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            header = f.read(_HEADER.size)
+        magic, version, _, start_jd, end_jd, count = _HEADER.unpack(header)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError(f"{path} is not a version {_VERSION} event index")
+        self.start_jd = start_jd
+        self.end_jd = end_jd
+        self._records = np.memmap(path, dtype=RECORD, mode='r', offset=_HEADER.size, shape=(count,))
+        self._jd = self._records['jd']
+
+    def __len__(self):
+        return len(self._records)
+
+    def covers(self, start_jd, end_jd):
+        return self.start_jd <= start_jd and end_jd <= self.end_jd
+
+    def records(self, start_jd, end_jd):
+        """Raw records with start_jd <= jd < end_jd"""
+        lo, hi = np.searchsorted(self._jd, [start_jd, end_jd])
+        return self._records[lo:hi]
+
+    def query(self, start_jd, end_jd, types=None, bodies=None, limit=None):
+        """Event dicts in a time range, optionally filtered by type and body names"""
+        records = self.records(start_jd, end_jd)
+        if types:
+            records = records[np.isin(records['type'], [EVENT_TYPES.index(t) for t in types])]
+        if bodies:
+            ids = [PLANETS.index(b) for b in bodies]
+            records = records[np.isin(records['body'], ids) | np.isin(records['other'], ids)]
+        if limit is not None:
+            records = records[:limit]
+        return [describe(r) for r in records]
+
+    def next_event(self, jd, type_name, body=None, detail=None):
+        """First record of a type after jd (and before the end of the index), or None"""
+        position = int(np.searchsorted(self._jd, jd, side='right'))
+        type_id = EVENT_TYPES.index(type_name)
+        chunk = 4096
+        while position < len(self._records):
+            block = self._records[position:position + chunk]
+            mask = block['type'] == type_id
+            if body is not None:
+                mask &= block['body'] == PLANETS.index(body)
+            if detail is not None:
+                mask &= block['detail'] == detail
+            hits = np.nonzero(mask)[0]
+            if len(hits):
+                return block[hits[0]]
+            position += chunk
+        return None
+
+
+def describe(record):
+    """Client facing dict for one record"""
+    kind = EVENT_TYPES[record['type']]
+    event = {"time": jd_to_iso(record['jd']), "jd": round(float(record['jd']), 6), "type": kind,
+             "body": PLANETS[record['body']], "degree": round(float(record['lon']), 2) % 360.0}
+    if kind == 'ingress':
+        event["sign"] = SIGNS[record['detail']]
+    elif kind == 'station':
+        event["direction"] = STATIONS[record['detail']]
+    elif kind == 'lunation':
+        event["phase"] = LUNATIONS[record['detail']]
+        event["sign"] = SIGNS[int(record['lon'] // 30) % 12]
+    else:
+        event["other"] = PLANETS[record['other']]
+        event["aspect"] = ASPECT_NAMES[record['detail']]
+    return event
+
+
+# === Scanning === #
+
+class Sampler:
+    """Vectorized longitude and speed: Chebyshev file where it covers, Swiss Ephemeris otherwise"""
+
+    def __init__(self):
+        from chebyshev_ephemeris import _swisseph, get_ephemeris
+        self.ephemeris = get_ephemeris()
+        self.swe = None if self.ephemeris else _swisseph()
+
+    def _covered(self, jds):
+        return (self.ephemeris is not None and jds.size and self.ephemeris.covers(jds.min())
+                and self.ephemeris.covers(jds.max()))
+
+    def source(self, jds):
+        """Name of the ephemeris backend positions at these julian days come from"""
+        return 'chebyshev' if self._covered(np.asarray(jds, dtype=float)) else 'swisseph'
+
+    def __call__(self, body, jds):
+        jds = np.asarray(jds, dtype=float)
+        if self._covered(jds):
+            lon, _, speed = self.ephemeris.positions(body, jds)
+            return lon, speed
+        if self.swe is None:
+            from chebyshev_ephemeris import _swisseph
+            self.swe = _swisseph()
+        body_id = PLANETS.index(body)
+        values = np.array([self.swe.calc_ut(jd, body_id)[0] for jd in jds.ravel()]).reshape(jds.shape + (6,))
+        return values[..., 0], values[..., 3]
+
+
+def wrap(angle):
+    """Angle folded into [-180, 180) degrees"""
+    return (angle + 180.0) % 360.0 - 180.0
+
+
+def _crossings(values):
+    """Indices i where a wrapped function goes through zero between samples i and i + 1"""
+    a, b = values[:-1], values[1:]
+    # A jump across +-180 is a wrap, not a root
+    return np.nonzero((np.sign(a) != np.sign(b)) & (np.abs(a - b) < 180.0) & (a != 0))[0]
+
+
+def _bisect(function, lo, hi):
+    """Vectorized bisection of function(jds) on brackets [lo, hi] with a sign change"""
+    f_lo = function(lo)
+    while np.max(hi - lo) > _TOLERANCE_DAYS:
+        mid = (lo + hi) / 2.0
+        f_mid = function(mid)
+        left = np.sign(f_mid) == np.sign(f_lo)
+        lo = np.where(left, mid, lo)
+        f_lo = np.where(left, f_mid, f_lo)
+        hi = np.where(left, hi, mid)
+    return (lo + hi) / 2.0
+
+
+def _records(jd, type_name, body, other, detail, lon):
+    records = np.zeros(len(jd), dtype=RECORD)
+    records['jd'] = jd
+    records['type'] = EVENT_TYPES.index(type_name)
+    records['body'] = body
+    records['other'] = other
+    records['detail'] = detail
+    records['lon'] = lon
+    return records
+
+
+def _grid(start_jd, end_jd, step):
+    """Sample times from start_jd up to just before end_jd, inside the ephemeris range"""
+    return np.append(np.arange(start_jd, end_jd, step), end_jd - _TOLERANCE_DAYS)
+
+
+def scan_body(sample, body, start_jd, end_jd):
+    """Ingress and station records of one body between two julian days"""
+    jds = _grid(start_jd, end_jd, _STEP.get(body, _DEFAULT_STEP))
+    lon, speed = sample(body, jds)
+    body_id = PLANETS.index(body)
+    found = []
+
+    # Ingresses: the sign index changes between samples; the boundary is
+    # the new sign's start going forward, the old sign's start going back
+    sign_index = (lon // 30.0).astype(int) % 12
+    changed = np.nonzero(sign_index[1:] != sign_index[:-1])[0]
+    if len(changed):
+        before, after = sign_index[changed], sign_index[changed + 1]
+        forward = (after - before) % 12 == 1
+        edge = np.where(forward, after, before) * 30.0
+        exact = _bisect(lambda t: wrap(sample(body, t)[0] - edge), jds[changed], jds[changed + 1])
+        found.append(_records(exact, 'ingress', body_id, NO_BODY, after, sample(body, exact)[0]))
+
+    # Stations: longitude speed changes sign
+    if body not in ('Sun', 'Moon'):
+        turns = np.nonzero(np.sign(speed[1:]) != np.sign(speed[:-1]))[0]
+        if len(turns):
+            exact = _bisect(lambda t: sample(body, t)[1], jds[turns], jds[turns + 1])
+            lon_exact = sample(body, exact)[0]
+            direction = np.where(speed[turns] > 0, 0, 1)
+            found.append(_records(exact, 'station', body_id, NO_BODY, direction, lon_exact))
+    return found
+
+
+def scan_pair(sample, first, second, start_jd, end_jd):
+    """Aspect and lunation records between two bodies between two julian days"""
+    jds = _grid(start_jd, end_jd, min(_STEP.get(first, _DEFAULT_STEP), _STEP.get(second, _DEFAULT_STEP)))
+    lon_a = sample(first, jds)[0]
+    lon_b = sample(second, jds)[0]
+    difference = wrap(lon_b - lon_a)
+    found = []
+    lunation = first == 'Sun' and second == 'Moon'
+    for index, (name, (angle, _)) in enumerate(MAJOR_ASPECTS.items()):
+        for target in {angle, -angle} if 0 < angle < 180 else {angle}:
+            values = wrap(difference - target)
+            hits = _crossings(values)
+            if not len(hits):
+                continue
+            exact = _bisect(lambda t, a=target: wrap(sample(second, t)[0] - sample(first, t)[0] - a),
+                            jds[hits], jds[hits + 1])
+            lon_exact = sample(first, exact)[0]
+            found.append(_records(exact, 'aspect', PLANETS.index(first), PLANETS.index(second),
+                                  index, lon_exact))
+            if lunation and angle in (0.0, 90.0, 180.0):
+                # Moon - Sun elongation: 0 new, 90 first quarter, 180 full, 270 last quarter
+                phase = {0.0: 0, 90.0: 1, 180.0: 2, -90.0: 3}[target]
+                found.append(_records(exact, 'lunation', PLANETS.index('Moon'), NO_BODY, phase,
+                                      sample('Moon', exact)[0]))
+    return found
+
+
+# === Per-process instance === #
+
+_index = None
+_index_lock = threading.Lock()
+_sampler = None
+_sampler_lock = threading.Lock()
+
+
+def get_event_index(path=None):
+    """Load the index file once per process, None if it has not been built"""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                path = path or DEFAULT_PATH
+                if not os.path.exists(path):
+                    return None
+                _index = EventIndex(path)
+    return _index
+
+
+def get_sampler():
+    """One Sampler per process, shared by every module that scans or refines positions"""
+    global _sampler
+    if _sampler is None:
+        with _sampler_lock:
+            if _sampler is None:
+                _sampler = Sampler()
+    return _sampler
+
+
+# === Builder === #
+
+def build(path=DEFAULT_PATH, start_jd=DEFAULT_START_JD, end_jd=DEFAULT_END_JD):
+    """Scan the ephemeris for every event type and write the sorted index file"""
+    sample = Sampler()
+    found = []
+    for body in PLANETS:
+        found += scan_body(sample, body, start_jd, end_jd)
+    for i, first in enumerate(PLANETS):
+        for second in PLANETS[i + 1:]:
+            found += scan_pair(sample, first, second, start_jd, end_jd)
+
+    records = np.concatenate(found) if found else np.zeros(0, dtype=RECORD)
+    records = records[(records['jd'] >= start_jd) & (records['jd'] < end_jd)]
+    records = records[np.argsort(records['jd'], kind='stable')]
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(_HEADER.pack(_MAGIC, _VERSION, 0, start_jd, end_jd, len(records)))
+        f.write(records.tobytes())
+    os.replace(tmp_path, path)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Celestial event index")
+    sub = parser.add_subparsers(dest='command', required=True)
+    build_cmd = sub.add_parser('build', help="scan the ephemeris and write the index")
+    build_cmd.add_argument('--output', default=DEFAULT_PATH)
+    build_cmd.add_argument('--start-jd', type=float, default=DEFAULT_START_JD)
+    build_cmd.add_argument('--end-jd', type=float, default=DEFAULT_END_JD)
+    query_cmd = sub.add_parser('query', help="list events between two UTC dates")
+    query_cmd.add_argument('start')
+    query_cmd.add_argument('end')
+    query_cmd.add_argument('--path', default=DEFAULT_PATH)
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        path = build(args.output, args.start_jd, args.end_jd)
+        print(f"Wrote {path} ({len(EventIndex(path))} events, {os.path.getsize(path) / 1e6:.1f} MB)")
+    else:
+        index = EventIndex(args.path)
+        start, end = (datetime.datetime.fromisoformat(d).replace(tzinfo=datetime.timezone.utc)
+                      for d in (args.start, args.end))
+        for event in index.query(iso_to_jd(start), iso_to_jd(end)):
+            print(event)
+
+
+if __name__ == '__main__':
+    main()
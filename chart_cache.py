@@ -0,0 +1,106 @@
+"""
+Bounded in-process LRU cache for computed charts.
+
+Charts are content-addressed: the key is a hash of the normalized birth
+inputs, so "1990-05-15 14:30" and "1990/05/15 14:30:00" share an entry and
+coordinates that differ below the configured precision do too.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+def _normalize_date(date_str):
+    parts = str(date_str).strip().replace('/', '-').split('-')
+    try:
+        year, month, day = (int(p) for p in parts)
+    except ValueError:
+        return str(date_str).strip()
+    return f"{year:04d}-{month:02d}-{day:02d}"
+
+
+def _normalize_time(time_str):
+    parts = str(time_str).strip().split(':')
+    try:
+        values = [int(p) for p in parts] + [0] * (3 - len(parts))
+    except ValueError:
+        return str(time_str).strip()
+    return "{:02d}:{:02d}:{:02d}".format(*values[:3])
+
+
+def chart_fingerprint(birth, utc_offset, precision=4, extra=None):
+    """Stable hash of normalized date, time, UTC offset and rounded lat/lon"""
+    lat = round(float(birth['latitude']), precision) + 0.0
+    lon = round(float(birth['longitude']), precision) + 0.0
+    canonical = "|".join([
+        _normalize_date(birth['date']),
+        _normalize_time(birth['time']),
+        str(utc_offset),
+        f"{lat:.{precision}f}",
+        f"{lon:.{precision}f}",
+        str(extra or ''),
+    ])
+    return hashlib.blake2b(canonical.encode('utf-8'), digest_size=12).hexdigest()
+
+
+class ChartCache:
+    """Thread-safe LRU cache with hit/miss/eviction counters"""
+
+    def __init__(self, max_entries=4096, precision=4):
+        self.max_entries = max(0, int(max_entries))
+        self.precision = int(precision)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def key(self, birth, utc_offset, extra=None):
+        """Cache key for parsed birth data at this cache's coordinate precision"""
+        return chart_fingerprint(birth, utc_offset, self.precision, extra)
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        if self.max_entries == 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(self, key, compute):
+        """Return the cached value for key, computing and storing it on a miss"""
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+"""
+Compatibility ranking of one chart against every stored profile.
+
+Stored charts live in one contiguous float32 matrix (profiles x points,
+the synastry points), so ranking is a handful of array passes over that
+matrix followed by argpartition for the top k; no per-profile Python.
+
+Scoring is the /synastry score. Orbs of the aspect set must not overlap,
+which lets the aspect for a separation come from a per-degree lookup table
+instead of testing every aspect angle, and the matrix is scored in blocks
+that stay in cache.
+
+Profile changes are appended to a log file shared by all gunicorn
+workers: each worker replays the records it has not seen before a query,
+so updates are incremental and visible everywhere. When the log holds
+mostly superseded records it is rewritten with the live profiles only.
+Appends, replays and rewrites serialize on a flock of a separate .lock
+file, which compaction never replaces.
+
+    python compatibility_index.py stats
+    python compatibility_index.py compact
+"""
+import argparse
+import os
+import threading
+
+import numpy as np
+
+from aspects import AspectSet
+from synastry import ASPECT_HARMONY, PAIR_WEIGHTS, POINTS, SYNASTRY_ORB_FACTOR
+
+try:
+    import fcntl
+except ImportError:  # Windows development machines, single process there
+    fcntl = None
+
+DATA_DIR = os.environ.get('ASTRO_DATA_DIR',
+                          os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data'))
+DEFAULT_PATH = os.environ.get('COMPATIBILITY_INDEX_PATH', os.path.join(DATA_DIR, 'compatibility_index.bin'))
+
+MAX_ID_LENGTH = 47
+_UPSERT, _REMOVE = 0, 1
+RECORD = np.dtype([('id', f'S{MAX_ID_LENGTH}'), ('op', 'u1'), ('lon', '<f4', (len(POINTS),))])
+
+# Rows scored together: a block's (rows, points, points) temporaries fit in L2
+_BLOCK_ROWS = 4096
+# Rewrite the log once it is this many times longer than the live profiles
+_COMPACT_RATIO = 4
+_COMPACT_MIN_RECORDS = 10000
+
+
+class CompatibilityIndex:
+    """Profiles x points longitude matrix with top-k compatibility queries
+
+    path is the shared log file; None keeps the index in memory only.
+    """
+
+    def __init__(self, path=None, aspects=None, capacity=1024):
+        self.aspects = aspects or AspectSet(orb_factor=SYNASTRY_ORB_FACTOR)
+        self._tables = _lookup_tables(self.aspects)
+        self._weights = PAIR_WEIGHTS.astype(np.float32).ravel()
+        self.path = path
+        self._lock = threading.RLock()
+        self._reset(capacity)
+
+    def _reset(self, capacity=1024):
+        self._matrix = np.zeros((capacity, len(POINTS)), dtype=np.float32)
+        self._ids = []
+        self._rows = {}
+        self._offset = 0
+        self._inode = None
+        self._log_records = 0
+
+    def __len__(self):
+        with self._lock:
+            self.sync()
+            return len(self._ids)
+
+    # --- updates --- #
+
+    def upsert(self, profiles):
+        """Store or replace profiles given as (id, longitudes) pairs"""
+        records = np.zeros(len(profiles), dtype=RECORD)
+        for i, (profile_id, longitudes) in enumerate(profiles):
+            records[i]['id'] = _encode_id(profile_id)
+            records[i]['lon'] = np.asarray(longitudes, dtype=np.float32) % 360.0
+        self._write(records)
+
+    def remove(self, profile_id):
+        """Drop a profile, False if it was not stored"""
+        with self._lock:
+            self.sync()
+            if _encode_id(profile_id) not in self._rows:
+                return False
+            records = np.zeros(1, dtype=RECORD)
+            records[0]['id'] = _encode_id(profile_id)
+            records[0]['op'] = _REMOVE
+            self._write(records)
+            return True
+
+    def longitudes(self, profile_id):
+        with self._lock:
+            self.sync()
+            row = self._rows.get(_encode_id(profile_id))
+            return None if row is None else self._matrix[row].copy()
+
+    def _write(self, records):
+        with self._lock:
+            if self.path is None:
+                self._apply(records)
+                return
+            with self._log_lock(exclusive=True):
+                with open(self.path, 'ab') as f:
+                    f.write(records.tobytes())
+                self._replay()
+            if self._log_records > max(_COMPACT_MIN_RECORDS, _COMPACT_RATIO * len(self._ids)):
+                self.compact()
+
+    def _apply(self, records):
+        for record in records:
+            key = bytes(record['id'])
+            row = self._rows.get(key)
+            if record['op'] == _UPSERT:
+                if row is None:
+                    row = len(self._ids)
+                    if row == len(self._matrix):
+                        self._matrix = np.concatenate([self._matrix, np.zeros_like(self._matrix)])
+                    self._ids.append(key)
+                    self._rows[key] = row
+                self._matrix[row] = record['lon']
+            elif row is not None:
+                # Keep the matrix dense: the last row moves into the hole
+                last = len(self._ids) - 1
+                moved = self._ids[last]
+                self._matrix[row] = self._matrix[last]
+                self._ids[row] = moved
+                self._rows[moved] = row
+                self._ids.pop()
+                del self._rows[key]
+        self._log_records += len(records)
+
+    def _log_lock(self, exclusive):
+        """flock on a .lock file next to the log
+
+        The log itself is replaced by compaction, so a lock taken on it
+        could be held on the old inode while records go nowhere.
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        return _FileLock(self.path + '.lock', exclusive)
+
+    def sync(self):
+        """Apply log records written since the last call, by any process"""
+        if self.path is None:
+            return
+        with self._lock:
+            with self._log_lock(exclusive=False):
+                self._replay()
+
+    def _replay(self):
+        """sync() body, the caller holds the log lock"""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            if self._inode is not None:
+                self._reset()
+            return
+        if stat.st_ino != self._inode or stat.st_size < self._offset:
+            # First load, or the log was compacted by another worker
+            self._reset(max(1024, stat.st_size // RECORD.itemsize))
+            self._inode = stat.st_ino
+        count = (stat.st_size - self._offset) // RECORD.itemsize
+        if count <= 0:
+            return
+        with open(self.path, 'rb') as f:
+            f.seek(self._offset)
+            records = np.frombuffer(f.read(count * RECORD.itemsize), dtype=RECORD)
+        self._apply(records)
+        self._offset += len(records) * RECORD.itemsize
+
+    def compact(self):
+        """Rewrite the log with one record per live profile"""
+        if self.path is None:
+            return
+        with self._lock:
+            with self._log_lock(exclusive=True):
+                self._replay()
+                records = np.zeros(len(self._ids), dtype=RECORD)
+                records['id'] = self._ids
+                records['lon'] = self._matrix[:len(self._ids)]
+                tmp_path = self.path + '.tmp'
+                with open(tmp_path, 'wb') as f:
+                    f.write(records.tobytes())
+                os.replace(tmp_path, self.path)
+                self._reset(len(self._matrix))
+                self._replay()
+
+    # --- queries --- #
+
+    def scores(self, longitudes):
+        """(score, harmony, tension) arrays over all stored profiles, in row order"""
+        with self._lock:
+            self.sync()
+            matrix = self._matrix[:len(self._ids)]
+            person = np.asarray(longitudes, dtype=np.float32) % 360.0
+            harmony = np.empty(len(matrix), dtype=np.float32)
+            net = np.empty(len(matrix), dtype=np.float32)
+            rows = min(_BLOCK_ROWS, len(matrix))
+            buffers = (np.empty((rows, len(POINTS), len(POINTS)), dtype=np.float32),
+                       np.empty((rows, len(POINTS) ** 2), dtype=np.float32))
+            for start in range(0, len(matrix), _BLOCK_ROWS):
+                block = slice(start, start + _BLOCK_ROWS)
+                harmony[block], net[block] = self._score_block(matrix[block], person, buffers)
+        tension = harmony - net
+        total = harmony + tension
+        score = np.where(total > 0, 100.0 * harmony / np.where(total > 0, total, 1.0), 50.0)
+        return score, harmony, tension
+
+    def _score_block(self, block, person, buffers):
+        """Harmony and net (harmony - tension) of a block of stored charts"""
+        intercept, slope, value = self._tables
+        rows = len(block)
+        # (rows, other point, person point) separations in [0, 180]
+        separation, scratch = buffers[0][:rows], buffers[1][:rows]
+        np.subtract(block[:, :, None], person, out=separation)
+        np.abs(separation, out=separation)
+        separation = separation.reshape(rows, -1)
+        np.subtract(360.0, separation, out=scratch)
+        np.minimum(separation, scratch, out=separation)
+
+        # Exactness is linear in the separation within a degree bin
+        bins = separation.astype(np.intp)
+        exactness = np.take(slope, bins)
+        exactness *= separation
+        exactness += np.take(intercept, bins)
+        np.maximum(exactness, 0.0, out=exactness)
+        exactness *= np.take(value, bins)
+        net = exactness @ self._weights
+        np.maximum(exactness, 0.0, out=exactness)
+        return exactness @ self._weights, net
+
+    def rank(self, longitudes, k=20, exclude=()):
+        """Top k profiles as (id, score, harmony, tension), best first"""
+        with self._lock:
+            score, harmony, tension = self.scores(longitudes)
+            ids = list(self._ids)
+            rows = [self._rows[key] for key in map(_encode_id, exclude) if key in self._rows]
+        ranked = score.astype(np.float64)
+        ranked[rows] = -np.inf
+        k = min(k, len(ranked) - len(rows))
+        if k <= 0:
+            return []
+        top = np.argpartition(-ranked, k - 1)[:k]
+        top = top[np.argsort(-ranked[top], kind='stable')]
+        return [(ids[i].decode(), float(score[i]), float(harmony[i]), float(tension[i])) for i in top]
+
+    def stats(self):
+        with self._lock:
+            self.sync()
+            return {"profiles": len(self._ids), "log_records": self._log_records,
+                    "capacity": len(self._matrix), "path": self.path}
+
+
+def _encode_id(profile_id):
+    key = str(profile_id).encode('utf-8')
+    if not key or len(key) > MAX_ID_LENGTH:
+        raise ValueError(f"Profile ids must be 1 to {MAX_ID_LENGTH} bytes")
+    return key
+
+
+class _FileLock:
+    """Context manager holding a shared or exclusive flock on a file"""
+
+    def __init__(self, path, exclusive):
+        self.path = path
+        self.exclusive = exclusive
+        self._file = None
+
+    def __enter__(self):
+        self._file = open(self.path, 'ab')
+        if fcntl is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX if self.exclusive else fcntl.LOCK_SH)
+        return self
+
+    def __exit__(self, *exc):
+        # Closing the file releases the flock
+        self._file.close()
+        self._file = None
+
+
+def _lookup_tables(aspects):
+    """Per whole degree of separation: exactness as intercept + slope * separation, and harmony
+
+    Aspect angles must be whole degrees, so a bin lies on one side of its
+    angle, and neighbouring orbs at least a degree apart, so a bin never
+    touches two of them; the table is then exact.
+    """
+    order = np.argsort(aspects.angles)
+    angles, orbs = aspects.angles[order], aspects.orbs[order]
+    if np.any(angles != np.round(angles)) or np.any(np.diff(angles) - orbs[1:] - orbs[:-1] < 1.0):
+        raise ValueError("Compatibility ranking needs whole degree aspect angles and orbs a degree apart")
+    harmony = np.array([ASPECT_HARMONY.get(aspects.names[i], 0.0) for i in order])
+
+    bins = np.arange(181)
+    touches = (angles - orbs <= bins[:, None] + 1) & (angles + orbs >= bins[:, None])
+    in_orb = touches.any(axis=1)
+    choice = np.argmax(touches, axis=1)
+    angle, inverse_orb = angles[choice], 1.0 / orbs[choice]
+    # 1 - |s - angle| / orb with the sign of s - angle fixed for the bin
+    side = np.where(bins >= angle, 1.0, -1.0)
+    intercept = 1.0 + side * angle * inverse_orb
+    slope = -side * inverse_orb
+    # Bins out of every orb contribute nothing
+    value = np.where(in_orb, harmony[choice], 0.0)
+    return intercept.astype(np.float32), slope.astype(np.float32), value.astype(np.float32)
+
+
+# === Per-process instance === #
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_compatibility_index(path=None):
+    """The shared profile index of this worker, synced from the log on use"""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = CompatibilityIndex(path or DEFAULT_PATH)
+    return _index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compatibility profile index")
+    parser.add_argument('command', choices=['stats', 'compact'])
+    parser.add_argument('--path', default=DEFAULT_PATH)
+    args = parser.parse_args()
+    index = CompatibilityIndex(args.path)
+    if args.command == 'compact':
+        index.compact()
+    print(index.stats())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,207 @@
+"""
+Electional search: time windows in a date range where every constraint
+holds, e.g. Moon not void of course, Venus direct and Jupiter trine the
+natal Sun.
+
+Positions of the bodies the constraints mention are sampled once on a
+regular grid over the whole range (one vectorized Chebyshev lookup per
+body), each constraint is a vectorized predicate over those arrays and
+the windows are the runs where all of them hold. Window edges are then
+refined by bisection, all edges of the search together, to
+EDGE_TOLERANCE_MINUTES. Void-of-course intervals come from the Moon
+timetable, or from a scan of the range when the timetable does not
+cover it.
+
+Windows are ranked by how exact their aspect constraints get (the best
+moment of the window), then by length.
+"""
+import numpy as np
+
+from aspects import MAJOR_ASPECTS, MINOR_ASPECTS, TRANSIT_ORB_FACTOR, parse_orb
+from celestial_events import get_sampler, jd_to_iso
+from moon_timetable import scan_periods
+from natal_chart import PLANETS, SIGNS
+
+CONSTRAINT_TYPES = ('moon_not_void', 'direct', 'retrograde', 'sign', 'aspect')
+# The Sun and Moon are never retrograde
+MOVING_BODIES = [p for p in PLANETS if p not in ('Sun', 'Moon')]
+
+EDGE_TOLERANCE_MINUTES = 1.0
+
+class Positions:
+    """Longitude and speed of bodies at fixed julian days, each body sampled once"""
+
+    def __init__(self, jds):
+        self.jds = np.asarray(jds, dtype=float)
+        self._bodies = {}
+
+    def __call__(self, body):
+        if body not in self._bodies:
+            self._bodies[body] = get_sampler()(body, self.jds)
+        return self._bodies[body]
+
+
+class Constraint:
+    """One condition of an election, evaluated for all instants of a Positions at once"""
+
+    def __init__(self, kind, body=None, signs=None, angle=None, orb=None, target=None, description=None):
+        self.kind = kind
+        self.body = body
+        self.signs = signs
+        self.angle = angle
+        self.orb = orb
+        self.target = target
+        self.description = description
+        self.void_intervals = None
+
+    def evaluate(self, positions):
+        """(holds, exactness) arrays; exactness is 1 except for aspects"""
+        jds = positions.jds
+        exactness = np.ones(jds.shape)
+        if self.kind == 'moon_not_void':
+            starts, ends = self.void_intervals
+            index = np.searchsorted(starts, jds, side='right') - 1
+            void = (index >= 0) & (jds < ends[np.maximum(index, 0)])
+            return ~void, exactness
+        lon, speed = positions(self.body)
+        if self.kind == 'direct':
+            return speed > 0, exactness
+        if self.kind == 'retrograde':
+            return speed < 0, exactness
+        if self.kind == 'sign':
+            return np.isin((lon % 360.0 // 30).astype(int), self.signs), exactness
+        separation = np.abs((lon - self.target + 180.0) % 360.0 - 180.0)
+        deviation = np.abs(separation - self.angle)
+        return deviation <= self.orb, np.clip(1.0 - deviation / self.orb, 0.0, 1.0)
+
+
+def parse_constraints(specs, natal_points=None):
+    """Constraints from request dicts
+
+    {"type": "moon_not_void"}, {"type": "direct", "body": "Venus"},
+    {"type": "retrograde", "body": "Mercury"},
+    {"type": "sign", "body": "Moon", "signs": ["Taurus", "Cancer"]},
+    {"type": "aspect", "body": "Jupiter", "aspect": "trine", "natal": "Sun", "orb": 3}.
+    natal_points maps point names to natal longitudes for aspect constraints.
+    """
+    if not isinstance(specs, list) or not specs:
+        raise ValueError("A non-empty 'constraints' list is required")
+    constraints = []
+    for spec in specs:
+        if not isinstance(spec, dict) or spec.get('type') not in CONSTRAINT_TYPES:
+            raise ValueError(f"Every constraint needs a 'type', one of {list(CONSTRAINT_TYPES)}")
+        kind, body = spec['type'], spec.get('body')
+        if kind == 'moon_not_void':
+            constraints.append(Constraint(kind, description="Moon not void of course"))
+            continue
+        bodies = MOVING_BODIES if kind in ('direct', 'retrograde') else PLANETS
+        if body not in bodies:
+            raise ValueError(f"'{kind}' constraints need a 'body', one of {bodies}")
+        if kind in ('direct', 'retrograde'):
+            constraints.append(Constraint(kind, body, description=f"{body} {kind}"))
+        elif kind == 'sign':
+            signs = spec.get('signs')
+            if isinstance(signs, str):
+                signs = [signs]
+            if not signs or not all(s in SIGNS for s in signs):
+                raise ValueError(f"'sign' constraints need 'signs' from {SIGNS}")
+            constraints.append(Constraint(kind, body, signs=[SIGNS.index(s) for s in signs],
+                                          description=f"{body} in {', '.join(signs)}"))
+        else:
+            constraints.append(_aspect_constraint(spec, body, natal_points))
+    return constraints
+
+
+def _aspect_constraint(spec, body, natal_points):
+    known = dict(MAJOR_ASPECTS, **MINOR_ASPECTS)
+    name = spec.get('aspect')
+    if name not in known:
+        raise ValueError(f"'aspect' constraints need an 'aspect', one of {sorted(known)}")
+    point = spec.get('natal')
+    if natal_points is None:
+        raise ValueError("'aspect' constraints need the birth data in 'natal_chart'")
+    if point not in natal_points:
+        raise ValueError(f"'natal' must be one of {list(natal_points)}")
+    angle, default_orb = known[name]
+    # An explicit 0 is out of range, not a request for the default
+    orb = default_orb * TRANSIT_ORB_FACTOR if spec.get('orb') is None else parse_orb(spec['orb'], name)
+    return Constraint('aspect', body, angle=angle, orb=orb, target=float(natal_points[point]),
+                      description=f"{body} {name} natal {point}")
+
+
+def void_intervals(start_jd, end_jd, timetable=None):
+    """(starts, ends) of the void-of-course periods overlapping a range"""
+    if timetable is not None and timetable.covers(start_jd, end_jd):
+        records = timetable.records(start_jd, end_jd)
+    else:
+        # A Moon sign stay is under three days, the first ingress is inside the scan
+        records = scan_periods(get_sampler(), start_jd - 3.0, end_jd + 3.0)
+    starts = np.where(np.isnan(records['last_aspect']), records['ingress'], records['last_aspect'])
+    return starts.astype(float), records['next_ingress'].astype(float)
+
+
+def evaluate(constraints, jds):
+    """Whether all constraints hold and the mean aspect exactness at each instant"""
+    positions = Positions(jds)
+    holds = np.ones(positions.jds.shape, dtype=bool)
+    exactness, aspects = np.zeros(positions.jds.shape), 0
+    for constraint in constraints:
+        ok, quality = constraint.evaluate(positions)
+        holds &= ok
+        if constraint.kind == 'aspect':
+            exactness += quality
+            aspects += 1
+    return holds, (exactness / aspects if aspects else np.ones(positions.jds.shape))
+
+
+def _refine_edges(constraints, lo, hi):
+    """Vectorized bisection of the instants where the constraints switch between lo and hi"""
+    lo, hi = np.array(lo, dtype=float), np.array(hi, dtype=float)
+    if not len(lo):
+        return lo
+    state_lo = evaluate(constraints, lo)[0]
+    while np.max(hi - lo) * 1440.0 > EDGE_TOLERANCE_MINUTES:
+        mid = (lo + hi) / 2.0
+        same = evaluate(constraints, mid)[0] == state_lo
+        lo = np.where(same, mid, lo)
+        hi = np.where(same, hi, mid)
+    return (lo + hi) / 2.0
+
+
+def search_windows(constraints, start_jd, end_jd, step_minutes=60, min_hours=0.0, limit=10, timetable=None):
+    """Ranked windows in [start_jd, end_jd] where every constraint holds"""
+    if any(c.kind == 'moon_not_void' for c in constraints):
+        intervals = void_intervals(start_jd, end_jd, timetable)
+        for constraint in constraints:
+            if constraint.kind == 'moon_not_void':
+                constraint.void_intervals = intervals
+
+    grid = np.arange(start_jd, end_jd, step_minutes / 1440.0)
+    grid = np.append(grid, end_jd)
+    holds, exactness = evaluate(constraints, grid)
+
+    # Runs of holding grid points, [first, last] indices
+    edges = np.diff(np.concatenate([[0], holds.astype(np.int8), [0]]))
+    firsts, lasts = np.nonzero(edges == 1)[0], np.nonzero(edges == -1)[0] - 1
+    opened = firsts > 0
+    closed = lasts < len(grid) - 1
+    starts = grid[firsts].copy()
+    ends = grid[lasts].copy()
+    starts[opened] = _refine_edges(constraints, grid[firsts[opened] - 1], grid[firsts[opened]])
+    ends[closed] = _refine_edges(constraints, grid[lasts[closed]], grid[lasts[closed] + 1])
+
+    windows = []
+    for first, last, start, end in zip(firsts, lasts, starts, ends):
+        hours = (end - start) * 24.0
+        if hours < min_hours:
+            continue
+        best = first + int(np.argmax(exactness[first:last + 1]))
+        windows.append({
+            "start": jd_to_iso(start),
+            "end": jd_to_iso(end),
+            "hours": round(float(hours), 2),
+            "best_moment": jd_to_iso(grid[best]),
+            "score": round(float(exactness[best]), 3),
+        })
+    windows.sort(key=lambda w: (-w["score"], -w["hours"]))
+    return windows[:limit], len(windows)
@@ -0,0 +1,190 @@
+"""
+Ephemeris providers used by the chart endpoints.
+
+Every backend answers the same two questions for a UT julian day: where
+are the requested bodies (longitude, latitude, longitude speed) and where
+are the angles for a location. The natal endpoint picks one by name
+(EPHEMERIS_BACKEND):
+
+- flatlib:   the original path, a full flatlib Chart per call
+- swisseph:  direct pyswisseph calls for only the requested bodies
+- chebyshev: planets from the precomputed Chebyshev file, angles from
+             pyswisseph; falls back to swisseph outside the file's range
+"""
+import threading
+
+# Swiss Ephemeris body ids, the same mapping flatlib uses
+SWE_IDS = {
+    'Sun': 0,
+    'Moon': 1,
+    'Mercury': 2,
+    'Venus': 3,
+    'Mars': 4,
+    'Jupiter': 5,
+    'Saturn': 6,
+}
+
+# Opt-in bodies of the extended chart, ids as in flatlib (mean lunar node)
+EXTENDED_IDS = {
+    'Uranus': 7,
+    'Neptune': 8,
+    'Pluto': 9,
+    'North Node': 10,
+    'Chiron': 15,
+}
+
+BODY_IDS = dict(SWE_IDS, **EXTENDED_IDS)
+
+# flatlib's default house system (Alcabitus), so cusps match the flatlib path
+HOUSE_SYSTEM = b'B'
+
+
+def _hours(value):
+    """'HH:MM[:SS]' or '+HH:MM' to float hours, read the way flatlib does"""
+    if isinstance(value, (int, float)):
+        return float(value)
+    value = str(value).strip()
+    sign = -1.0 if value.startswith('-') else 1.0
+    parts = [abs(int(p)) for p in value.lstrip('+-').split(':')]
+    return sign * sum(v / 60 ** i for i, v in enumerate(parts))
+
+
+def julian_day(date_str, time_str, utc_offset):
+    """UT julian day for a local date, time and UTC offset (flatlib Datetime.jd)"""
+    year, month, day = (int(v) for v in str(date_str).strip().replace('-', '/').split('/'))
+    a = (14 - month) // 12
+    y = year + 4800 - a
+    m = month + 12 * a - 3
+    jdn = day + (153 * m + 2) // 5 + 365 * y + y // 4 - y // 100 + y // 400 - 32045
+    return jdn + _hours(time_str) / 24.0 - _hours(utc_offset) / 24.0 - 0.5
+
+
+class EphemerisBackend:
+    """Interface for chart position providers"""
+
+    name = None
+    # Label reported as calculation_method in API responses
+    method = None
+
+    def planets(self, jd, bodies):
+        """{body: {'lon', 'lat', 'speed'}} for the given UT julian day"""
+        raise NotImplementedError
+
+    def angles(self, jd, lat, lon):
+        """{'Asc': lon, 'MC': lon, 'cusps': [12 house cusps]} for the given UT julian day and location"""
+        raise NotImplementedError
+
+    def chart(self, jd, lat, lon, bodies):
+        """Planets and angles together, backends may share work between them"""
+        return self.planets(jd, bodies), self.angles(jd, lat, lon)
+
+
+class FlatlibBackend(EphemerisBackend):
+    """Builds a flatlib Chart, as natal() always did"""
+
+    name = 'flatlib'
+    method = 'flatlib Swiss Ephemeris'
+
+    def _chart(self, jd, lat, lon, bodies):
+        from flatlib.chart import Chart
+        from flatlib.datetime import Datetime
+        from flatlib.geopos import GeoPos
+        return Chart(Datetime.fromJD(jd, '+00:00'), GeoPos(lat, lon), IDs=list(bodies))
+
+    def planets(self, jd, bodies):
+        return self.chart(jd, 0.0, 0.0, bodies)[0]
+
+    def angles(self, jd, lat, lon):
+        return self.chart(jd, lat, lon, [])[1]
+
+    def chart(self, jd, lat, lon, bodies):
+        chart = self._chart(jd, lat, lon, bodies)
+        planets = {}
+        for body in bodies:
+            obj = chart.get(body)
+            planets[body] = {'lon': obj.lon, 'lat': obj.lat, 'speed': obj.lonspeed}
+        angles = {'Asc': chart.get('Asc').lon, 'MC': chart.get('MC').lon,
+                  'cusps': [chart.get(f'House{i}').lon for i in range(1, 13)]}
+        return planets, angles
+
+
+class SwissEphBackend(EphemerisBackend):
+    """Calls pyswisseph directly for only the requested bodies"""
+
+    name = 'swisseph'
+    method = 'pyswisseph Swiss Ephemeris'
+
+    def __init__(self):
+        import flatlib
+        import swisseph
+        # Same ephemeris files as flatlib so both backends agree
+        swisseph.set_ephe_path(flatlib.PATH_RES + 'swefiles')
+        self.swe = swisseph
+
+    def planets(self, jd, bodies):
+        calc_ut = self.swe.calc_ut
+        planets = {}
+        for body in bodies:
+            values = calc_ut(jd, BODY_IDS[body])[0]
+            planets[body] = {'lon': values[0], 'lat': values[1], 'speed': values[3]}
+        return planets
+
+    def angles(self, jd, lat, lon):
+        # One call gives the cusps and the angles together
+        cusps, ascmc = self.swe.houses(jd, lat, lon, HOUSE_SYSTEM)
+        return {'Asc': ascmc[0], 'MC': ascmc[1], 'cusps': list(cusps[:12])}
+
+
+class ChebyshevBackend(SwissEphBackend):
+    """Planets from the Chebyshev file, angles from pyswisseph"""
+
+    name = 'chebyshev'
+    method = 'Chebyshev fit of Swiss Ephemeris'
+
+    def __init__(self):
+        super().__init__()
+        from chebyshev_ephemeris import get_ephemeris
+        self.ephemeris = get_ephemeris()
+
+    def planets(self, jd, bodies):
+        ephemeris = self.ephemeris
+        if ephemeris is None or not ephemeris.covers(jd):
+            return super().planets(jd, bodies)
+        fitted = [body for body in bodies if body in ephemeris.bodies]
+        # Bodies outside the file (the extended set) come from pyswisseph
+        planets = super().planets(jd, [body for body in bodies if body not in fitted])
+        for body in fitted:
+            lon, lat, speed = ephemeris.position(body, jd)
+            planets[body] = {'lon': lon, 'lat': lat, 'speed': speed}
+        return planets
+
+
+BACKENDS = {
+    FlatlibBackend.name: FlatlibBackend,
+    SwissEphBackend.name: SwissEphBackend,
+    ChebyshevBackend.name: ChebyshevBackend,
+}
+
+
+def calculation_method(name):
+    """calculation_method label of a backend name, without loading the backend"""
+    backend = BACKENDS.get(name)
+    return backend.method if backend else name
+
+
+_instances = {}
+_instances_lock = threading.Lock()
+
+
+def get_backend(name):
+    """Shared backend instance by name, created on first use in this process"""
+    backend = _instances.get(name)
+    if backend is None:
+        if name not in BACKENDS:
+            raise ValueError(f"Unknown ephemeris backend '{name}', "
+                             f"expected one of {sorted(BACKENDS)}")
+        with _instances_lock:
+            backend = _instances.get(name)
+            if backend is None:
+                backend = _instances[name] = BACKENDS[name]()
+    return backend
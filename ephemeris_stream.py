@@ -0,0 +1,98 @@
+"""
+Planet positions over a time range, generated lazily.
+
+/ephemeris streams one NDJSON line per step, so memory stays flat however
+long the range is and the first lines go out before the rest has been
+computed. Steps are evaluated in small blocks: vectorized through the
+Chebyshev file when the backend has one, body by body otherwise.
+"""
+import datetime
+import json
+import re
+
+import numpy as np
+
+from celestial_events import iso_to_jd
+from ephemeris_backends import SWE_IDS, get_backend
+from natal_chart import DEFAULT_EPHEMERIS_BACKEND, sign_of
+
+# Steps evaluated together; small enough for a quick first byte
+BLOCK_SIZE = 256
+
+_STEP_RE = re.compile(r'^(\d+(?:\.\d+)?)\s*([dhm]?)$')
+_STEP_UNITS = {'d': 1440.0, 'h': 60.0, 'm': 1.0, '': 1440.0}
+
+
+class EphemerisRequestError(ValueError):
+    """Raised for malformed range, step or body parameters"""
+
+
+def parse_moment(value, name):
+    """'YYYY-MM-DD' or 'YYYY-MM-DDTHH:MM[:SS]' in UTC to an aware datetime"""
+    text = str(value or '').strip().replace(' ', 'T').rstrip('Z')
+    for fmt in ('%Y-%m-%d', '%Y-%m-%dT%H:%M', '%Y-%m-%dT%H:%M:%S'):
+        try:
+            return datetime.datetime.strptime(text, fmt).replace(tzinfo=datetime.timezone.utc)
+        except ValueError:
+            continue
+    raise EphemerisRequestError(f"{name} must be YYYY-MM-DD or YYYY-MM-DDTHH:MM (UTC)")
+
+
+def parse_step(value):
+    """'1d', '6h', '30m' or a number of days to a timedelta"""
+    match = _STEP_RE.match(str(value or '1d').strip().lower())
+    if not match or float(match.group(1)) <= 0:
+        raise EphemerisRequestError("step must look like '1d', '6h' or '30m'")
+    return datetime.timedelta(minutes=float(match.group(1)) * _STEP_UNITS[match.group(2)])
+
+
+def parse_bodies(value):
+    """Comma separated or list of body names, all classical planets by default"""
+    if not value:
+        return list(SWE_IDS)
+    names = value.split(',') if isinstance(value, str) else list(value)
+    bodies = [str(n).strip().capitalize() for n in names if str(n).strip()]
+    unknown = [b for b in bodies if b not in SWE_IDS]
+    if unknown:
+        raise EphemerisRequestError(f"Unknown bodies {unknown}, expected some of {list(SWE_IDS)}")
+    return bodies
+
+
+def step_count(start, end, step):
+    if end < start:
+        raise EphemerisRequestError("end must not be before start")
+    return int((end - start) / step) + 1
+
+
+def _block_positions(backend, jds, bodies):
+    """{body: (lon, lat, speed) arrays} for a block of julian days"""
+    ephemeris = getattr(backend, 'ephemeris', None)
+    if ephemeris is not None and ephemeris.covers(jds[0]) and ephemeris.covers(jds[-1]):
+        return {body: ephemeris.positions(body, jds) for body in bodies}
+    rows = [backend.planets(jd, bodies) for jd in jds]
+    return {body: tuple(np.array([r[body][k] for r in rows]) for k in ('lon', 'lat', 'speed'))
+            for body in bodies}
+
+
+def iter_positions(start, end, step, bodies, backend_name=None):
+    """Yield one {'time', 'jd', body: {...}} dict per step from start to end inclusive"""
+    backend = get_backend(backend_name or DEFAULT_EPHEMERIS_BACKEND)
+    total = step_count(start, end, step)
+    for block_start in range(0, total, BLOCK_SIZE):
+        moments = [start + step * i for i in range(block_start, min(total, block_start + BLOCK_SIZE))]
+        jds = np.array([iso_to_jd(m) for m in moments])
+        positions = _block_positions(backend, jds, bodies)
+        for i, moment in enumerate(moments):
+            row = {"time": moment.strftime('%Y-%m-%dT%H:%M:%SZ'), "jd": round(float(jds[i]), 6)}
+            for body in bodies:
+                lon, lat, speed = (float(a[i]) for a in positions[body])
+                row[body] = {"sign": sign_of(lon), "degree": round(lon, 4),
+                             "latitude": round(lat, 4), "speed": round(speed, 4),
+                             "retrograde": speed < 0}
+            yield row
+
+
+def ndjson(rows):
+    """Serialize rows lazily, one JSON document per line"""
+    for row in rows:
+        yield json.dumps(row, separators=(',', ':')) + '\n'
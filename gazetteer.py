@@ -0,0 +1,384 @@
+#!/usr/bin/env python3
+"""
+Offline gazetteer for birth places.
+
+data/cities.tsv (GeoNames, see data/README.md) is compiled once into a
+directory of .npy arrays: place columns plus a sorted table of normalized
+name keys. Workers memory-map the arrays, so all gunicorn processes share
+the same pages, and a lookup is a binary search over the keys.
+
+Names are folded before indexing and before every query: lower case,
+Turkish letters mapped to ASCII (İ/ı/I -> i, ş -> s, ğ -> g ...) and
+other accents stripped, so "kadikoy", "Kadıköy" and "KADIKÖY" are the
+same key.
+
+Reverse geocoding uses a k-d tree over the places as unit vectors, laid
+out implicitly in the same directory (the median of every range is its
+node), so the nearest place is an O(log n) descent with no tree objects.
+
+    python gazetteer.py build
+    python gazetteer.py search kadik
+    python gazetteer.py nearest 40.99 29.03
+"""
+import argparse
+import bisect
+import csv
+import math
+import os
+import re
+import threading
+import unicodedata
+
+import numpy as np
+
+DATA_DIR = os.environ.get('ASTRO_DATA_DIR',
+                          os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data'))
+SOURCE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'cities.tsv')
+COUNTRIES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'countries.tsv')
+DEFAULT_PATH = os.environ.get('GAZETTEER_PATH', os.path.join(DATA_DIR, 'gazetteer'))
+
+_TURKISH_FOLD = str.maketrans({
+    'İ': 'i', 'I': 'i', 'ı': 'i',
+    'Ş': 's', 'ş': 's',
+    'Ğ': 'g', 'ğ': 'g',
+    'Ç': 'c', 'ç': 'c',
+    'Ö': 'o', 'ö': 'o',
+    'Ü': 'u', 'ü': 'u',
+    # Letters NFKD does not decompose
+    'ß': 'ss', 'ø': 'o', 'Ø': 'o', 'æ': 'ae', 'Æ': 'ae', 'œ': 'oe', 'Œ': 'oe',
+    'đ': 'd', 'Đ': 'd', 'ł': 'l', 'Ł': 'l', 'þ': 'th', 'Þ': 'th',
+})
+_NON_KEY = re.compile(r'[^a-z0-9]+')
+
+# Country names as Turkish users type them, on top of the English names
+COUNTRY_ALIASES = {
+    'turkiye': 'TR', 'abd': 'US', 'amerika': 'US', 'almanya': 'DE',
+    'ingiltere': 'GB', 'fransa': 'FR', 'hollanda': 'NL', 'belcika': 'BE',
+    'avusturya': 'AT', 'isvicre': 'CH', 'italya': 'IT', 'ispanya': 'ES',
+    'yunanistan': 'GR', 'bulgaristan': 'BG', 'rusya': 'RU', 'azerbaycan': 'AZ',
+    'kibris': 'CY', 'kktc': 'CY', 'iran': 'IR', 'irak': 'IQ', 'suriye': 'SY',
+    'gurcistan': 'GE', 'japonya': 'JP', 'cin': 'CN', 'kanada': 'CA',
+}
+
+# Arrays of a compiled index, one .npy file each
+_ARRAYS = ('geonameid', 'latitude', 'longitude', 'population', 'country', 'admin1',
+           'zone_index', 'zones', 'name_blob', 'name_offsets',
+           'key_blob', 'key_offsets', 'key_primary', 'key_place', 'kd_points', 'kd_place')
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def normalize(text):
+    """Search key for a place name: folded to lower case ASCII words"""
+    text = unicodedata.normalize('NFKD', str(text).translate(_TURKISH_FOLD).lower())
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return _NON_KEY.sub(' ', text).strip()
+
+
+class Gazetteer:
+    """Read-only view of a compiled gazetteer directory"""
+
+    def __init__(self, path):
+        self.path = path
+        for name in _ARRAYS:
+            # Plain ndarray views of the mapping, memmap indexing is much slower
+            array = np.load(os.path.join(path, name + '.npy'), mmap_mode='r')
+            setattr(self, '_' + name, np.asarray(array))
+        self._zone_names = [str(z) for z in self._zones]
+        self._countries = _load_countries()
+        self._country_keys = dict(COUNTRY_ALIASES)
+        for iso, (iso3, name) in self._countries.items():
+            for alias in (iso, iso3, name):
+                self._country_keys.setdefault(normalize(alias), iso)
+        self._keys = _KeyView(self._key_blob, self._key_offsets)
+        self._kd = memoryview(self._kd_points).cast('B').cast('d')
+
+    def __len__(self):
+        return len(self._geonameid)
+
+    def place(self, index):
+        """Place record for a row of the index"""
+        start, end = self._name_offsets[index], self._name_offsets[index + 1]
+        country = self._country[index].decode('ascii')
+        return {
+            "geonameid": int(self._geonameid[index]),
+            "name": self._name_blob[start:end].tobytes().decode('utf-8'),
+            "country_code": country,
+            "country": self._countries.get(country, (None, country))[1],
+            "admin1_code": self._admin1[index].decode('ascii'),
+            "latitude": float(self._latitude[index]),
+            "longitude": float(self._longitude[index]),
+            "timezone": self._zone_names[self._zone_index[index]] or None,
+            "population": int(self._population[index]),
+        }
+
+    def _range(self, key, prefix):
+        lo = bisect.bisect_left(self._keys, key.encode('ascii'))
+        end = key.encode('ascii') + (b'\xff' if prefix else b'\x00')
+        return lo, bisect.bisect_left(self._keys, end, lo)
+
+    def _matches(self, key, prefix=True, country=None):
+        """Place rows for a normalized key
+
+        Ranked by exact match, then primary name over alternate names, then
+        population, so "ank" offers Ankara before a large city that merely
+        has an alternate name starting with "ank".
+        """
+        lo, hi = self._range(key, prefix)
+        places = np.asarray(self._key_place[lo:hi])
+        if not len(places):
+            return places
+        exact = np.diff(np.asarray(self._key_offsets[lo:hi + 1])) == len(key)
+        primary = np.asarray(self._key_primary[lo:hi]).astype(bool)
+        if country:
+            keep = np.asarray(self._country[places]) == country.encode('ascii')
+            places, exact, primary = places[keep], exact[keep], primary[keep]
+        order = np.lexsort((-np.asarray(self._population[places]), ~primary, ~exact))
+        # A place appears once per matching name, keep its best ranked entry
+        _, first = np.unique(places[order], return_index=True)
+        return places[order][np.sort(first)]
+
+    def search(self, query, limit=10, country=None):
+        """Autocomplete: places whose name or alternate name starts with the query
+
+        Raises ValueError for a country filter that names no known country.
+        """
+        code = self.country_code(country) if country else None
+        if country and code is None:
+            raise ValueError(f"Unknown country: {country}")
+        key = normalize(query)
+        if not key:
+            return []
+        return [self.place(i) for i in self._matches(key, True, code)[:limit]]
+
+    def country_code(self, text):
+        """ISO code for a country name, code or Turkish alias, None if unknown"""
+        return self._country_keys.get(normalize(text))
+
+    def resolve(self, location):
+        """Best place for a free-text birth location such as 'Kadıköy, İstanbul, Türkiye'
+
+        The first comma separated part is the place; later parts narrow it
+        down by country or by a larger place nearby (same country and
+        province). Falls back to a prefix match. None when nothing matches.
+        """
+        parts = [normalize(p) for p in str(location).split(',')]
+        parts = [p for p in parts if p]
+        if not parts:
+            return None
+        country = None
+        context = None
+        for part in parts[1:]:
+            code = self.country_code(part)
+            if code:
+                country = country or code
+            elif context is None:
+                rows = self._matches(part, False, country)
+                context = int(rows[0]) if len(rows) else None
+
+        for prefix in (False, True):
+            rows = self._matches(parts[0], prefix, country)
+            if not len(rows):
+                continue
+            if context is not None:
+                same_country = np.asarray(self._country[rows]) == self._country[context]
+                same_admin = same_country & (np.asarray(self._admin1[rows]) == self._admin1[context])
+                for mask in (same_admin, same_country):
+                    if mask.any():
+                        rows = rows[mask]
+                        break
+            return self.place(int(rows[0]))
+        return None
+
+    def nearest(self, latitude, longitude):
+        """(row, distance in km) of the place closest to a coordinate"""
+        query = _unit_vector(latitude, longitude)
+        best = [math.inf, -1]
+        self._descend(query, 0, len(self._kd_place), 0, best)
+        chord = math.sqrt(best[0])
+        distance = 2.0 * EARTH_RADIUS_KM * math.asin(min(1.0, chord / 2.0))
+        return int(self._kd_place[best[1]]), distance
+
+    def _descend(self, query, lo, hi, axis, best):
+        points = self._kd
+        while lo < hi:
+            mid = (lo + hi) // 2
+            x, y, z = points[3 * mid], points[3 * mid + 1], points[3 * mid + 2]
+            d2 = (query[0] - x) ** 2 + (query[1] - y) ** 2 + (query[2] - z) ** 2
+            if d2 < best[0]:
+                best[0], best[1] = d2, mid
+            diff = query[axis] - points[3 * mid + axis]
+            next_axis = (axis + 1) % 3
+            # Near side first, the far side only if the splitting plane is
+            # closer than the best match so far
+            if diff < 0:
+                near, far = (lo, mid), (mid + 1, hi)
+            else:
+                near, far = (mid + 1, hi), (lo, mid)
+            self._descend(query, near[0], near[1], next_axis, best)
+            if diff * diff >= best[0]:
+                return
+            lo, hi, axis = far[0], far[1], next_axis
+
+    def reverse(self, latitude, longitude, max_distance_km=None):
+        """Nearest place with its distance_km, None if it is further than max_distance_km"""
+        row, distance = self.nearest(latitude, longitude)
+        if max_distance_km is not None and distance > max_distance_km:
+            return None
+        return dict(self.place(row), distance_km=round(distance, 2))
+
+
+class _KeyView:
+    """Sequence over the sorted key blob so bisect can search it in place"""
+
+    def __init__(self, blob, offsets):
+        # memoryviews index to Python ints and bytes, numpy scalars cost more
+        self._blob = memoryview(blob)
+        self._offsets = memoryview(offsets).cast('B').cast('I')
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index):
+        return self._blob[self._offsets[index]:self._offsets[index + 1]].tobytes()
+
+
+def _load_countries(path=COUNTRIES_PATH):
+    """{iso: (iso3, name)} from the bundled country list"""
+    with open(path, encoding='utf-8', newline='') as f:
+        return {row['iso']: (row['iso3'], row['name'])
+                for row in csv.DictReader(f, delimiter='\t')}
+
+
+# === Per-process instance === #
+
+_gazetteer = None
+_gazetteer_lock = threading.Lock()
+
+
+def _is_stale(path, source):
+    marker = os.path.join(path, _ARRAYS[-1] + '.npy')
+    return not os.path.exists(marker) or os.path.getmtime(marker) < os.path.getmtime(source)
+
+
+def get_gazetteer(path=None):
+    """Load the compiled index once per process, building it first if missing or stale"""
+    global _gazetteer
+    if _gazetteer is None:
+        with _gazetteer_lock:
+            if _gazetteer is None:
+                path = path or DEFAULT_PATH
+                if _is_stale(path, SOURCE_PATH):
+                    build(path)
+                _gazetteer = Gazetteer(path)
+    return _gazetteer
+
+
+# === Builder === #
+
+def _read_source(source):
+    with open(source, encoding='utf-8', newline='') as f:
+        return list(csv.DictReader(f, delimiter='\t', quoting=csv.QUOTE_NONE))
+
+
+def _unit_vector(latitude, longitude):
+    lat, lon = math.radians(float(latitude)), math.radians(float(longitude))
+    return (math.cos(lat) * math.cos(lon), math.cos(lat) * math.sin(lon), math.sin(lat))
+
+
+def _kd_order(points):
+    """Row order of an implicit k-d tree: each range's median row is its node"""
+    order = np.arange(len(points))
+    stack = [(0, len(points), 0)]
+    while stack:
+        lo, hi, axis = stack.pop()
+        if hi - lo < 2:
+            continue
+        mid = (lo + hi) // 2
+        part = np.argpartition(points[order[lo:hi], axis], mid - lo)
+        order[lo:hi] = order[lo:hi][part]
+        stack.append((lo, mid, (axis + 1) % 3))
+        stack.append((mid + 1, hi, (axis + 1) % 3))
+    return order
+
+
+def _blob(values):
+    """Concatenated UTF-8 bytes and n + 1 offsets"""
+    encoded = [v.encode('utf-8') for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype='<u4')
+    offsets[1:] = np.cumsum([len(e) for e in encoded])
+    return np.frombuffer(b''.join(encoded), dtype=np.uint8), offsets
+
+
+def build(path=DEFAULT_PATH, source=SOURCE_PATH):
+    """Compile the TSV source into the memory-mappable index directory"""
+    rows = _read_source(source)
+    zones = sorted({r['timezone'] for r in rows} | {''})
+    zone_ids = {z: i for i, z in enumerate(zones)}
+
+    arrays = {
+        'geonameid': np.array([int(r['geonameid']) for r in rows], dtype='<u4'),
+        'latitude': np.array([float(r['latitude']) for r in rows], dtype='<f8'),
+        'longitude': np.array([float(r['longitude']) for r in rows], dtype='<f8'),
+        'population': np.array([int(r['population'] or 0) for r in rows], dtype='<i8'),
+        'country': np.array([r['country_code'] for r in rows], dtype='S2'),
+        'admin1': np.array([r['admin1_code'] for r in rows], dtype='S20'),
+        'zone_index': np.array([zone_ids[r['timezone']] for r in rows], dtype='<u2'),
+        'zones': np.array(zones),
+    }
+    arrays['name_blob'], arrays['name_offsets'] = _blob([r['name'] for r in rows])
+
+    keys = {}
+    for index, row in enumerate(rows):
+        for alias in filter(None, row['alternate_names'].split(',')):
+            keys.setdefault((normalize(alias), index), 0)
+        keys[(normalize(row['name']), index)] = 1
+    keys = sorted((k for k in keys.items() if k[0][0]), key=lambda k: (k[0][0].encode('ascii'), k[0][1]))
+    arrays['key_blob'], arrays['key_offsets'] = _blob([key for (key, _), _ in keys])
+    arrays['key_primary'] = np.array([primary for _, primary in keys], dtype='u1')
+    arrays['key_place'] = np.array([index for (_, index), _ in keys], dtype='<u4')
+
+    points = np.array([_unit_vector(r['latitude'], r['longitude']) for r in rows])
+    order = _kd_order(points)
+    arrays['kd_points'] = np.ascontiguousarray(points[order], dtype='<f8')
+    arrays['kd_place'] = order.astype('<u4')
+
+    os.makedirs(path, exist_ok=True)
+    # kd_place.npy goes last, it marks a complete index for _is_stale()
+    for name in _ARRAYS:
+        target = os.path.join(path, name + '.npy')
+        tmp_path = f"{target}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.save(f, arrays[name])
+        os.replace(tmp_path, target)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline gazetteer")
+    sub = parser.add_subparsers(dest='command', required=True)
+    build_cmd = sub.add_parser('build', help="compile data/cities.tsv into the index")
+    build_cmd.add_argument('--output', default=DEFAULT_PATH)
+    build_cmd.add_argument('--source', default=SOURCE_PATH)
+    search_cmd = sub.add_parser('search', help="prefix search, for checking the index")
+    search_cmd.add_argument('query')
+    search_cmd.add_argument('--limit', type=int, default=10)
+    nearest_cmd = sub.add_parser('nearest', help="reverse geocode a coordinate")
+    nearest_cmd.add_argument('latitude', type=float)
+    nearest_cmd.add_argument('longitude', type=float)
+    args = parser.parse_args()
+
+    if args.command == 'nearest':
+        place = get_gazetteer().reverse(args.latitude, args.longitude)
+        print(f"{place['name']}, {place['country']} ({place['distance_km']} km, {place['timezone']})")
+    elif args.command == 'build':
+        path = build(args.output, args.source)
+        print(f"Wrote {path} ({len(Gazetteer(path))} places)")
+    else:
+        for place in get_gazetteer().search(args.query, args.limit):
+            print(f"{place['name']:<30} {place['country_code']} {place['admin1_code']:<6} "
+                  f"{place['latitude']:9.4f} {place['longitude']:10.4f} {place['population']:>10}")
+
+
+if __name__ == '__main__':
+    main()
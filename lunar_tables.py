@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+Precomputed Moon phase table and eclipse catalogue (1900-2100).
+
+One file holds a row per day at 00:00 UT (Moon - Sun elongation and the
+illuminated fraction) followed by every solar and lunar eclipse found by
+Swiss Ephemeris, sorted by the time of greatest eclipse. The file is
+memory-mapped: a phase lookup is index arithmetic on the day number and
+the next or previous eclipse is a binary search, whatever the date.
+
+    python lunar_tables.py build
+    python lunar_tables.py phases 2024-04-01 2024-04-10
+    python lunar_tables.py eclipses 2024-01-01 2027-01-01
+"""
+import argparse
+import datetime
+import mmap
+import os
+import struct
+import threading
+
+import numpy as np
+
+from celestial_events import date_to_jd, jd_to_iso
+
+DATA_DIR = os.environ.get('ASTRO_DATA_DIR',
+                          os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data'))
+DEFAULT_PATH = os.environ.get('LUNAR_TABLES_PATH', os.path.join(DATA_DIR, 'lunar_tables.bin'))
+
+# 1900-01-01 and 2100-01-01 00:00 UT
+DEFAULT_START_JD = 2415020.5
+DEFAULT_END_JD = 2488069.5
+
+PRINCIPAL_PHASES = ['new_moon', 'first_quarter', 'full_moon', 'last_quarter']
+INTERMEDIATE_PHASES = ['waxing_crescent', 'waxing_gibbous', 'waning_gibbous', 'waning_crescent']
+ECLIPSE_KINDS = ['solar', 'lunar']
+ECLIPSE_TYPES = ['total', 'annular', 'hybrid', 'partial', 'penumbral']
+
+_MAGIC = b'LUNA'
+_VERSION = 1
+_HEADER = struct.Struct('<4sHHdII')
+DAY = np.dtype([('elongation', '<f4'), ('illumination', '<f4')])
+ECLIPSE = np.dtype([('jd', '<f8'), ('magnitude', '<f4'), ('latitude', '<f4'), ('longitude', '<f4'),
+                    ('saros', '<u2'), ('saros_member', '<u2'), ('kind', 'u1'), ('type', 'u1')])
+
+
+class LunarTables:
+    """Read-only view of a lunar tables file"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, _, start_jd, n_days, n_eclipses = _HEADER.unpack_from(self._mmap, 0)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError(f"{path} is not a version {_VERSION} lunar tables file")
+        self.start_jd = start_jd
+        # The last row only closes the final day's phase interval
+        self.days = n_days - 1
+        self.end_jd = start_jd + self.days
+        self._days = np.frombuffer(self._mmap, dtype=DAY, count=n_days, offset=_HEADER.size)
+        self._eclipses = np.frombuffer(self._mmap, dtype=ECLIPSE, count=n_eclipses,
+                                       offset=_HEADER.size + DAY.itemsize * n_days)
+        self._eclipse_jd = self._eclipses['jd']
+
+    def covers(self, start_date, end_date):
+        return self.start_jd <= date_to_jd(start_date) and date_to_jd(end_date) <= self.end_jd
+
+    def phases(self, start_date, end_date):
+        """Phase of every day from start_date to end_date inclusive
+
+        A day is named after the principal phase (new, first quarter, full,
+        last quarter) if the Moon reaches it during that UT day, otherwise
+        after the quarter of the cycle it is in.
+        """
+        first = int(date_to_jd(start_date) - self.start_jd)
+        last = int(date_to_jd(end_date) - self.start_jd)
+        if first < 0 or last >= self.days or last < first:
+            raise ValueError("Dates are outside the lunar tables")
+        rows = self._days[first:last + 2]
+        elongation = rows['elongation'].astype(float)
+        quarter_start = (elongation[:-1] // 90).astype(int) % 4
+        quarter_end = (elongation[1:] // 90).astype(int) % 4
+
+        result = []
+        for i in range(len(rows) - 1):
+            if quarter_end[i] != quarter_start[i]:
+                phase = PRINCIPAL_PHASES[quarter_end[i]]
+            else:
+                phase = INTERMEDIATE_PHASES[quarter_start[i]]
+            result.append({
+                "date": (start_date + datetime.timedelta(days=i)).isoformat(),
+                "phase": phase,
+                "elongation": round(float(elongation[i]), 2),
+                "illumination": round(float(rows['illumination'][i]), 4),
+            })
+        return result
+
+    def eclipses(self, start_jd, end_jd, kind=None):
+        """Eclipses with greatest eclipse in [start_jd, end_jd)"""
+        lo, hi = np.searchsorted(self._eclipse_jd, [start_jd, end_jd])
+        records = self._eclipses[lo:hi]
+        if kind:
+            records = records[records['kind'] == ECLIPSE_KINDS.index(kind)]
+        return [describe_eclipse(r) for r in records]
+
+    def next_eclipse(self, jd, kind=None, previous=False):
+        """Closest eclipse after (or before) jd, None beyond the catalogue"""
+        kind_id = ECLIPSE_KINDS.index(kind) if kind else None
+        if previous:
+            position = int(np.searchsorted(self._eclipse_jd, jd, side='left')) - 1
+            step = -1
+        else:
+            position = int(np.searchsorted(self._eclipse_jd, jd, side='right'))
+            step = 1
+        # Solar and lunar eclipses alternate, a kind filter skips a few rows at most
+        while 0 <= position < len(self._eclipses):
+            record = self._eclipses[position]
+            if kind_id is None or record['kind'] == kind_id:
+                return describe_eclipse(record)
+            position += step
+        return None
+
+
+def describe_eclipse(record):
+    kind = ECLIPSE_KINDS[record['kind']]
+    eclipse = {
+        "time": jd_to_iso(record['jd']),
+        "jd": round(float(record['jd']), 6),
+        "kind": kind,
+        "type": ECLIPSE_TYPES[record['type']],
+        "magnitude": round(float(record['magnitude']), 4),
+        "saros": int(record['saros']),
+        "saros_member": int(record['saros_member']),
+    }
+    if kind == 'solar':
+        eclipse["greatest_eclipse"] = {"latitude": round(float(record['latitude']), 2),
+                                       "longitude": round(float(record['longitude']), 2)}
+    return eclipse
+
+
+# === Per-process instance === #
+
+_tables = None
+_tables_lock = threading.Lock()
+
+
+def get_lunar_tables(path=None):
+    """Load the tables once per process, None if they have not been built"""
+    global _tables
+    if _tables is None:
+        with _tables_lock:
+            if _tables is None:
+                path = path or DEFAULT_PATH
+                if not os.path.exists(path):
+                    return None
+                _tables = LunarTables(path)
+    return _tables
+
+
+# === Builder === #
+
+def _phase_rows(swe, start_jd, n_days):
+    rows = np.zeros(n_days, dtype=DAY)
+    for i in range(n_days):
+        jd = start_jd + i
+        sun = swe.calc_ut(jd, swe.SUN)[0]
+        moon = swe.calc_ut(jd, swe.MOON)[0]
+        rows[i]['elongation'] = (moon[0] - sun[0]) % 360.0
+        # Illuminated fraction from the true Sun - Moon angle
+        cos_angle = np.cos(np.radians(moon[1])) * np.cos(np.radians(moon[0] - sun[0]))
+        rows[i]['illumination'] = (1.0 - cos_angle) / 2.0
+    return rows
+
+
+def _solar_type(flags, swe):
+    if flags & swe.ECL_ANNULAR_TOTAL:
+        return 'hybrid'
+    if flags & swe.ECL_TOTAL:
+        return 'total'
+    if flags & swe.ECL_ANNULAR:
+        return 'annular'
+    return 'partial'
+
+
+def _lunar_type(flags, swe):
+    if flags & swe.ECL_TOTAL:
+        return 'total'
+    if flags & swe.ECL_PARTIAL:
+        return 'partial'
+    return 'penumbral'
+
+
+def _eclipse_rows(swe, start_jd, end_jd):
+    rows = []
+    for kind in ECLIPSE_KINDS:
+        jd = start_jd
+        while True:
+            if kind == 'solar':
+                flags, times = swe.sol_eclipse_when_glob(jd, swe.FLG_SWIEPH, 0, False)
+                maximum = times[0]
+                _, geopos, attr = swe.sol_eclipse_where(maximum, swe.FLG_SWIEPH)
+                eclipse_type = _solar_type(flags, swe)
+                # attr[8] is the NASA magnitude, attr[0] the obscured diameter fraction
+                latitude, longitude, magnitude = geopos[1], geopos[0], attr[8]
+            else:
+                flags, times = swe.lun_eclipse_when(jd, swe.FLG_SWIEPH, 0, False)
+                maximum = times[0]
+                _, attr = swe.lun_eclipse_how(maximum, (0.0, 0.0, 0.0), swe.FLG_SWIEPH)
+                eclipse_type = _lunar_type(flags, swe)
+                # Umbral magnitude, the penumbral one for penumbral eclipses
+                latitude, longitude = 0.0, 0.0
+                magnitude = attr[0] if eclipse_type != 'penumbral' else attr[1]
+            if maximum >= end_jd:
+                break
+            rows.append((maximum, magnitude, latitude, longitude, int(attr[9]), int(attr[10]),
+                         ECLIPSE_KINDS.index(kind), ECLIPSE_TYPES.index(eclipse_type)))
+            # Eclipses of one kind are at least five months apart
+            jd = maximum + 20.0
+    rows = np.array(rows, dtype=ECLIPSE)
+    return rows[np.argsort(rows['jd'], kind='stable')]
+
+
+def build(path=DEFAULT_PATH, start_jd=DEFAULT_START_JD, end_jd=DEFAULT_END_JD):
+    """Compute the daily phase table and eclipse catalogue and write the file"""
+    from chebyshev_ephemeris import _swisseph
+    swe = _swisseph()
+    n_days = int(end_jd - start_jd) + 1
+    days = _phase_rows(swe, start_jd, n_days)
+    eclipses = _eclipse_rows(swe, start_jd, end_jd)
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(_HEADER.pack(_MAGIC, _VERSION, 0, start_jd, n_days, len(eclipses)))
+        f.write(days.tobytes())
+        f.write(eclipses.tobytes())
+    os.replace(tmp_path, path)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Moon phase table and eclipse catalogue")
+    sub = parser.add_subparsers(dest='command', required=True)
+    build_cmd = sub.add_parser('build', help="compute the tables with Swiss Ephemeris")
+    build_cmd.add_argument('--output', default=DEFAULT_PATH)
+    build_cmd.add_argument('--start-jd', type=float, default=DEFAULT_START_JD)
+    build_cmd.add_argument('--end-jd', type=float, default=DEFAULT_END_JD)
+    for name in ('phases', 'eclipses'):
+        cmd = sub.add_parser(name)
+        cmd.add_argument('start', type=datetime.date.fromisoformat)
+        cmd.add_argument('end', type=datetime.date.fromisoformat)
+        cmd.add_argument('--path', default=DEFAULT_PATH)
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        path = build(args.output, args.start_jd, args.end_jd)
+        tables = LunarTables(path)
+        print(f"Wrote {path} ({tables.days} days, {len(tables._eclipses)} eclipses, "
+              f"{os.path.getsize(path) / 1e6:.1f} MB)")
+    elif args.command == 'phases':
+        for row in LunarTables(args.path).phases(args.start, args.end):
+            print(row)
+    else:
+        for row in LunarTables(args.path).eclipses(date_to_jd(args.start), date_to_jd(args.end)):
+            print(row)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+Moon sign and void-of-course timetable.
+
+One record per stay of the Moon in a sign: the ingress, the next ingress
+and the Moon's last exact major aspect to the Sun or a classical planet
+before it leaves. The void-of-course interval runs from that last aspect
+to the next ingress (the whole stay if no aspect is made).
+
+The file only grows: `extend` scans the ephemeris from the last stored
+ingress up to a horizon and appends the new records, so the nightly job
+costs a day of Moon motion instead of a full rebuild. Readers memory-map
+the file and reload it when its modification time changes; a date range
+is two binary searches.
+
+    python moon_timetable.py extend             # create or extend to today + horizon
+    python moon_timetable.py build --start 1900-01-01 --end 2030-01-01
+    python moon_timetable.py query 2024-04-01 2024-04-07
+"""
+import argparse
+import datetime
+import mmap
+import os
+import struct
+import threading
+
+import numpy as np
+
+from celestial_events import (ASPECT_NAMES, NO_BODY, RECORD, get_sampler, iso_to_jd, jd_to_iso,
+                              scan_body, scan_pair)
+from natal_chart import PLANETS, SIGNS
+
+DATA_DIR = os.environ.get('ASTRO_DATA_DIR',
+                          os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data'))
+DEFAULT_PATH = os.environ.get('MOON_TIMETABLE_PATH', os.path.join(DATA_DIR, 'moon_timetable.bin'))
+
+# A new file starts at 1900-01-01 00:00 UT; extend keeps it this many days ahead of today
+DEFAULT_START_JD = 2415020.5
+HORIZON_DAYS = int(os.environ.get('MOON_TIMETABLE_HORIZON_DAYS', 730))
+
+# Traditional void-of-course: aspects to the Sun and the classical planets
+ASPECT_BODIES = [p for p in PLANETS if p != 'Moon']
+
+_MAGIC = b'MOON'
+_VERSION = 1
+_HEADER = struct.Struct('<4sHHddQ')
+PERIOD = np.dtype([('ingress', '<f8'), ('next_ingress', '<f8'), ('last_aspect', '<f8'),
+                   ('sign', 'u1'), ('aspect', 'u1'), ('body', 'u1'), ('_pad', 'V5')])
+
+# Ingresses found again within this many days of the last stored one are the same ingress
+_SAME_INGRESS_DAYS = 0.01
+
+
+class MoonTimetable:
+    """Read-only view of a Moon timetable file"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mtime = os.fstat(f.fileno()).st_mtime_ns
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, _, start_jd, end_jd, count = _HEADER.unpack_from(self._mmap, 0)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError(f"{path} is not a version {_VERSION} Moon timetable")
+        self.start_jd = start_jd
+        self.end_jd = end_jd
+        self._periods = np.frombuffer(self._mmap, dtype=PERIOD, count=count, offset=_HEADER.size)
+
+    def __len__(self):
+        return len(self._periods)
+
+    def is_current(self):
+        """False once the file has been extended or rebuilt"""
+        try:
+            return os.stat(self.path).st_mtime_ns == self._mtime
+        except FileNotFoundError:
+            return False
+
+    def covers(self, start_jd, end_jd):
+        return self.start_jd <= start_jd and end_jd <= self.end_jd
+
+    def records(self, start_jd, end_jd):
+        """Periods overlapping [start_jd, end_jd)"""
+        lo = np.searchsorted(self._periods['next_ingress'], start_jd, side='right')
+        hi = np.searchsorted(self._periods['ingress'], end_jd, side='left')
+        return self._periods[lo:max(lo, hi)]
+
+    def periods(self, start_jd, end_jd, void_only=False):
+        records = self.records(start_jd, end_jd)
+        if void_only:
+            voc_start = np.where(np.isnan(records['last_aspect']), records['ingress'], records['last_aspect'])
+            records = records[(voc_start < end_jd) & (records['next_ingress'] > start_jd)]
+        return [describe(r) for r in records]
+
+    def at(self, jd):
+        """The period containing jd, None outside the table"""
+        position = int(np.searchsorted(self._periods['next_ingress'], jd, side='right'))
+        if position < len(self._periods) and self._periods[position]['ingress'] <= jd:
+            return describe(self._periods[position])
+        return None
+
+
+def describe(record):
+    ingress, next_ingress = float(record['ingress']), float(record['next_ingress'])
+    last_aspect = float(record['last_aspect'])
+    period = {
+        "sign": SIGNS[record['sign']],
+        "ingress": jd_to_iso(ingress),
+        "next_ingress": jd_to_iso(next_ingress),
+        "last_aspect": None,
+    }
+    voc_start = ingress
+    if not np.isnan(last_aspect):
+        voc_start = last_aspect
+        period["last_aspect"] = {"time": jd_to_iso(last_aspect), "aspect": ASPECT_NAMES[record['aspect']],
+                                 "body": PLANETS[record['body']]}
+    period["void_of_course"] = {"start": jd_to_iso(voc_start), "end": period["next_ingress"],
+                                "hours": round((next_ingress - voc_start) * 24.0, 2)}
+    return period
+
+
+# === Scanning === #
+
+def scan_periods(sample, start_jd, end_jd, first=None):
+    """Complete Moon sign periods from the ingresses in [start_jd, end_jd)
+
+    first is the (jd, sign) of an ingress already stored, where the new
+    periods must start.
+    """
+    ingresses = scan_body(sample, 'Moon', start_jd, end_jd)
+    ingresses = ingresses[0] if ingresses else np.zeros(0, dtype=RECORD)
+    jd, sign = ingresses['jd'], ingresses['detail']
+    if first is not None:
+        later = jd > first[0] + _SAME_INGRESS_DAYS
+        jd = np.concatenate([[first[0]], jd[later]])
+        sign = np.concatenate([[first[1]], sign[later]])
+    if len(jd) < 2:
+        return np.zeros(0, dtype=PERIOD)
+
+    found = []
+    for body in ASPECT_BODIES:
+        found += scan_pair(sample, 'Moon', body, start_jd, end_jd)
+    aspects = np.concatenate(found)
+    aspects = aspects[np.argsort(aspects['jd'], kind='stable')]
+
+    periods = np.zeros(len(jd) - 1, dtype=PERIOD)
+    periods['ingress'] = jd[:-1]
+    periods['next_ingress'] = jd[1:]
+    periods['sign'] = sign[:-1]
+    # Last aspect before each next ingress, if it falls after the period's own ingress
+    last = np.searchsorted(aspects['jd'], jd[1:], side='left') - 1
+    made = (last >= 0) & (aspects['jd'][np.maximum(last, 0)] > jd[:-1])
+    chosen = aspects[np.maximum(last, 0)]
+    periods['last_aspect'] = np.where(made, chosen['jd'], np.nan)
+    periods['aspect'] = np.where(made, chosen['detail'], NO_BODY)
+    periods['body'] = np.where(made, chosen['other'], NO_BODY)
+    return periods
+
+
+# === Per-process instance === #
+
+_timetable = None
+_timetable_lock = threading.Lock()
+
+
+def get_moon_timetable(path=None):
+    """Load the timetable, again after a nightly extend; None if it has not been built"""
+    global _timetable
+    timetable = _timetable
+    if timetable is not None and timetable.is_current():
+        return timetable
+    with _timetable_lock:
+        if _timetable is None or not _timetable.is_current():
+            path = path or (_timetable.path if _timetable is not None else DEFAULT_PATH)
+            if not os.path.exists(path):
+                return None
+            _timetable = MoonTimetable(path)
+    return _timetable
+
+
+# === Builder === #
+
+def build(path=DEFAULT_PATH, start_jd=DEFAULT_START_JD, end_jd=None):
+    """Scan [start_jd, end_jd) from scratch and write a new timetable"""
+    end_jd = end_jd or horizon_jd()
+    periods = scan_periods(get_sampler(), start_jd, end_jd)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(_header(start_jd, periods))
+        f.write(periods.tobytes())
+    os.replace(tmp_path, path)
+    return len(periods)
+
+
+def extend(path=DEFAULT_PATH, end_jd=None):
+    """Append the periods completed between the last stored ingress and end_jd
+
+    Creates the file when it does not exist. Records are written before
+    the header, so a reader never sees a count beyond the data.
+    """
+    end_jd = end_jd or horizon_jd()
+    if not os.path.exists(path):
+        return build(path, DEFAULT_START_JD, end_jd)
+    with open(path, 'r+b') as f:
+        magic, version, _, start_jd, _, count = _HEADER.unpack(f.read(_HEADER.size))
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError(f"{path} is not a version {_VERSION} Moon timetable")
+        f.seek(_HEADER.size + (count - 1) * PERIOD.itemsize)
+        last = np.frombuffer(f.read(PERIOD.itemsize), dtype=PERIOD)[0]
+        first = (float(last['next_ingress']), (int(last['sign']) + 1) % 12)
+        if end_jd <= first[0]:
+            return 0
+        # Start a little before the stored ingress so it is bracketed again
+        periods = scan_periods(get_sampler(), first[0] - 0.5, end_jd, first)
+        if not len(periods):
+            return 0
+        f.seek(_HEADER.size + count * PERIOD.itemsize)
+        f.write(periods.tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+        f.seek(0)
+        f.write(_HEADER.pack(_MAGIC, _VERSION, 0, start_jd, float(periods['next_ingress'][-1]),
+                             count + len(periods)))
+    return len(periods)
+
+
+def _header(start_jd, periods):
+    # Coverage starts at the first complete period
+    if len(periods):
+        start_jd, end_jd = float(periods['ingress'][0]), float(periods['next_ingress'][-1])
+    else:
+        end_jd = start_jd
+    return _HEADER.pack(_MAGIC, _VERSION, 0, start_jd, end_jd, len(periods))
+
+
+def horizon_jd(days=None):
+    today = datetime.datetime.now(datetime.timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    return iso_to_jd(today) + (HORIZON_DAYS if days is None else days)
+
+
+def _date_jd(text):
+    return iso_to_jd(datetime.datetime.fromisoformat(text).replace(tzinfo=datetime.timezone.utc))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Moon sign and void-of-course timetable")
+    sub = parser.add_subparsers(dest='command', required=True)
+    build_cmd = sub.add_parser('build', help="scan a date range from scratch")
+    build_cmd.add_argument('--start', type=_date_jd, default=DEFAULT_START_JD)
+    build_cmd.add_argument('--end', type=_date_jd)
+    extend_cmd = sub.add_parser('extend', help="append periods up to today + horizon (nightly)")
+    extend_cmd.add_argument('--days', type=int, default=HORIZON_DAYS)
+    query_cmd = sub.add_parser('query', help="list periods between two UTC dates")
+    query_cmd.add_argument('start', type=_date_jd)
+    query_cmd.add_argument('end', type=_date_jd)
+    for cmd in (build_cmd, extend_cmd, query_cmd):
+        cmd.add_argument('--path', default=DEFAULT_PATH)
+    args = parser.parse_args()
+
+    if args.command == 'query':
+        for period in MoonTimetable(args.path).periods(args.start, args.end):
+            print(period)
+        return
+    if args.command == 'build':
+        added = build(args.path, args.start, args.end)
+    else:
+        added = extend(args.path, horizon_jd(args.days))
+    timetable = MoonTimetable(args.path)
+    print(f"{args.path}: {added} periods added, {len(timetable)} up to {jd_to_iso(timetable.end_jd)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,415 @@
+"""
+Natal chart calculation shared by the /natal and /natal/batch endpoints.
+
+This module has no Flask dependency so that it can be imported by the
+worker processes of the batch pool.
+"""
+import datetime
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+
+from ephemeris_backends import get_backend, julian_day
+from timezone_resolver import TimezoneError, normalize_offset, resolve_offset
+
+# Flatlib'de geçerli planet isimleri
+PLANETS = ['Sun', 'Moon', 'Mercury', 'Venus', 'Mars', 'Jupiter', 'Saturn']
+
+# Opt-in chart points; only the ones a request names are computed
+EXTENDED_BODIES = ['Uranus', 'Neptune', 'Pluto', 'North Node', 'South Node', 'Chiron']
+EXTENDED_POINTS = EXTENDED_BODIES + ['MC', 'houses']
+
+SIGNS = ['Aries', 'Taurus', 'Gemini', 'Cancer', 'Leo', 'Virgo',
+         'Libra', 'Scorpio', 'Sagittarius', 'Capricorn', 'Aquarius', 'Pisces']
+
+# Ephemeris backend used when the caller does not pick one, see
+# ephemeris_backends.py (flatlib, swisseph, chebyshev)
+DEFAULT_EPHEMERIS_BACKEND = os.environ.get('EPHEMERIS_BACKEND', 'swisseph')
+
+# UTC offset from the birth place's historical tz rules (timezone_resolver.py);
+# the fixed Turkey offset is only used when no zone can be resolved
+RESOLVE_TIMEZONE = os.environ.get('RESOLVE_TIMEZONE', 'True').lower() == 'true'
+DEFAULT_UTC_OFFSET = '+03:00'
+
+# Nearest gazetteer place for births sent as bare coordinates (gazetteer.py);
+# further than REVERSE_GEOCODE_MAX_KM the birth place is left unnamed
+REVERSE_GEOCODE = os.environ.get('REVERSE_GEOCODE', 'True').lower() == 'true'
+REVERSE_GEOCODE_MAX_KM = float(os.environ.get('REVERSE_GEOCODE_MAX_KM', 100))
+
+# Batches smaller than this are computed in the request process, the
+# pickling round trip to a worker costs more than the chart itself.
+INLINE_BATCH_SIZE = 4
+
+# Pool workers never fork the request process: it runs background threads
+# (the sky snapshot refresher) and a forked child could inherit a held lock
+POOL_START_METHOD = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+
+
+class BirthDataError(ValueError):
+    """Raised when a birth record is missing or has invalid fields"""
+
+
+def parse_birth_data(data):
+    """Normalize a request payload into date, time, latitude and longitude"""
+    if not isinstance(data, dict):
+        raise BirthDataError("Birth record must be a JSON object")
+
+    # Flutter'dan gelen veri formatını destekle
+    # Flutter: date, time, latitude, longitude gönderir
+    # Eski format: birth_date, birth_time, birth_location için backward compatibility
+    date_str = data.get('date') or data.get('birth_date')
+    time_str = data.get('time') or data.get('birth_time')
+    latitude = data.get('latitude')
+    longitude = data.get('longitude')
+
+    # Location string'den latitude/longitude çıkarma (offline gazetteer)
+    place = None
+    place_zone = None
+    if not latitude or not longitude:
+        place = _lookup_place(data.get('birth_location'))
+        if place is None:
+            raise BirthDataError("Latitude and longitude are required")
+        latitude = place['latitude']
+        longitude = place['longitude']
+        place_zone = place.get('timezone')
+
+    if not date_str or not time_str:
+        raise BirthDataError("Date and time are required")
+
+    try:
+        latitude = float(latitude)
+        longitude = float(longitude)
+    except (TypeError, ValueError):
+        raise BirthDataError("Latitude and longitude must be numbers")
+
+    # The nearest city only names the place; near a border its zone can be
+    # the neighbour's, so bare coordinates keep the tz polygon lookup
+    if place is None and REVERSE_GEOCODE:
+        place = _nearest_place(latitude, longitude)
+
+    zone, offset = _resolve_timezone(data, latitude, longitude,
+                                     _parse_local_time(date_str, time_str), place_zone)
+
+    return {
+        "date": date_str,
+        "time": time_str,
+        "latitude": latitude,
+        "longitude": longitude,
+        "timezone": zone,
+        "utc_offset": offset,
+        "place": _describe_place(place)
+    }
+
+
+def _lookup_place(location):
+    """Gazetteer entry for a free-text birth location, None if unknown"""
+    if not location or not str(location).strip():
+        return None
+    from gazetteer import get_gazetteer
+    return get_gazetteer().resolve(location)
+
+
+def _nearest_place(latitude, longitude):
+    """Closest gazetteer place within REVERSE_GEOCODE_MAX_KM, None for invalid coordinates"""
+    if not (-90.0 <= latitude <= 90.0 and -180.0 <= longitude <= 180.0):
+        return None
+    from gazetteer import get_gazetteer
+    return get_gazetteer().reverse(latitude, longitude, REVERSE_GEOCODE_MAX_KM)
+
+
+def _describe_place(place):
+    """The part of a gazetteer entry echoed back to clients"""
+    if place is None:
+        return None
+    keys = ('name', 'country_code', 'country', 'geonameid', 'distance_km')
+    return {key: place[key] for key in keys if key in place}
+
+
+def describe_timezone(birth):
+    """Human readable zone and offset used for a birth, e.g. 'Europe/Istanbul (UTC+02:00)'"""
+    if birth.get('timezone'):
+        return f"{birth['timezone']} (UTC{birth['utc_offset']})"
+    return f"UTC{birth['utc_offset']}"
+
+
+def _parse_local_time(date_str, time_str):
+    """(year, month, day, hour, minute, second) from 'YYYY-MM-DD' and 'HH:MM[:SS]'"""
+    try:
+        year, month, day = (int(v) for v in str(date_str).strip().replace('/', '-').split('-'))
+        clock = [int(v) for v in str(time_str).strip().split(':')]
+        hour, minute, second = (clock + [0, 0])[:3]
+        datetime.datetime(year, month, day, hour, minute, second)
+    except (TypeError, ValueError):
+        raise BirthDataError("Date must be YYYY-MM-DD and time HH:MM")
+    return year, month, day, hour, minute, second
+
+
+def _resolve_timezone(data, latitude, longitude, local_time, place_zone=None):
+    """Zone name and UTC offset: explicit offset, else tz rules at the birth place"""
+    zone = data.get('timezone') or place_zone
+    offset = data.get('utc_offset')
+    try:
+        if offset not in (None, ''):
+            return zone, normalize_offset(offset)
+        if RESOLVE_TIMEZONE:
+            zone, offset = resolve_offset(latitude, longitude, *local_time, zone_name=zone)
+            if offset is not None:
+                return zone, offset
+    except TimezoneError as e:
+        raise BirthDataError(str(e))
+    except ImportError:
+        # timezonefinder not installed, keep the historical default
+        pass
+    return None, DEFAULT_UTC_OFFSET
+
+
+def sign_of(lon):
+    """Zodiac sign name for an ecliptic longitude"""
+    return SIGNS[int(lon % 360.0 // 30)]
+
+
+def parse_extended(value):
+    """Requested EXTENDED_POINTS in canonical order from true, 'all', a list or a comma separated string"""
+    if value in (None, False, '', []):
+        return ()
+    if value is True or (isinstance(value, str) and value.strip().lower() in ('all', 'true')):
+        return tuple(EXTENDED_POINTS)
+    names = value.split(',') if isinstance(value, str) else value
+    if not isinstance(names, list):
+        raise BirthDataError("extended must be true, 'all' or a list of point names")
+    canonical = {point.lower(): point for point in EXTENDED_POINTS}
+    requested = set()
+    for name in names:
+        point = canonical.get(str(name).strip().lower())
+        if point is None:
+            raise BirthDataError(f"Unknown extended point '{name}', expected one of {EXTENDED_POINTS}")
+        requested.add(point)
+    return tuple(point for point in EXTENDED_POINTS if point in requested)
+
+
+def birth_julian_day(birth):
+    """UT julian day of parsed birth data"""
+    try:
+        return julian_day(birth['date'], birth['time'], birth['utc_offset'])
+    except (TypeError, ValueError):
+        raise BirthDataError("Date must be YYYY-MM-DD and time HH:MM")
+
+
+def instant_key(jd, backend=None):
+    """Planet cache key: geocentric positions depend only on the instant"""
+    return f"{backend or DEFAULT_EPHEMERIS_BACKEND}|{jd:.6f}"
+
+
+def _planet_positions(planets):
+    # Her gezegen için hem burç hem derece bilgisini döndür
+    planet_positions = {}
+    for p in PLANETS:
+        lon = planets[p]['lon']
+        planet_positions[p] = {
+            'sign': sign_of(lon),
+            'degree': round(lon, 2)  # Ekliptik boylam (0-360)
+        }
+    return planet_positions
+
+
+def _angle_positions(angles):
+    # Yükselen için de aynı format
+    asc = angles['Asc']
+    return {
+        "ascendant": sign_of(asc),
+        "ascendant_degree": round(asc, 2)
+    }
+
+
+def calculate_planets(jd, backend=None):
+    """Location independent part of a chart: planet signs and longitudes"""
+    backend = get_backend(backend or DEFAULT_EPHEMERIS_BACKEND)
+    return _planet_positions(backend.planets(jd, PLANETS))
+
+
+def calculate_angles(jd, latitude, longitude, backend=None):
+    """Location dependent part of a chart: the ascendant"""
+    backend = get_backend(backend or DEFAULT_EPHEMERIS_BACKEND)
+    return _angle_positions(backend.angles(jd, latitude, longitude))
+
+
+def _extended_bodies(extended):
+    """Ephemeris bodies needed for the requested extended points"""
+    bodies = [body for body in EXTENDED_BODIES if body in extended and body != 'South Node']
+    if 'South Node' in extended and 'North Node' not in bodies:
+        bodies.append('North Node')
+    return bodies
+
+
+def _extended_positions(extended, planets, angles):
+    positions = {}
+    for body in EXTENDED_BODIES:
+        if body not in extended:
+            continue
+        if body == 'South Node':
+            # Always opposite the (mean) North Node
+            lon, speed = (planets['North Node']['lon'] + 180.0) % 360.0, planets['North Node']['speed']
+        else:
+            lon, speed = planets[body]['lon'], planets[body]['speed']
+        positions[body] = {'sign': sign_of(lon), 'degree': round(lon, 2), 'retrograde': speed < 0}
+    if 'MC' in extended:
+        positions['MC'] = {'sign': sign_of(angles['MC']), 'degree': round(angles['MC'], 2)}
+    if 'houses' in extended:
+        positions['houses'] = [{'house': i, 'sign': sign_of(lon), 'degree': round(lon, 2)}
+                               for i, lon in enumerate(angles['cusps'], start=1)]
+    return positions
+
+
+def chart_at(jd, latitude, longitude, backend=None, extended=()):
+    """Planet signs and the ascendant for a UT julian day and location
+
+    extended names EXTENDED_POINTS to add under "extended"; they come from
+    the same ephemeris call as the classical planets.
+    """
+    backend = get_backend(backend or DEFAULT_EPHEMERIS_BACKEND)
+    planets, angles = backend.chart(jd, latitude, longitude, PLANETS + _extended_bodies(extended))
+    chart = dict(_angle_positions(angles), planets=_planet_positions(planets))
+    if extended:
+        chart["extended"] = _extended_positions(extended, planets, angles)
+    return chart
+
+
+def calculate_natal_chart(birth, backend=None, extended=()):
+    """Calculate planet signs and the ascendant for parsed birth data"""
+    return chart_at(birth_julian_day(birth), birth['latitude'], birth['longitude'], backend, extended)
+
+
+def cached_natal_chart(birth, cache=None, backend=None, planet_cache=None, extended=()):
+    """Chart for parsed birth data and which of its parts were served from cache
+
+    A full chart hit needs no ephemeris work. Otherwise planets are looked up
+    by instant in planet_cache, so a birth that differs only in location
+    (a corrected city, several candidate cities) just recomputes the angles.
+    Charts with extended points are cached under their own key and computed
+    in one ephemeris call, the planet cache only holds the classical planets.
+    """
+    backend = backend or DEFAULT_EPHEMERIS_BACKEND
+    extra = ','.join(extended) or None
+    key = cache.key(birth, birth['utc_offset'], extra=extra) if cache is not None else None
+    chart = cache.get(key) if key is not None else None
+    if chart is not None:
+        return chart, {"chart": True, "planets": True, "angles": True}
+
+    jd = birth_julian_day(birth)
+    planets_key = instant_key(jd, backend)
+    planets = planet_cache.get(planets_key) if planet_cache is not None and not extended else None
+    if planets is not None:
+        chart = dict(calculate_angles(jd, birth['latitude'], birth['longitude'], backend),
+                     planets=planets)
+    else:
+        chart = calculate_natal_chart(birth, backend, extended)
+        if planet_cache is not None:
+            planet_cache.put(planets_key, chart["planets"])
+
+    if key is not None:
+        cache.put(key, chart)
+    return chart, {"chart": False, "planets": planets is not None, "angles": False}
+
+
+def _calculate_batch_chart(birth, backend=None):
+    """Pool worker: calculate one chart, reporting failures instead of raising"""
+    try:
+        return calculate_natal_chart(birth, backend)
+    except Exception as e:
+        return {"error": str(e)}
+
+
+# === Batch worker pool === #
+
+_pool = None
+_pool_workers = None
+_pool_lock = threading.Lock()
+
+
+def _warm_up_worker(backend):
+    """Load the ephemeris backend once per worker process"""
+    get_backend(backend or DEFAULT_EPHEMERIS_BACKEND)
+
+
+def _get_pool(max_workers, backend=None):
+    """Create the process pool lazily, so each gunicorn worker owns its own"""
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None:
+            _pool_workers = max_workers or os.cpu_count() or 1
+            _pool = ProcessPoolExecutor(max_workers=_pool_workers,
+                                        mp_context=multiprocessing.get_context(POOL_START_METHOD),
+                                        initializer=_warm_up_worker,
+                                        initargs=(backend,))
+        return _pool, _pool_workers
+
+
+def _discard_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def _map_charts(births, max_workers, backend=None):
+    calculate = partial(_calculate_batch_chart, backend=backend)
+    if len(births) < INLINE_BATCH_SIZE or max_workers == 1:
+        return [calculate(b) for b in births]
+
+    pool, workers = _get_pool(max_workers, backend)
+    # A few chunks per worker keeps the pool busy without per-record IPC
+    chunksize = max(1, len(births) // (workers * 4))
+    try:
+        return list(pool.map(calculate, births, chunksize=chunksize))
+    except BrokenProcessPool:
+        # A worker died (OOM kill, segfault in the C ephemeris); start over
+        # with a fresh pool next time and answer this request inline.
+        _discard_pool()
+        return [calculate(b) for b in births]
+
+
+def calculate_batch(records, max_workers=None, cache=None, backend=None, planet_cache=None):
+    """Calculate many birth records on the process pool, keeping input order"""
+    backend = backend or DEFAULT_EPHEMERIS_BACKEND
+    results = [None] * len(records)
+    pending = []
+
+    # Parse and consult the caches in this process, only records whose
+    # planets are not cached go to the pool
+    for index, record in enumerate(records):
+        try:
+            birth = parse_birth_data(record)
+            key = cache.key(birth, birth['utc_offset']) if cache is not None else None
+            chart = cache.get(key) if key is not None else None
+            if chart is None and planet_cache is not None:
+                jd = birth_julian_day(birth)
+                planets = planet_cache.get(instant_key(jd, backend))
+                if planets is not None:
+                    chart = dict(calculate_angles(jd, birth['latitude'], birth['longitude'], backend),
+                                 planets=planets)
+                    if key is not None:
+                        cache.put(key, chart)
+        except BirthDataError as e:
+            results[index] = {"error": str(e)}
+            continue
+        if chart is not None:
+            results[index] = dict(chart, input_data=birth)
+        else:
+            pending.append((index, birth, key))
+
+    charts = _map_charts([birth for _, birth, _ in pending], max_workers, backend)
+    for (index, birth, key), chart in zip(pending, charts):
+        if "error" in chart:
+            results[index] = chart
+            continue
+        if key is not None:
+            cache.put(key, chart)
+        if planet_cache is not None:
+            planet_cache.put(instant_key(birth_julian_day(birth), backend), chart["planets"])
+        results[index] = dict(chart, input_data=birth)
+
+    return results
@@ -0,0 +1,91 @@
+"""
+Secondary progressions and solar arc directions.
+
+Secondary progressions take one day after birth for each year of life: the
+progressed chart for a date is the sky at natal_jd + age_in_years days.
+Solar arc directions move every natal point by the same arc, the distance
+the progressed Sun has travelled from the natal Sun. The progressed
+Ascendant is the natal one advanced by that arc as well (solar arc in
+longitude), since casting angles for the progressed day would turn them
+a full circle per year.
+
+Everything is evaluated for many dates at once: progressed instants are
+one array, each body is a single vectorized Chebyshev lookup over all of
+them, and the directed points are a broadcast sum, so a monthly timeline
+over decades is one (dates x points) evaluation.
+"""
+import datetime
+
+import numpy as np
+
+from celestial_events import date_to_jd, get_sampler, jd_to_iso
+from natal_chart import PLANETS, sign_of
+
+POINTS = PLANETS + ['Ascendant']
+
+# Days in a tropical year, the "year" of day-for-a-year
+TROPICAL_YEAR = 365.24219
+
+def position_source(natal_jd, target_jds):
+    """Ephemeris backend the progressed positions come from, whatever EPHEMERIS_BACKEND is"""
+    return get_sampler().source(np.append(progressed_jds(natal_jd, target_jds), natal_jd))
+
+
+def month_starts(start, years):
+    """The first of every month from start's month for a number of years"""
+    first = start.year * 12 + start.month - 1
+    return [datetime.date(m // 12, m % 12 + 1, 1) for m in range(first, first + 12 * years)]
+
+
+def progressed_jds(natal_jd, target_jds):
+    """Day-for-a-year instants for target julian days"""
+    return natal_jd + (np.asarray(target_jds, dtype=float) - natal_jd) / TROPICAL_YEAR
+
+
+def progress(natal_jd, natal_ascendant, target_jds):
+    """Progressed and solar arc directed longitudes for many target dates
+
+    Returns (progressed_jd (M,), solar_arc (M,), progressed (M, P),
+    directed (M, P)) with columns in POINTS order.
+    """
+    natal_jd = float(natal_jd)
+    jds = progressed_jds(natal_jd, target_jds)
+    natal = np.array([float(get_sampler()(body, np.array([natal_jd]))[0][0]) for body in PLANETS]
+                     + [float(natal_ascendant)])
+
+    progressed = np.empty((len(jds), len(POINTS)))
+    for column, body in enumerate(PLANETS):
+        progressed[:, column] = get_sampler()(body, jds)[0]
+    solar_arc = (progressed[:, 0] - natal[0]) % 360.0
+    progressed[:, -1] = (natal[-1] + solar_arc) % 360.0
+    directed = (natal + solar_arc[:, None]) % 360.0
+    return jds, solar_arc, progressed, directed
+
+
+def _points(longitudes):
+    return {point: {"sign": sign_of(lon), "degree": round(float(lon), 2)}
+            for point, lon in zip(POINTS, longitudes)}
+
+
+def progressed_chart(natal_jd, natal_ascendant, target_date):
+    """Progressed and solar arc charts for one date"""
+    jds, solar_arc, progressed, directed = progress(natal_jd, natal_ascendant, [date_to_jd(target_date)])
+    return {
+        "target_date": target_date.isoformat(),
+        "progressed_moment": jd_to_iso(jds[0]),
+        "solar_arc": round(float(solar_arc[0]), 4),
+        "progressed": _points(progressed[0]),
+        "directed": _points(directed[0]),
+    }
+
+
+def progression_timeline(natal_jd, natal_ascendant, start, years):
+    """Monthly progressed and directed longitudes as columns, one array per point"""
+    dates = month_starts(start, years)
+    _, solar_arc, progressed, directed = progress(natal_jd, natal_ascendant, [date_to_jd(d) for d in dates])
+    return {
+        "dates": [d.isoformat() for d in dates],
+        "solar_arc": np.round(solar_arc, 4).tolist(),
+        "progressed": {point: np.round(progressed[:, i], 2).tolist() for i, point in enumerate(POINTS)},
+        "directed": {point: np.round(directed[:, i], 2).tolist() for i, point in enumerate(POINTS)},
+    }
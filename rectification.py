@@ -0,0 +1,213 @@
+"""
+Birth-time rectification: rank candidate birth times by how well the
+angles they give are hit at a person's life events.
+
+For every candidate instant of the window the natal planets are computed
+once (one vectorized Chebyshev lookup per body for all candidates) and
+the Ascendant and MC come from the closed-form angle formulas, so a
+candidate costs a few array elements, not a chart. Each event is scored
+with the classic timing techniques:
+
+- transits of the slow planets (Mars to Pluto) to the natal angles
+- the progressed Moon to the natal angles
+- solar arc directed angles to natal planets, and directed planets to
+  the natal angles
+
+Hard aspects (conjunction, square, opposition) within the technique's
+orb score by exactness. The window is scored every COARSE_MINUTES, then
+every minute around the best coarse candidates; both passes are split
+across the batch process pool.
+"""
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+
+from ascendant_grid import ascendant_formula, midheaven_formula, sidereal_obliquity
+from celestial_events import get_sampler, jd_to_iso
+from ephemeris_backends import get_backend
+from natal_chart import DEFAULT_EPHEMERIS_BACKEND, PLANETS, _discard_pool, _get_pool
+from progressions import TROPICAL_YEAR
+
+ANGLES = ['Ascendant', 'MC']
+TRANSIT_BODIES = ['Mars', 'Jupiter', 'Saturn', 'Uranus', 'Neptune', 'Pluto']
+HARD_ASPECTS = {'conjunction': 0.0, 'square': 90.0, 'opposition': 180.0}
+
+# Orb in degrees and weight of a hit per technique
+TECHNIQUES = {
+    'transit': (2.0, 1.0),
+    'progressed_moon': (1.0, 1.0),
+    'solar_arc_angle': (1.0, 1.5),
+    'solar_arc_planet': (1.0, 1.5),
+}
+# Slow transits mark turning points, Mars only triggers them
+TRANSIT_WEIGHTS = np.array([0.5, 0.75, 1.0, 1.0, 1.0, 1.0])
+
+COARSE_MINUTES = 5
+# Coarse candidates refined at one-minute resolution
+REFINE_CANDIDATES = 12
+
+_ASPECT_NAMES = list(HARD_ASPECTS)
+_ASPECT_ANGLES = np.array(list(HARD_ASPECTS.values()))
+
+
+def transit_longitudes(event_jds, backend=None):
+    """(E, TRANSIT_BODIES) longitudes at each event, one grouped ephemeris call per event"""
+    backend = get_backend(backend or DEFAULT_EPHEMERIS_BACKEND)
+    rows = []
+    for jd in event_jds:
+        planets = backend.planets(float(jd), TRANSIT_BODIES)
+        rows.append([planets[body]['lon'] for body in TRANSIT_BODIES])
+    return np.array(rows, dtype=float).reshape(len(event_jds), len(TRANSIT_BODIES))
+
+
+def natal_angles(jds, latitude, longitude):
+    """(N, 2) Ascendant and MC for candidate UT julian days"""
+    sidereal, obliquity = sidereal_obliquity(jds)
+    ramc = (sidereal + longitude) % 360.0
+    return np.stack([ascendant_formula(ramc, latitude, obliquity), midheaven_formula(ramc, obliquity)], axis=-1)
+
+
+def _hard_aspect(moving, fixed):
+    """Distance to the nearest hard aspect and which one, broadcasting moving against fixed"""
+    separation = np.abs((moving - fixed + 180.0) % 360.0 - 180.0)
+    deviation = np.abs(separation[..., None] - _ASPECT_ANGLES)
+    return deviation.min(axis=-1), deviation.argmin(axis=-1)
+
+
+def _terms(jds, latitude, longitude, event_jds, transits):
+    """Per technique (name, deviation, aspect, weight, movers, targets), arrays (N, E, movers, targets)"""
+    jds = np.asarray(jds, dtype=float)
+    event_jds = np.asarray(event_jds, dtype=float)
+    angles = natal_angles(jds, latitude, longitude)
+    planets = np.stack([get_sampler()(body, jds)[0] for body in PLANETS], axis=-1)
+
+    # Day for a year after each candidate instant, (N, E)
+    progressed = jds[:, None] + (event_jds[None, :] - jds[:, None]) / TROPICAL_YEAR
+    solar_arc = (get_sampler()('Sun', progressed)[0] - planets[:, :1]) % 360.0
+    progressed_moon = get_sampler()('Moon', progressed)[0]
+
+    terms = []
+    deviation, aspect = _hard_aspect(transits[None, :, :, None], angles[:, None, None, :])
+    terms.append(('transit', deviation, aspect, TRANSIT_WEIGHTS[:, None], TRANSIT_BODIES, ANGLES))
+    deviation, aspect = _hard_aspect(progressed_moon[:, :, None, None], angles[:, None, None, :])
+    terms.append(('progressed_moon', deviation, aspect, 1.0, ['Moon'], ANGLES))
+    directed_angles = angles[:, None, :] + solar_arc[:, :, None]
+    deviation, aspect = _hard_aspect(directed_angles[:, :, :, None], planets[:, None, None, :])
+    terms.append(('solar_arc_angle', deviation, aspect, 1.0, ANGLES, PLANETS))
+    directed_planets = planets[:, None, :] + solar_arc[:, :, None]
+    deviation, aspect = _hard_aspect(directed_planets[:, :, :, None], angles[:, None, None, :])
+    terms.append(('solar_arc_planet', deviation, aspect, 1.0, PLANETS, ANGLES))
+    return terms
+
+
+def _hit_strength(name, deviation, weight):
+    orb, technique_weight = TECHNIQUES[name]
+    return technique_weight * weight * np.clip(1.0 - deviation / orb, 0.0, None)
+
+
+def score_candidates(jds, latitude, longitude, event_jds, transits):
+    """(N,) scores of candidate birth instants"""
+    score = np.zeros(len(jds))
+    for name, deviation, _, weight, _, _ in _terms(jds, latitude, longitude, event_jds, transits):
+        score += _hit_strength(name, deviation, weight).sum(axis=(1, 2, 3))
+    return score
+
+
+def _score_chunk(job):
+    """Pool worker: score one chunk of candidates"""
+    return score_candidates(*job)
+
+
+def _score_on_pool(jds, latitude, longitude, event_jds, transits, max_workers=None):
+    """score_candidates split into one chunk per pool worker"""
+    if max_workers == 1 or len(jds) < 2:
+        return score_candidates(jds, latitude, longitude, event_jds, transits)
+    pool, workers = _get_pool(max_workers)
+    if workers == 1:
+        return score_candidates(jds, latitude, longitude, event_jds, transits)
+    jobs = [(chunk, latitude, longitude, event_jds, transits) for chunk in np.array_split(jds, workers)]
+    try:
+        return np.concatenate(list(pool.map(_score_chunk, jobs)))
+    except BrokenProcessPool:
+        _discard_pool()
+        return score_candidates(jds, latitude, longitude, event_jds, transits)
+
+
+def explain(jd, latitude, longitude, event_jds, transits, labels=None):
+    """Hits of one candidate instant, strongest first"""
+    hits = []
+    for name, deviation, aspect, weight, movers, targets in _terms([jd], latitude, longitude, event_jds, transits):
+        strength = _hit_strength(name, deviation, weight)[0]
+        for e, m, t in zip(*np.nonzero(strength)):
+            hits.append({
+                "event": labels[e] if labels else int(e),
+                "technique": name,
+                "body": movers[m],
+                "point": targets[t],
+                "aspect": _ASPECT_NAMES[aspect[0, e, m, t]],
+                "orb": round(float(deviation[0, e, m, t]), 2),
+                "strength": round(float(strength[e, m, t]), 3),
+            })
+    hits.sort(key=lambda h: -h["strength"])
+    return hits
+
+
+def _distinct_best(minutes, scores, count, spacing):
+    """Highest scoring minutes at least spacing apart"""
+    chosen = []
+    for i in np.argsort(-scores, kind='stable'):
+        if all(abs(minutes[i] - minutes[j]) >= spacing for j in chosen):
+            chosen.append(i)
+            if len(chosen) == count:
+                break
+    return chosen
+
+
+def clock_minutes(text):
+    """Minutes after midnight of an 'HH:MM' clock time"""
+    try:
+        hour, minute = (int(v) for v in str(text).strip().split(':')[:2])
+    except (TypeError, ValueError):
+        raise ValueError("Window times must be HH:MM")
+    if not (0 <= hour < 24 and 0 <= minute < 60):
+        raise ValueError("Window times must be HH:MM")
+    return hour * 60 + minute
+
+
+def rectify(midnight_jd, start_minute, end_minute, event_jds, latitude, longitude,
+            labels=None, top=5, backend=None, max_workers=None):
+    """Best birth times of a day window for a list of event julian days
+
+    midnight_jd is the UT julian day of local midnight of the birth date,
+    the window is [start_minute, end_minute] in local minutes after it.
+    """
+    if not 0 <= start_minute <= end_minute < 1440:
+        raise ValueError("The time window must start before it ends, within the birth date")
+    event_jds = np.asarray(event_jds, dtype=float)
+    if not len(event_jds) or np.any(event_jds <= midnight_jd + 1.0):
+        raise ValueError("Events are required and must be after the birth date")
+    transits = transit_longitudes(event_jds, backend)
+
+    coarse = np.arange(start_minute, end_minute + 1, COARSE_MINUTES)
+    coarse_scores = _score_on_pool(midnight_jd + coarse / 1440.0, latitude, longitude,
+                                   event_jds, transits, max_workers)
+    best = coarse[np.argsort(-coarse_scores, kind='stable')[:REFINE_CANDIDATES]]
+    fine = np.unique(np.concatenate([np.arange(m - COARSE_MINUTES + 1, m + COARSE_MINUTES) for m in best]))
+    fine = fine[(fine >= start_minute) & (fine <= end_minute)]
+    fine_scores = _score_on_pool(midnight_jd + fine / 1440.0, latitude, longitude,
+                                 event_jds, transits, max_workers)
+
+    results = []
+    for i in _distinct_best(fine, fine_scores, top, COARSE_MINUTES):
+        minute = int(fine[i])
+        jd = midnight_jd + minute / 1440.0
+        ascendant, mc = natal_angles(np.array([jd]), latitude, longitude)[0]
+        results.append({
+            "time": f"{minute // 60:02d}:{minute % 60:02d}",
+            "moment": jd_to_iso(jd),
+            "score": round(float(fine_scores[i]), 3),
+            "ascendant_degree": round(float(ascendant), 2),
+            "mc_degree": round(float(mc), 2),
+            "hits": explain(jd, latitude, longitude, event_jds, transits, labels),
+        })
+    return results, len(coarse) + len(fine)
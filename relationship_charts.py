@@ -0,0 +1,81 @@
+"""
+Composite and Davison relationship charts.
+
+A composite chart places every point at the midpoint of the two natal
+positions, taken along the shorter arc so 350 and 10 degrees meet at 0
+Aries. A Davison chart is a real chart cast for the midpoint in time and
+space of the two births; the instant is the mean of the two julian days,
+handed to the ephemeris layer as is.
+
+Both are symmetric in the two people, so they are cached under the sorted
+pair of natal chart fingerprints and reopening a relationship is a lookup.
+"""
+import numpy as np
+
+from celestial_events import jd_to_iso
+from natal_chart import PLANETS, birth_julian_day, cached_natal_chart, chart_at, sign_of
+from synastry import chart_longitudes
+
+RELATIONSHIP_KINDS = ['composite', 'davison']
+
+
+def midpoints(a, b):
+    """Shorter-arc midpoints of longitude arrays a and b, in [0, 360)"""
+    a = np.asarray(a, dtype=float)
+    difference = (np.asarray(b, dtype=float) - a + 180.0) % 360.0 - 180.0
+    return (a + difference / 2.0) % 360.0
+
+
+def _chart_from_longitudes(longitudes):
+    longitudes = [float(lon) for lon in longitudes]
+    return {
+        "ascendant": sign_of(longitudes[-1]),
+        "ascendant_degree": round(longitudes[-1], 2),
+        "planets": {p: {"sign": sign_of(lon), "degree": round(lon, 2)} for p, lon in zip(PLANETS, longitudes)},
+    }
+
+
+def composite_chart(chart_a, chart_b):
+    """Midpoint chart of two natal charts, planets and ascendant"""
+    return _chart_from_longitudes(midpoints(chart_longitudes(chart_a), chart_longitudes(chart_b)))
+
+
+def davison_chart(birth_a, birth_b, backend=None):
+    """Chart for the mean instant and the midpoint location of two births"""
+    jd = (birth_julian_day(birth_a) + birth_julian_day(birth_b)) / 2.0
+    latitude = (float(birth_a['latitude']) + float(birth_b['latitude'])) / 2.0
+    # Geographic longitude midpoint along the shorter arc, back into [-180, 180)
+    longitude = float(midpoints(birth_a['longitude'], birth_b['longitude']))
+    longitude = (longitude + 180.0) % 360.0 - 180.0
+    chart = chart_at(jd, latitude, longitude, backend)
+    chart["moment"] = jd_to_iso(jd)
+    chart["jd"] = round(jd, 6)
+    chart["location"] = {"latitude": round(latitude, 4), "longitude": round(longitude, 4)}
+    return chart
+
+
+def relationship_key(cache, birth_a, birth_b, kind):
+    """Cache key for a relationship chart, the same whichever person comes first"""
+    pair = sorted([cache.key(birth_a, birth_a['utc_offset']), cache.key(birth_b, birth_b['utc_offset'])])
+    return f"{kind}|{pair[0]}|{pair[1]}"
+
+
+def cached_relationship_chart(kind, birth_a, birth_b, cache=None, natal_cache=None, backend=None,
+                              planet_cache=None):
+    """Composite or Davison chart and whether it was served from cache"""
+    if kind not in RELATIONSHIP_KINDS:
+        raise ValueError(f"kind must be one of {RELATIONSHIP_KINDS}")
+    key = relationship_key(cache, birth_a, birth_b, kind) if cache is not None else None
+    chart = cache.get(key) if key is not None else None
+    if chart is not None:
+        return chart, True
+
+    if kind == 'composite':
+        chart_a, _ = cached_natal_chart(birth_a, natal_cache, backend, planet_cache)
+        chart_b, _ = cached_natal_chart(birth_b, natal_cache, backend, planet_cache)
+        chart = composite_chart(chart_a, chart_b)
+    else:
+        chart = davison_chart(birth_a, birth_b, backend)
+    if key is not None:
+        cache.put(key, chart)
+    return chart, False
@@ -0,0 +1,93 @@
+"""
+Solar and lunar returns.
+
+A return is the instant the transiting Sun (or Moon) is back at its natal
+longitude. Neither body ever goes retrograde, so Newton's method on
+wrapped longitude minus the target, stepping by longitude over speed,
+converges in three or four iterations from a mean-motion guess. Longitude
+and speed come from the vectorized Chebyshev lookups, and all the returns
+in a range are refined together as one array; a year of lunar returns is
+a handful of array evaluations.
+"""
+import datetime
+
+import numpy as np
+
+from celestial_events import UNIX_EPOCH, UNIX_EPOCH_JD, get_sampler, iso_to_jd, jd_to_iso, wrap
+from natal_chart import chart_at
+
+RETURN_BODIES = {'solar': 'Sun', 'lunar': 'Moon'}
+
+# Mean motion in degrees per day and tropical period in days
+_MEAN_MOTION = {'Sun': 0.98564736, 'Moon': 13.17639648}
+_PERIOD = {'Sun': 365.24219, 'Moon': 27.321582}
+
+# Years covered by the Chebyshev ephemeris
+FIRST_YEAR, LAST_YEAR = 1900, 2099
+
+_TOLERANCE_DAYS = 1e-7
+_MAX_ITERATIONS = 12
+
+def search_source(natal_jd, return_jds):
+    """Ephemeris backend the return instants were found with, whatever EPHEMERIS_BACKEND is"""
+    return get_sampler().source(np.append(return_jds, natal_jd))
+
+
+def refine(body, target, guesses):
+    """Newton iterations from every guess to the nearest instant at longitude target"""
+    jd = np.array(guesses, dtype=float)
+    for _ in range(_MAX_ITERATIONS):
+        lon, speed = get_sampler()(body, jd)
+        step = wrap(lon - target) / speed
+        jd = jd - step
+        if np.max(np.abs(step)) < _TOLERANCE_DAYS:
+            break
+    return jd
+
+
+def natal_longitude(body, jd):
+    return float(get_sampler()(body, np.array([jd]))[0][0])
+
+
+def solar_return(natal_jd, year):
+    """Julian day of the Sun's return near the birthday in the given year"""
+    birth_year = _year_of(natal_jd)
+    target = natal_longitude('Sun', natal_jd)
+    guess = natal_jd + (year - birth_year) * _PERIOD['Sun']
+    return float(refine('Sun', target, [guess])[0])
+
+
+def lunar_returns(natal_jd, start_jd, end_jd):
+    """Julian days of every lunar return in [start_jd, end_jd)"""
+    target = natal_longitude('Moon', natal_jd)
+    lon = natal_longitude('Moon', start_jd)
+    first = start_jd + ((target - lon) % 360.0) / _MEAN_MOTION['Moon']
+    # One guess per month plus one either side; Newton moves each to its own return
+    guesses = np.arange(first - _PERIOD['Moon'], end_jd + _PERIOD['Moon'], _PERIOD['Moon'])
+    roots = np.sort(refine('Moon', target, guesses))
+    roots = roots[(roots >= start_jd) & (roots < end_jd)]
+    if len(roots) > 1:
+        roots = roots[np.concatenate([[True], np.diff(roots) > _PERIOD['Moon'] / 2.0])]
+    return roots.tolist()
+
+
+def return_charts(kind, natal_jd, year, latitude, longitude, backend=None):
+    """Return instants of a kind in a year, each with the chart cast for the location"""
+    if kind not in RETURN_BODIES:
+        raise ValueError(f"kind must be one of {sorted(RETURN_BODIES)}")
+    if not FIRST_YEAR <= year <= LAST_YEAR:
+        raise ValueError(f"year must be between {FIRST_YEAR} and {LAST_YEAR}")
+    if kind == 'solar':
+        jds = [solar_return(natal_jd, year)]
+    else:
+        jds = lunar_returns(natal_jd, _jd_of_year(year), _jd_of_year(year + 1))
+    return [dict(chart_at(jd, latitude, longitude, backend), moment=jd_to_iso(jd), jd=round(jd, 6))
+            for jd in jds]
+
+
+def _jd_of_year(year):
+    return iso_to_jd(datetime.datetime(year, 1, 1, tzinfo=datetime.timezone.utc))
+
+
+def _year_of(jd):
+    return (UNIX_EPOCH + datetime.timedelta(days=jd - UNIX_EPOCH_JD)).year
@@ -0,0 +1,150 @@
+"""
+Shared "current sky" for transit and horary requests.
+
+Planet positions depend only on the instant, so everyone asking for the
+sky within the same minute gets the same answer. A SkyService computes
+the positions once per resolution window (a minute by default) and a
+background thread replaces them just after each window starts, so
+requests read a ready snapshot instead of calling the ephemeris.
+"""
+import datetime
+import os
+import threading
+import time
+
+from celestial_events import UNIX_EPOCH_JD
+from ephemeris_backends import get_backend
+from natal_chart import DEFAULT_EPHEMERIS_BACKEND, PLANETS, sign_of
+
+# Width of a snapshot in seconds, every request in the window shares it
+DEFAULT_RESOLUTION = int(os.environ.get('SKY_SNAPSHOT_SECONDS', 60))
+
+
+class SkySnapshot:
+    """Planet positions at the start of one resolution window, never mutated"""
+
+    def __init__(self, window, resolution, backend, positions):
+        self.window = window
+        self.timestamp = window * resolution
+        self.jd = UNIX_EPOCH_JD + self.timestamp / 86400.0
+        self.backend = backend
+        # {body: {'lon', 'lat', 'speed'}} as returned by the backend
+        self.positions = positions
+        self.planets = {
+            body: {
+                'sign': sign_of(p['lon']),
+                'degree': round(p['lon'], 2),
+                'speed': round(p['speed'], 4),
+                'retrograde': p['speed'] < 0,
+            }
+            for body, p in positions.items()
+        }
+
+    @property
+    def moment(self):
+        return datetime.datetime.fromtimestamp(self.timestamp, datetime.timezone.utc)
+
+    def longitudes(self):
+        """Longitudes in PLANETS order, for the aspect engine"""
+        return [self.positions[body]['lon'] for body in PLANETS]
+
+    def to_dict(self):
+        return {
+            "moment": self.moment.isoformat(),
+            "julian_day": round(self.jd, 6),
+            "planets": self.planets,
+            "ephemeris_backend": self.backend,
+        }
+
+
+class SkyService:
+    """Current-sky snapshots for one process, refreshed by a daemon thread"""
+
+    def __init__(self, backend=None, resolution=DEFAULT_RESOLUTION, clock=time.time):
+        self.backend = backend or DEFAULT_EPHEMERIS_BACKEND
+        self.resolution = max(1, int(resolution))
+        self._clock = clock
+        self._snapshot = None
+        self._lock = threading.Lock()
+        self._thread = None
+        self._thread_pid = None
+        self._stop = threading.Event()
+        self.computations = 0
+        self.requests = 0
+
+    def _window(self):
+        return int(self._clock() // self.resolution)
+
+    def _compute(self, window):
+        positions = get_backend(self.backend).planets(
+            UNIX_EPOCH_JD + window * self.resolution / 86400.0, PLANETS)
+        return SkySnapshot(window, self.resolution, self.backend, positions)
+
+    def current(self):
+        """Snapshot for the current window, computing it only if the refresher has not yet"""
+        self.requests += 1
+        self._ensure_refresher()
+        return self._current()
+
+    def _current(self):
+        window = self._window()
+        snapshot = self._snapshot
+        if snapshot is None or snapshot.window != window:
+            with self._lock:
+                snapshot = self._snapshot
+                if snapshot is None or snapshot.window != window:
+                    snapshot = self._snapshot = self._compute(window)
+                    self.computations += 1
+        return snapshot
+
+    def _ensure_refresher(self):
+        # Threads do not survive gunicorn's fork, so check the owner pid too
+        if self._thread is not None and self._thread_pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or self._thread_pid != os.getpid() or not self._thread.is_alive():
+                self._thread_pid = os.getpid()
+                self._thread = threading.Thread(target=self._refresh_loop, name='sky-snapshot',
+                                                daemon=True)
+                self._thread.start()
+
+    def _refresh_loop(self):
+        while not self._stop.is_set():
+            # Wake just after the next window starts
+            delay = self.resolution - self._clock() % self.resolution + 0.05
+            if self._stop.wait(delay):
+                break
+            try:
+                self._current()
+            except Exception:
+                # Keep refreshing, a request will compute it inline if needed
+                pass
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self):
+        snapshot = self._snapshot
+        return {
+            "resolution_seconds": self.resolution,
+            "computations": self.computations,
+            "requests": self.requests,
+            "current": snapshot.moment.isoformat() if snapshot else None,
+            "refresher_running": bool(self._thread and self._thread.is_alive()),
+        }
+
+
+# === Per-process instance === #
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_sky_service(backend=None):
+    """The process wide SkyService, created on first use"""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = SkyService(backend)
+    return _service
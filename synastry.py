@@ -0,0 +1,104 @@
+"""
+Synastry: cross-aspects between two natal charts and a compatibility score.
+
+Both charts become longitude vectors (the classical planets and the
+Ascendant) and go through the aspect engine together: one person against
+C candidates is a single (C, N, N) aspect matrix. Every aspect in orb
+adds its harmony value (positive for trines, negative for squares ...)
+scaled by how exact it is and how much the two points matter, and the
+score is the harmonious share of the total, 0 to 100.
+"""
+import numpy as np
+
+from aspects import AspectSet, aspect_matrix
+from natal_chart import PLANETS
+
+POINTS = PLANETS + ['Ascendant']
+
+# Synastry orbs sit between natal and transit orbs
+SYNASTRY_ORB_FACTOR = 0.75
+
+# +1 flowing, -1 challenging; minor aspects count a quarter
+ASPECT_HARMONY = {
+    'conjunction': 1.0,
+    'sextile': 0.75,
+    'square': -1.0,
+    'trine': 1.0,
+    'opposition': -0.75,
+    'semisextile': 0.25,
+    'semisquare': -0.25,
+    'quintile': 0.25,
+    'sesquiquadrate': -0.25,
+    'quincunx': -0.25,
+}
+
+# Personal points weigh more than the slow planets
+POINT_WEIGHTS = {
+    'Sun': 3.0, 'Moon': 3.0, 'Mercury': 1.5, 'Venus': 2.5, 'Mars': 2.0,
+    'Jupiter': 1.0, 'Saturn': 1.5, 'Ascendant': 2.0,
+}
+
+# Classic relationship contacts, counted in either direction
+KEY_PAIRS = {('Sun', 'Moon'): 1.5, ('Venus', 'Mars'): 1.5, ('Moon', 'Moon'): 1.25,
+             ('Sun', 'Ascendant'): 1.25}
+
+
+def _pair_weights():
+    weights = np.array([POINT_WEIGHTS[p] for p in POINTS])
+    matrix = np.outer(weights, weights)
+    for (a, b), factor in KEY_PAIRS.items():
+        i, j = POINTS.index(a), POINTS.index(b)
+        matrix[i, j] *= factor
+        if i != j:
+            matrix[j, i] *= factor
+    return matrix / matrix.max()
+
+
+PAIR_WEIGHTS = _pair_weights()
+
+
+def chart_longitudes(chart):
+    """Longitudes of POINTS from a natal chart dict"""
+    return np.array([chart["planets"][p]["degree"] for p in PLANETS] + [chart["ascendant_degree"]])
+
+
+def synastry_scores(person, others, aspects=None):
+    """Cross-aspects and scores of one chart against many
+
+    person is (N,) longitudes, others (C, N). Returns the (C, N, N) aspect
+    index and orb arrays (axis 1 the other chart's points, axis 2 the
+    person's) and (C,) score, harmony and tension arrays.
+    """
+    aspects = aspects or AspectSet(orb_factor=SYNASTRY_ORB_FACTOR)
+    others = np.atleast_2d(np.asarray(others, dtype=float))
+    index, orb, _ = aspect_matrix(others, person, aspects=aspects)
+
+    found = index >= 0
+    chosen = np.maximum(index, 0)
+    harmony_table = np.array([ASPECT_HARMONY.get(n, 0.0) for n in aspects.names])
+    exactness = 1.0 - np.abs(np.nan_to_num(orb)) / aspects.orbs[chosen]
+    contribution = np.where(found, harmony_table[chosen] * exactness * PAIR_WEIGHTS, 0.0)
+
+    harmony = np.clip(contribution, 0.0, None).sum(axis=(1, 2))
+    tension = np.clip(-contribution, 0.0, None).sum(axis=(1, 2))
+    total = harmony + tension
+    score = np.where(total > 0, 100.0 * harmony / np.where(total > 0, total, 1.0), 50.0)
+    return index, orb, score, harmony, tension
+
+
+def cross_aspects(index, orb, aspects=None):
+    """Aspects of one (N, N) synastry slice as dicts, tightest orb first"""
+    aspects = aspects or AspectSet(orb_factor=SYNASTRY_ORB_FACTOR)
+    rows, cols = np.nonzero(index >= 0)
+    result = []
+    for i, j in zip(rows.tolist(), cols.tolist()):
+        name = aspects.names[index[i, j]]
+        result.append({
+            "person": POINTS[j],
+            "partner": POINTS[i],
+            "aspect": name,
+            "orb": round(float(orb[i, j]), 2),
+            "harmony": ASPECT_HARMONY.get(name, 0.0),
+        })
+    result.sort(key=lambda a: abs(a["orb"]))
+    return result
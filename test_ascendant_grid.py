@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Test the precomputed ascendant grid and the /natal/preview endpoint
+"""
+import sys
+import os
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+import swisseph as swe
+
+from app import app
+from ascendant_grid import ASCENDANT_MAX_ERROR, GRID_LATITUDE, get_ascendant_grid
+
+BIRTH = {"date": "1990-05-15", "time": "14:30", "latitude": 41.0082, "longitude": 28.9784,
+         "utc_offset": "+03:00"}
+
+
+def separation(a, b):
+    return abs((a - b + 180.0) % 360.0 - 180.0)
+
+
+def test_preview_within_documented_error():
+    grid = get_ascendant_grid()
+    rng = np.random.default_rng(7)
+    for _ in range(2000):
+        jd = rng.uniform(2415020.5, 2488070.5)
+        latitude, longitude = rng.uniform(-GRID_LATITUDE, GRID_LATITUDE), rng.uniform(-180.0, 180.0)
+        ascendant, interpolated = grid.preview(jd, latitude, longitude)
+        exact = swe.houses(jd, latitude, longitude, b'B')[1][0]
+        assert interpolated and separation(ascendant, exact) < ASCENDANT_MAX_ERROR
+
+
+def test_high_latitudes_use_the_formula():
+    grid = get_ascendant_grid()
+    for latitude in (62.0, -64.5, 66.0):
+        jd = 2460000.3
+        ascendant, interpolated = grid.preview(jd, latitude, 10.0)
+        assert not interpolated
+        assert separation(ascendant, swe.houses(jd, latitude, 10.0, b'B')[1][0]) < 0.05
+
+
+def test_vectorized_lookup_wraps_at_aries():
+    grid = get_ascendant_grid()
+    ramc = np.linspace(0.0, 360.0, 4001)
+    ascendant = grid.ascendant(ramc, np.full_like(ramc, 41.0), np.full_like(ramc, 23.44))
+    steps = (np.diff(ascendant) + 180.0) % 360.0 - 180.0
+    # Monotonic in sidereal time, no jump when crossing 0 Aries
+    assert np.all(steps > 0) and steps.max() < 1.0
+
+
+def test_preview_endpoint_matches_natal():
+    client = app.test_client()
+    preview = client.post('/natal/preview', json=BIRTH).get_json()
+    natal = client.post('/natal', json=BIRTH).get_json()
+    assert preview["ascendant"] == natal["ascendant"]
+    assert abs(preview["ascendant_degree"] - natal["ascendant_degree"]) <= 0.011
+    assert preview["max_error_degrees"] == ASCENDANT_MAX_ERROR
+    assert client.post('/natal/preview', json={"date": "1990-05-15"}).status_code == 400
+
+
+if __name__ == "__main__":
+    test_preview_within_documented_error()
+    test_high_latitudes_use_the_formula()
+    test_vectorized_lookup_wraps_at_aries()
+    test_preview_endpoint_matches_natal()
+    print("Test result: PASSED")
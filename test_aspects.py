@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Test the vectorized aspect engine and the /transits endpoint
+"""
+import sys
+import os
+import time
+
+import numpy as np
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import app
+from aspects import MAJOR_ASPECTS, AspectSet, aspect_matrix, find_aspects, list_aspects
+
+
+def brute_force(natal, transit, orbs=MAJOR_ASPECTS):
+    """Closest aspect within orb, one pair at a time"""
+    separation = abs((transit - natal + 180.0) % 360.0 - 180.0)
+    best = None
+    for name, (angle, orb) in orbs.items():
+        if abs(separation - angle) <= orb and (best is None or abs(separation - angle) < best[1]):
+            best = (name, abs(separation - angle))
+    return best and best[0]
+
+
+def test_matrix_matches_pairwise_loop():
+    rng = np.random.default_rng(0)
+    natal = rng.uniform(0, 360, 10)
+    transit = rng.uniform(0, 360, 7)
+    aspects = AspectSet()
+    index, orb, _ = aspect_matrix(natal, transit, aspects=aspects)
+    for i in range(len(natal)):
+        for j in range(len(transit)):
+            expected = brute_force(natal[i], transit[j])
+            found = aspects.names[index[i, j]] if index[i, j] >= 0 else None
+            assert found == expected, (natal[i], transit[j], found, expected)
+
+
+def test_applying_and_separating():
+    # Transit at 88 deg moving forward squares natal 0 deg: applying
+    result = list_aspects(['Sun'], [0.0], ['Mars'], [88.0], transit_speed=[0.5])
+    assert result == [{"transit": "Mars", "natal": "Sun", "aspect": "square",
+                       "orb": -2.0, "applying": True}]
+    assert not list_aspects(['Sun'], [0.0], ['Mars'], [92.0], transit_speed=[0.5])[0]["applying"]
+    # Retrograde transit backing into a conjunction across 0 Aries
+    assert list_aspects(['Sun'], [359.0], ['Mars'], [1.0], transit_speed=[-0.3])[0]["applying"]
+    assert list_aspects(['Sun'], [359.0], ['Mars'], [1.0], transit_speed=[0.3])[0]["applying"] is False
+
+
+def test_orbs_and_aspect_selection():
+    aspects = AspectSet.from_request(['square', 'quincunx'], {'square': 1.0})
+    assert list_aspects(['Sun'], [0.0], ['Mars'], [88.0], aspects=aspects) == []
+    assert list_aspects(['Sun'], [0.0], ['Mars'], [151.0], aspects=aspects)[0]["aspect"] == "quincunx"
+    for names, orbs in [(['sesquisquare'], None), (None, {'trine2': 3}), ('square', None)]:
+        try:
+            AspectSet.from_request(names, orbs)
+        except ValueError:
+            continue
+        raise AssertionError(f"expected ValueError for {names}, {orbs}")
+
+
+def test_orb_overrides_are_validated():
+    assert AspectSet(orbs={"trine": 15}).orbs[3] == 15.0
+    for orb in [float('inf'), float('nan'), 0, -1, 15.5, "x"]:
+        try:
+            AspectSet(orbs={"trine": orb})
+        except ValueError:
+            continue
+        raise AssertionError(f"expected ValueError for orb {orb}")
+
+
+def test_many_charts_against_one_sky():
+    rng = np.random.default_rng(1)
+    natal = rng.uniform(0, 360, (20000, 8))
+    transit = rng.uniform(0, 360, 7)
+    speed = rng.uniform(-1, 13, 7)
+    start = time.perf_counter()
+    chart, natal_point, transit_point, aspect, orb, applying = find_aspects(natal, transit, speed)
+    elapsed = time.perf_counter() - start
+    print(f"20000 charts x 8 points x 7 transits: {elapsed * 1000:.0f} ms, {len(chart)} aspects")
+
+    single = list_aspects([str(i) for i in range(8)], natal[123], [str(i) for i in range(7)],
+                          transit, speed)
+    mine = chart == 123
+    assert len(single) == mine.sum()
+    assert sorted(single, key=lambda a: (a["natal"], a["transit"])) == sorted(
+        ({"transit": str(t), "natal": str(n), "aspect": AspectSet().names[a],
+          "orb": round(float(o), 2), "applying": bool(p)}
+         for n, t, a, o, p in zip(natal_point[mine], transit_point[mine], aspect[mine],
+                                  orb[mine], applying[mine])),
+        key=lambda a: (a["natal"], a["transit"]))
+
+
+def test_transits_endpoint():
+    birth = {"date": "1990-01-15", "time": "14:30", "latitude": 41.0082, "longitude": 28.9784}
+    with app.test_client() as client:
+        data = client.post('/transits', json=birth).get_json()
+        assert set(data["transit_planets"]) == {"Sun", "Moon", "Mercury", "Venus", "Mars",
+                                                "Jupiter", "Saturn"}
+        assert data["count"] == len(data["transits"])
+
+        # The Sun returns to its natal place every year
+        data = client.post('/transits', json=dict(birth, transit_date="2020-01-15",
+                                                  aspects=["conjunction"])).get_json()
+        assert any(t["transit"] == "Sun" and t["natal"] == "Sun" for t in data["transits"])
+        assert all(t["aspect"] == "conjunction" for t in data["transits"])
+
+        assert client.post('/transits', json=dict(birth, aspects=["nope"])).status_code == 400
+        assert client.post('/transits', json=dict(birth, transit_date="15.01.2020")).status_code == 400
+
+        # Orb overrides must be finite degrees in (0, 15], the body must stay valid JSON
+        for orb in ["inf", "nan", "-inf", 0, -2, 500, "wide", None]:
+            response = client.post('/transits', json=dict(birth, orbs={"trine": orb}))
+            assert response.status_code == 400, orb
+        data = client.post('/transits', json=dict(birth, orbs={"trine": "3.5"})).get_json()
+        assert data["orbs"]["trine"] == 3.5
+
+
+if __name__ == "__main__":
+    test_matrix_matches_pairwise_loop()
+    test_applying_and_separating()
+    test_orbs_and_aspect_selection()
+    test_orb_overrides_are_validated()
+    test_many_charts_against_one_sky()
+    test_transits_endpoint()
+    print("Test result: PASSED")
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Test the astrocartography lines and the /astrocartography endpoint
+"""
+import sys
+import os
+import time
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+import swisseph as swe
+
+from app import app
+from astrocartography import (LINE_BODIES, angle_lines, body_coordinates, decode_polyline,
+                              encode_polyline, split_antimeridian)
+from ephemeris_backends import BODY_IDS, julian_day
+
+JD = julian_day("1990-05-15", "14:30", "+03:00")
+BIRTH = {"date": "1990-05-15", "time": "14:30", "latitude": 41.0082, "longitude": 28.9784,
+         "utc_offset": "+03:00"}
+
+
+def altitude_at(body, jd, latitude, longitude):
+    position = swe.calc_ut(jd, BODY_IDS[body])[0]
+    return swe.azalt(jd, swe.ECL2HOR, (longitude, latitude, 0.0), 0.0, 0.0, position[:3])[1]
+
+
+def test_polyline_round_trip():
+    # The example from the format's documentation
+    points = [(38.5, -120.2), (40.7, -120.95), (43.252, -126.453)]
+    assert encode_polyline(points) == "_p~iF~ps|U_ulLnnqC_mqNvxq`@"
+    assert np.allclose(decode_polyline(encode_polyline(points)), points)
+
+
+def test_horizon_lines_have_the_planet_on_the_horizon():
+    lines = angle_lines(JD, angles=('ASC', 'DSC'))
+    for line in lines:
+        for polyline in line["polylines"]:
+            for latitude, longitude in decode_polyline(polyline)[1:-1:15]:
+                altitude = altitude_at(line["body"], JD, latitude, longitude)
+                assert abs(altitude) < 0.05, (line["body"], line["angle"], latitude, longitude, altitude)
+                # Rising on the ASC line, setting on the DSC line; the two meet and graze
+                # the horizon at the circumpolar latitude
+                if abs(latitude) < 60.0:
+                    later = altitude_at(line["body"], JD + 1.0 / 1440.0, latitude, longitude)
+                    assert (later > altitude) == (line["angle"] == 'ASC')
+
+
+def test_mc_lines_match_the_local_sidereal_time():
+    ra, _, _ = body_coordinates(JD)
+    for line in angle_lines(JD, angles=('MC', 'IC')):
+        (south, longitude), (north, _) = decode_polyline(line["polylines"][0])
+        assert south < 0 < north
+        armc = swe.houses(JD, 0.0, longitude)[1][2]
+        expected = ra[LINE_BODIES.index(line["body"])] + (180.0 if line["angle"] == 'IC' else 0.0)
+        assert abs((armc - expected + 180.0) % 360.0 - 180.0) < 0.02
+
+
+def test_antimeridian_split():
+    latitudes = np.array([0.0, 1.0, 2.0, 3.0])
+    segments = split_antimeridian(latitudes, np.array([170.0, 178.0, -178.0, -170.0]))
+    assert len(segments) == 2
+    assert segments[0][-1].tolist() == [1.5, 180.0] and segments[1][0].tolist() == [1.5, -180.0]
+    assert all(np.all(np.abs(np.diff(s[:, 1])) < 180.0) for s in segments)
+
+
+def test_ten_bodies_are_fast():
+    angle_lines(JD)
+    started = time.perf_counter()
+    lines = angle_lines(JD)
+    assert time.perf_counter() - started < 0.1
+    assert len(lines) == 40 and all(line["polylines"] for line in lines)
+
+
+def test_astrocartography_endpoint():
+    client = app.test_client()
+    response = client.post('/astrocartography', json=dict(BIRTH, bodies=['Venus', 'Jupiter'],
+                                                          angles=['MC'], encoding='coordinates'))
+    assert response.status_code == 200
+    result = response.get_json()
+    assert [(l["body"], l["angle"]) for l in result["lines"]] == [('Venus', 'MC'), ('Jupiter', 'MC')]
+    assert len(result["lines"][0]["polylines"][0]) == 2
+
+    assert client.post('/astrocartography', json=dict(BIRTH, bodies=['Vulcan'])).status_code == 400
+    assert client.post('/astrocartography', json=dict(BIRTH, encoding='svg')).status_code == 400
+
+
+if __name__ == "__main__":
+    test_polyline_round_trip()
+    test_horizon_lines_have_the_planet_on_the_horizon()
+    test_mc_lines_match_the_local_sidereal_time()
+    test_antimeridian_split()
+    test_ten_bodies_are_fast()
+    test_astrocartography_endpoint()
+    print("Test result: PASSED")
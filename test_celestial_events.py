@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Test the celestial event index builder and the /events endpoint
+"""
+import sys
+import os
+import tempfile
+
+import numpy as np
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import celestial_events
+from app import app
+from ephemeris_backends import get_backend
+
+# 2024-01-01 to 2025-01-01 00:00 UT
+START_JD, END_JD = 2460310.5, 2460676.5
+
+
+def build_year():
+    tmp = tempfile.mkdtemp()
+    path = os.path.join(tmp, 'events.bin')
+    celestial_events.build(path, START_JD, END_JD)
+    return celestial_events.EventIndex(path)
+
+
+def test_events_are_exact_and_sorted():
+    index = build_year()
+    records = index.records(START_JD, END_JD)
+    assert len(records) == len(index) and np.all(np.diff(records['jd']) >= 0)
+
+    swe = get_backend('swisseph')
+    moon_ingresses = index.query(START_JD, END_JD, ['ingress'], ['Moon'])
+    assert 158 < len(moon_ingresses) < 164
+    for event in moon_ingresses[::20]:
+        lon = swe.planets(event["jd"], ['Moon'])['Moon']['lon']
+        assert abs((lon - celestial_events.SIGNS.index(event["sign"]) * 30 + 180) % 360 - 180) < 0.01
+
+    # Total solar eclipse new moon, 2024-04-08 18:21 UT
+    new_moons = [e for e in index.query(START_JD, END_JD, ['lunation']) if e["phase"] == "new_moon"]
+    assert len(new_moons) == 13  # Dec 1 and Dec 30
+    assert new_moons[3]["time"].startswith("2024-04-08T18:2")
+
+    # Mercury stations retrograde 2024-04-01 and direct 2024-04-25
+    stations = index.query(START_JD, END_JD, ['station'], ['Mercury'])
+    assert [(s["time"][:10], s["direction"]) for s in stations if s["time"][5:7] == "04"] == [
+        ("2024-04-01", "retrograde"), ("2024-04-25", "direct")]
+
+    for event in index.query(START_JD, END_JD, ['aspect'])[::200]:
+        positions = swe.planets(event["jd"], [event["body"], event["other"]])
+        separation = abs((positions[event["other"]]['lon'] - positions[event["body"]]['lon'] + 180) % 360 - 180)
+        angle = celestial_events.MAJOR_ASPECTS[event["aspect"]][0]
+        assert abs(separation - angle) < 0.01, event
+
+
+def test_events_endpoint():
+    celestial_events._index = build_year()
+    try:
+        with app.test_client() as client:
+            data = client.get('/events?start=2024-04-01&end=2024-05-01&types=lunation').get_json()
+            assert [e["phase"] for e in data["events"]] == ["last_quarter", "new_moon",
+                                                            "first_quarter", "full_moon"]
+            assert not data["truncated"]
+            assert client.get('/events?start=2024-04-01&end=2024-05-01&types=eclipse').status_code == 400
+            assert client.get('/events?start=2030-01-01&end=2030-02-01').status_code == 400
+    finally:
+        celestial_events._index = None
+
+
+if __name__ == "__main__":
+    test_events_are_exact_and_sorted()
+    test_events_endpoint()
+    print("Test result: PASSED")
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Test the natal chart LRU cache
+"""
+import sys
+import os
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from chart_cache import ChartCache, chart_fingerprint
+
+BIRTH = {"date": "1990-05-15", "time": "14:30", "latitude": 41.0082, "longitude": 28.9784}
+
+
+def test_fingerprint_normalizes_inputs():
+    same = {"date": "1990/05/15", "time": "14:30:00", "latitude": 41.00823, "longitude": 28.97838}
+    assert chart_fingerprint(BIRTH, '+03:00') == chart_fingerprint(same, '+03:00')
+    assert chart_fingerprint(BIRTH, '+03:00') != chart_fingerprint(BIRTH, '+02:00')
+    assert chart_fingerprint(BIRTH, '+03:00') != chart_fingerprint(dict(BIRTH, latitude=41.1), '+03:00')
+
+
+def test_lru_eviction_and_counters():
+    cache = ChartCache(max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1   # "a" becomes most recently used
+    cache.put("c", 3)            # evicts "b"
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+
+    stats = cache.stats()
+    assert stats["size"] == 2
+    assert (stats["hits"], stats["misses"], stats["evictions"]) == (2, 1, 1)
+
+
+def test_zero_size_disables_cache():
+    cache = ChartCache(max_entries=0)
+    assert cache.get_or_compute("a", lambda: 1) == 1
+    assert len(cache) == 0
+
+
+if __name__ == "__main__":
+    test_fingerprint_normalizes_inputs()
+    test_lru_eviction_and_counters()
+    test_zero_size_disables_cache()
+    print("Test result: PASSED")
@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+Test the Chebyshev ephemeris against flatlib for a short build range
+"""
+import sys
+import os
+import tempfile
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import chebyshev_ephemeris
+
+
+def test_build_and_lookup_matches_flatlib():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'ephemeris.bin')
+        # Two years around 1990-01-01
+        chebyshev_ephemeris.build(path, start_jd=2447892.5, end_jd=2448622.5)
+        ephemeris = chebyshev_ephemeris.ChebyshevEphemeris(path)
+
+        assert ephemeris.covers(2448000.0)
+        assert not ephemeris.covers(2449000.0)
+
+        report = chebyshev_ephemeris.accuracy_report(ephemeris, samples=500)
+        for body, errors in report.items():
+            assert errors["max_lon_error_arcsec"] < 3.0, body
+
+        lon, lat, speed = ephemeris.position('Moon', 2448000.25)
+        lons, lats, speeds = ephemeris.positions('Moon', [2448000.25])
+        assert abs(lon - lons[0]) < 1e-9
+        assert 11.0 < speed < 16.0
+
+
+if __name__ == "__main__":
+    test_build_and_lookup_matches_flatlib()
+    print("Test result: PASSED")
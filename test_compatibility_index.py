@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Test the compatibility index: scores, top-k, shared log updates and endpoints
+"""
+import sys
+import os
+import tempfile
+import time
+
+import numpy as np
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import compatibility_index
+from app import app
+from compatibility_index import CompatibilityIndex
+from synastry import POINTS, synastry_scores
+
+
+def random_profiles(count, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.uniform(0, 360, (count, len(POINTS)))
+
+
+def test_scores_match_synastry():
+    profiles = random_profiles(500)
+    index = CompatibilityIndex()
+    index.upsert([(f"u{i}", lon) for i, lon in enumerate(profiles)])
+    for person in random_profiles(5, seed=1):
+        score, harmony, tension = index.scores(person)
+        _, _, expected_score, expected_harmony, expected_tension = synastry_scores(person, profiles)
+        assert np.allclose(score, expected_score, atol=1e-2)
+        assert np.allclose(harmony, expected_harmony, atol=1e-4)
+        assert np.allclose(tension, expected_tension, atol=1e-4)
+
+        ranking = index.rank(person, k=10, exclude=["u0"])
+        order = [i for i in np.argsort(-expected_score, kind='stable') if i != 0][:10]
+        assert [s for _, s, _, _ in ranking] == sorted((s for _, s, _, _ in ranking), reverse=True)
+        assert np.allclose([s for _, s, _, _ in ranking], expected_score[order], atol=1e-2)
+
+
+def test_updates_are_incremental_and_shared():
+    path = os.path.join(tempfile.mkdtemp(), 'compatibility.bin')
+    first, second = CompatibilityIndex(path), CompatibilityIndex(path)
+    profiles = random_profiles(4)
+    first.upsert([("a", profiles[0]), ("b", profiles[1]), ("c", profiles[2])])
+    assert len(second) == 3
+
+    # Update, remove, re-add: the other worker replays only the new records
+    second.upsert([("a", profiles[3])])
+    assert second.remove("b") and not second.remove("b")
+    assert np.allclose(first.longitudes("a"), profiles[3], atol=1e-4)
+    assert first.longitudes("b") is None and len(first) == 2
+    assert first.stats()["log_records"] == 5
+
+    first.compact()
+    assert first.stats()["log_records"] == 2
+    second.upsert([("d", profiles[1])])
+    assert sorted(p for p, _, _, _ in first.rank(profiles[0], k=10)) == ["a", "c", "d"]
+    assert CompatibilityIndex(path).stats()["profiles"] == 3
+
+    try:
+        first.upsert([("x" * 100, profiles[0])])
+        assert False, "expected ValueError"
+    except ValueError:
+        pass
+
+
+def test_writes_during_compaction_are_kept():
+    import threading
+    path = os.path.join(tempfile.mkdtemp(), 'compatibility.bin')
+    compactor, writer = CompatibilityIndex(path), CompatibilityIndex(path)
+    profiles = random_profiles(1)
+    compactor.upsert([(f"old{i}", profiles[0]) for i in range(2000)])
+    done = threading.Event()
+
+    def compact_repeatedly():
+        while not done.is_set():
+            compactor.compact()
+
+    thread = threading.Thread(target=compact_repeatedly)
+    thread.start()
+    try:
+        for i in range(300):
+            writer.upsert([(f"new{i}", profiles[0])])
+    finally:
+        done.set()
+        thread.join()
+    assert CompatibilityIndex(path).stats()["profiles"] == 2300
+
+
+def test_rank_100k_profiles():
+    index = CompatibilityIndex()
+    index.upsert([(f"u{i}", lon) for i, lon in enumerate(random_profiles(100000))])
+    person = random_profiles(1, seed=2)[0]
+    index.rank(person, k=20)
+    start = time.perf_counter()
+    ranking = index.rank(person, k=20)
+    elapsed = time.perf_counter() - start
+    assert len(ranking) == 20
+    print(f"rank over 100k profiles: {elapsed * 1000:.1f} ms")
+    # Generous bound for shared CI machines, about 70 ms on one core
+    assert elapsed < 0.5
+
+
+def test_compatibility_endpoints():
+    compatibility_index._index = CompatibilityIndex(os.path.join(tempfile.mkdtemp(), 'compatibility.bin'))
+    try:
+        with app.test_client() as client:
+            profiles = [{"id": "ayse", "date": "1990-05-15", "time": "14:30", "latitude": 41.0082,
+                         "longitude": 28.9784},
+                        {"id": "mehmet", "date": "1988-11-02", "time": "08:15", "latitude": 39.9334,
+                         "longitude": 32.8597},
+                        {"id": "zeynep", "date": "1995-02-20", "time": "22:05", "latitude": 38.4237,
+                         "longitude": 27.1428},
+                        {"id": "bad", "date": "yesterday"}]
+            data = client.post('/compatibility/profiles', json={"profiles": profiles}).get_json()
+            assert data["stored"] == 3 and data["profiles"] == 3 and data["errors"][0]["id"] == "bad"
+
+            pair = client.post('/synastry', json={"person": profiles[0], "partner": profiles[1]}).get_json()
+            data = client.post('/compatibility/rank', json={"profile_id": "ayse", "k": 5}).get_json()
+            assert [r["id"] for r in data["ranking"]] != [] and "ayse" not in [r["id"] for r in data["ranking"]]
+            mehmet = next(r for r in data["ranking"] if r["id"] == "mehmet")
+            assert abs(mehmet["score"] - pair["score"]) <= 0.1
+
+            data = client.post('/compatibility/rank', json={"person": profiles[0], "k": 1}).get_json()
+            assert data["count"] == 1 and data["ranking"][0]["id"] == "ayse"
+
+            assert client.delete('/compatibility/profiles/zeynep').status_code == 200
+            assert client.delete('/compatibility/profiles/zeynep').status_code == 404
+            assert client.post('/compatibility/rank', json={"profile_id": "zeynep"}).status_code == 404
+            assert client.post('/compatibility/rank', json={"person": profiles[0], "k": 0}).status_code == 400
+            assert client.post('/compatibility/profiles', json={"profiles": [{"date": "1990-01-01"}]}).status_code == 400
+    finally:
+        compatibility_index._index = None
+
+
+if __name__ == "__main__":
+    test_scores_match_synastry()
+    test_updates_are_incremental_and_shared()
+    test_writes_during_compaction_are_kept()
+    test_rank_100k_profiles()
+    test_compatibility_endpoints()
+    print("Test result: PASSED")
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Test the electional window search and the /electional endpoint
+"""
+import sys
+import os
+import time
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+
+from app import app
+from ephemeris_backends import get_backend, julian_day
+from electional import EDGE_TOLERANCE_MINUTES, evaluate, parse_constraints, search_windows, void_intervals
+from moon_timetable import get_moon_timetable
+
+START = julian_day("2025-01-01", "00:00", "+00:00")
+NATAL_SUN = 54.5
+
+
+def test_venus_retrograde_2025():
+    constraints = parse_constraints([{"type": "retrograde", "body": "Venus"}])
+    windows, found = search_windows(constraints, START, START + 180)
+    assert found == 1
+    # Venus stationed retrograde 2025-03-01/02 and direct 2025-04-12/13 (UT)
+    assert windows[0]["start"][:10] in ("2025-03-01", "2025-03-02")
+    assert windows[0]["end"][:10] in ("2025-04-12", "2025-04-13")
+
+
+def test_edges_are_refined():
+    constraints = parse_constraints([{"type": "sign", "body": "Moon", "signs": ["Taurus"]}])
+    windows, _ = search_windows(constraints, START, START + 30, limit=5)
+    swe = get_backend('swisseph')
+    tolerance = EDGE_TOLERANCE_MINUTES / 1440.0
+    for window in windows:
+        start = julian_day(window["start"][:10], window["start"][11:16], "+00:00")
+        end = julian_day(window["end"][:10], window["end"][11:16], "+00:00")
+        # Taurus is 30-60 degrees: just inside the window at both ends, outside just beyond
+        assert 30.0 <= swe.planets(start + 2 * tolerance, ['Moon'])['Moon']['lon'] < 60.0
+        assert swe.planets(start - 2 * tolerance, ['Moon'])['Moon']['lon'] < 30.0
+        assert 30.0 <= swe.planets(end - 2 * tolerance, ['Moon'])['Moon']['lon'] < 60.0
+        assert swe.planets(end + 2 * tolerance, ['Moon'])['Moon']['lon'] >= 60.0
+
+
+def test_void_intervals_scan_matches_timetable():
+    timetable = get_moon_timetable()
+    if timetable is None or not timetable.covers(START, START + 30):
+        return
+    def overlapping(intervals):
+        starts, ends = intervals
+        inside = (ends > START) & (starts < START + 30)
+        return starts[inside], ends[inside]
+
+    from_table = overlapping(void_intervals(START, START + 30, timetable))
+    scanned = overlapping(void_intervals(START, START + 30))
+    assert np.allclose(from_table[0], scanned[0], atol=1e-4)
+    assert np.allclose(from_table[1], scanned[1], atol=1e-4)
+
+
+def test_multi_month_search_is_fast_and_consistent():
+    constraints = parse_constraints([
+        {"type": "moon_not_void"},
+        {"type": "direct", "body": "Venus"},
+        {"type": "aspect", "body": "Moon", "aspect": "trine", "natal": "Sun"},
+    ], {"Sun": NATAL_SUN})
+    started = time.perf_counter()
+    windows, found = search_windows(constraints, START, START + 92, timetable=get_moon_timetable())
+    assert time.perf_counter() - started < 1.0
+    assert found == len(windows) > 0
+    scores = [w["score"] for w in windows]
+    assert scores == sorted(scores, reverse=True)
+    for window in windows:
+        best = julian_day(window["best_moment"][:10], window["best_moment"][11:16], "+00:00")
+        holds, exactness = evaluate(constraints, [best])
+        assert holds[0] and abs(exactness[0] - window["score"]) < 0.01
+
+
+def test_parse_constraints_errors():
+    for specs in ([], [{"type": "lucky"}], [{"type": "direct", "body": "Sun"}],
+                  [{"type": "sign", "body": "Moon", "signs": ["Ophiuchus"]}],
+                  [{"type": "aspect", "body": "Jupiter", "aspect": "trine", "natal": "Sun"}]):
+        try:
+            parse_constraints(specs)
+            assert False, "expected ValueError"
+        except ValueError:
+            pass
+
+
+def test_electional_endpoint():
+    client = app.test_client()
+    body = {"start": "2025-01-01", "days": 90, "limit": 3,
+            "natal_chart": {"date": "1990-05-15", "time": "14:30", "latitude": 41.0082, "longitude": 28.9784},
+            "constraints": [{"type": "moon_not_void"}, {"type": "direct", "body": "Venus"},
+                            {"type": "aspect", "body": "Jupiter", "aspect": "conjunction", "natal": "Sun", "orb": 5}]}
+    response = client.post('/electional', json=body)
+    assert response.status_code == 200
+    result = response.get_json()
+    assert result["count"] <= 3 and result["constraints"][2] == "Jupiter conjunction natal Sun"
+
+    assert client.post('/electional', json=dict(body, natal_chart=None)).status_code == 400
+    assert client.post('/electional', json=dict(body, days=5000)).status_code == 400
+    assert client.post('/electional', json=dict(body, constraints=[])).status_code == 400
+    for orb in (0, -1, 20, "wide"):
+        aspect = dict(body["constraints"][2], orb=orb)
+        assert client.post('/electional', json=dict(body, constraints=[aspect])).status_code == 400
+
+
+if __name__ == "__main__":
+    test_venus_retrograde_2025()
+    test_edges_are_refined()
+    test_void_intervals_scan_matches_timetable()
+    test_multi_month_search_is_fast_and_consistent()
+    test_parse_constraints_errors()
+    test_electional_endpoint()
+    print("Test result: PASSED")
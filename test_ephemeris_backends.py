@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Test that every ephemeris backend returns the same natal chart as flatlib
+"""
+import sys
+import os
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from flatlib.datetime import Datetime
+
+from benchmark_ephemeris import random_births
+from ephemeris_backends import BACKENDS, calculation_method, get_backend, julian_day
+from natal_chart import calculate_natal_chart
+
+
+def test_julian_day_matches_flatlib():
+    for date, time, offset in [('1990-05-15', '14:30', '+03:00'),
+                               ('1901/01/01', '00:00:30', '-05:30'),
+                               ('2024-02-29', '23:59', '+00:00')]:
+        expected = Datetime(date.replace('-', '/'), time, offset).jd
+        assert abs(julian_day(date, time, offset) - expected) < 1e-9
+
+
+def test_swisseph_backend_matches_flatlib():
+    for birth in random_births(200, seed=1):
+        assert calculate_natal_chart(birth, 'swisseph') == calculate_natal_chart(birth, 'flatlib')
+
+
+def test_unknown_backend_is_rejected():
+    try:
+        get_backend('moshier')
+    except ValueError:
+        return
+    raise AssertionError("expected ValueError")
+
+
+def test_calculation_method_follows_the_backend():
+    from app import app
+    assert len({calculation_method(name) for name in BACKENDS}) == len(BACKENDS)
+    backend = app.config['EPHEMERIS_BACKEND']
+    with app.test_client() as client:
+        data = client.post('/natal', json={"date": "1990-05-15", "time": "14:30",
+                                           "latitude": 41.0082, "longitude": 28.9784}).get_json()
+        assert data["calculation_method"] == calculation_method(backend)
+        assert client.get('/').get_json()["calculation_method"] == calculation_method(backend)
+
+
+if __name__ == "__main__":
+    test_julian_day_matches_flatlib()
+    test_swisseph_backend_matches_flatlib()
+    test_unknown_backend_is_rejected()
+    test_calculation_method_follows_the_backend()
+    print("Test result: PASSED")
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Test the streaming /ephemeris endpoint
+"""
+import sys
+import os
+import json
+import tracemalloc
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import app
+from ephemeris_backends import get_backend
+from ephemeris_stream import iter_positions, ndjson, parse_moment, parse_step
+
+
+def test_rows_match_the_backend():
+    with app.test_client() as client:
+        response = client.get('/ephemeris?start=2024-01-01&end=2024-01-31&step=1d&bodies=moon,sun')
+        assert response.status_code == 200
+        assert response.mimetype == 'application/x-ndjson'
+        rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        assert len(rows) == 31 == int(response.headers['X-Ephemeris-Steps'])
+        assert rows[0]["time"] == "2024-01-01T00:00:00Z" and rows[-1]["time"] == "2024-01-31T00:00:00Z"
+        assert set(rows[0]) == {"time", "jd", "Moon", "Sun"}
+
+        backend = get_backend(app.config['EPHEMERIS_BACKEND'])
+        for row in rows[::10]:
+            expected = backend.planets(row["jd"], ['Moon'])['Moon']['lon']
+            assert abs(row["Moon"]["degree"] - expected) < 1e-3
+
+
+def test_parameters_are_validated():
+    with app.test_client() as client:
+        for query in ['start=2024-13-01', 'start=2024-01-02&end=2024-01-01',
+                      'start=2024-01-01&step=0d', 'start=2024-01-01&bodies=Pluto2',
+                      'start=1900-01-01&end=2100-01-01&step=1m']:
+            assert client.get('/ephemeris?' + query).status_code == 400, query
+
+
+def test_generation_is_lazy_and_flat():
+    start, end = parse_moment('2000-01-01', 'start'), parse_moment('2030-01-01', 'end')
+    lines = ndjson(iter_positions(start, end, parse_step('1h'), ['Moon']))
+    first = next(lines)
+    assert json.loads(first)["time"] == "2000-01-01T00:00:00Z"
+
+    tracemalloc.start()
+    for _ in range(5000):
+        next(lines)
+    early = tracemalloc.get_traced_memory()[0]
+    for _ in range(20000):
+        next(lines)
+    late = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    assert late - early < 200_000
+
+
+if __name__ == "__main__":
+    test_rows_match_the_backend()
+    test_parameters_are_validated()
+    test_generation_is_lazy_and_flat()
+    print("Test result: PASSED")
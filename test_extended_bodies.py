@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Test the opt-in extended chart points (outer planets, nodes, Chiron, MC, house cusps)
+"""
+import sys
+import os
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import swisseph as swe
+
+from app import app
+from ephemeris_backends import get_backend, julian_day
+from natal_chart import EXTENDED_POINTS, BirthDataError, chart_at, parse_extended
+
+BIRTH = {"date": "1990-05-15", "time": "14:30", "latitude": 41.0082, "longitude": 28.9784,
+         "utc_offset": "+03:00"}
+JD = julian_day("1990-05-15", "14:30", "+03:00")
+
+
+def test_parse_extended():
+    assert parse_extended(None) == ()
+    assert parse_extended(False) == ()
+    assert parse_extended(True) == tuple(EXTENDED_POINTS)
+    assert parse_extended('all') == tuple(EXTENDED_POINTS)
+    assert parse_extended('mc, pluto') == ('Pluto', 'MC')
+    assert parse_extended(['Houses', 'north node']) == ('North Node', 'houses')
+    for bad in (['Vulcan'], 42):
+        try:
+            parse_extended(bad)
+            assert False, "expected BirthDataError"
+        except BirthDataError:
+            pass
+
+
+def test_extended_points_match_swisseph():
+    chart = chart_at(JD, 41.0082, 28.9784, 'swisseph', parse_extended(True))
+    extended = chart["extended"]
+    for body, swe_id in (('Uranus', swe.URANUS), ('Neptune', swe.NEPTUNE), ('Pluto', swe.PLUTO),
+                         ('North Node', swe.MEAN_NODE), ('Chiron', swe.CHIRON)):
+        lon = swe.calc_ut(JD, swe_id)[0][0]
+        assert abs(extended[body]["degree"] - round(lon, 2)) < 0.011, body
+    south = (extended['North Node']["degree"] + 180.0) % 360.0
+    assert abs(extended['South Node']["degree"] - south) < 0.011
+    assert extended['North Node']["retrograde"] is True
+
+    cusps, ascmc = swe.houses(JD, 41.0082, 28.9784, b'B')
+    assert abs(extended['MC']["degree"] - round(ascmc[1], 2)) < 0.011
+    assert [h["house"] for h in extended['houses']] == list(range(1, 13))
+    assert abs(extended['houses'][0]["degree"] - chart["ascendant_degree"]) < 0.011
+    assert all(abs(h["degree"] - round(c, 2)) < 0.011 for h, c in zip(extended['houses'], cusps))
+
+
+def test_backends_agree():
+    extended = parse_extended(True)
+    reference = chart_at(JD, 41.0082, 28.9784, 'swisseph', extended)["extended"]
+    for name in ('flatlib', 'chebyshev'):
+        assert chart_at(JD, 41.0082, 28.9784, name, extended)["extended"] == reference, name
+
+
+def test_only_requested_bodies_are_computed():
+    backend = get_backend('swisseph')
+    requested = []
+    original = backend.chart
+
+    def recording_chart(jd, lat, lon, bodies):
+        requested.append(list(bodies))
+        return original(jd, lat, lon, bodies)
+
+    backend.chart = recording_chart
+    try:
+        plain = chart_at(JD, 41.0082, 28.9784, 'swisseph')
+        south = chart_at(JD, 41.0082, 28.9784, 'swisseph', ('South Node', 'MC'))
+    finally:
+        del backend.chart
+    assert "extended" not in plain
+    assert len(requested) == 2
+    assert not set(requested[0]) - {'Sun', 'Moon', 'Mercury', 'Venus', 'Mars', 'Jupiter', 'Saturn'}
+    assert set(requested[1]) - set(requested[0]) == {'North Node'}
+    assert sorted(south["extended"]) == ['MC', 'South Node']
+
+
+def test_natal_endpoint():
+    client = app.test_client()
+    plain = client.post('/natal', json=BIRTH).get_json()
+    assert "extended" not in plain
+
+    response = client.post('/natal', json=dict(BIRTH, extended=['Pluto', 'houses']))
+    assert response.status_code == 200
+    body = response.get_json()
+    assert sorted(body["extended"]) == ['Pluto', 'houses']
+    assert body["planets"] == plain["planets"]
+    # Cached separately from the plain chart
+    again = client.post('/natal', json=dict(BIRTH, extended=['Pluto', 'houses'])).get_json()
+    assert again["served_from_cache"]["chart"] is True and again["extended"] == body["extended"]
+
+    assert client.post('/natal', json=dict(BIRTH, extended=['Vulcan'])).status_code == 400
+
+
+if __name__ == "__main__":
+    test_parse_extended()
+    test_extended_points_match_swisseph()
+    test_backends_agree()
+    test_only_requested_bodies_are_computed()
+    test_natal_endpoint()
+    print("Test result: PASSED")
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Test the offline gazetteer and birth_location resolution
+"""
+import sys
+import os
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import app
+from gazetteer import get_gazetteer, normalize
+from natal_chart import parse_birth_data
+
+
+def test_normalize_folds_turkish_letters():
+    assert normalize("Kadıköy") == normalize("KADIKÖY") == normalize("kadikoy") == "kadikoy"
+    assert normalize("İSTANBUL") == normalize("istanbul")
+    assert normalize("Şanlıurfa") == "sanliurfa"
+    assert normalize("  Çanakkale,  ") == "canakkale"
+
+
+def test_prefix_search_ranks_primary_names_by_population():
+    gazetteer = get_gazetteer()
+    assert gazetteer.search("ist")[0]["name"] == "Istanbul"
+    assert gazetteer.search("izm")[0]["name"] == "İzmir"
+    assert gazetteer.search("ank")[0]["name"] == "Ankara"
+    assert gazetteer.search("münch")[0]["name"] == "Munich"
+    assert all(p["country_code"] == "TR" for p in gazetteer.search("k", 20, country="Türkiye"))
+    assert gazetteer.search("zzzzqx") == []
+
+
+def test_resolve_uses_context_parts():
+    gazetteer = get_gazetteer()
+    assert gazetteer.resolve("Kadıköy, İstanbul")["admin1_code"] == "34"
+    assert gazetteer.resolve("Paris")["country_code"] == "FR"
+    assert gazetteer.resolve("Paris, ABD")["country_code"] == "US"
+    assert gazetteer.resolve("nowhere at all") is None
+
+
+def test_birth_location_is_resolved_without_coordinates():
+    birth = parse_birth_data({"date": "1990-07-15", "time": "14:30", "birth_location": "izmir"})
+    assert round(birth["latitude"], 1) == 38.4
+    assert birth["timezone"] == "Europe/Istanbul"
+    assert birth["utc_offset"] == "+03:00"
+    assert birth["place"]["name"] == "İzmir"
+
+    with app.test_client() as client:
+        response = client.post('/natal', json={"date": "1990-07-15", "time": "14:30",
+                                               "birth_location": "Erzurum, Türkiye"})
+        assert response.status_code == 200
+        assert response.get_json()["input_data"]["place"]["name"] == "Erzurum"
+
+        response = client.post('/natal', json={"date": "1990-07-15", "time": "14:30",
+                                               "birth_location": "Qwxyzville"})
+        assert response.status_code == 400
+
+
+def test_places_search_endpoint():
+    with app.test_client() as client:
+        data = client.get('/places/search?q=kadık&limit=3&country=TR').get_json()
+        assert 0 < data["count"] <= 3
+        assert all(p["name"] == "Kadıköy" for p in data["results"])
+        assert client.get('/places/search').status_code == 400
+        assert client.get('/places/search?q=ist&limit=x').status_code == 400
+        assert client.get('/places/search?q=ist&country=Atlantis').status_code == 400
+        assert client.get('/places/search?q=ist&country=Türkiye').status_code == 200
+
+
+def test_nearest_matches_brute_force():
+    import numpy as np
+    from gazetteer import _unit_vector
+    gazetteer = get_gazetteer()
+    points = np.array([_unit_vector(a, b) for a, b in zip(gazetteer._latitude, gazetteer._longitude)])
+    rng = np.random.default_rng(0)
+    for lat, lon in zip(rng.uniform(-80, 80, 300), rng.uniform(-180, 180, 300)):
+        row, _ = gazetteer.nearest(lat, lon)
+        query = np.array(_unit_vector(lat, lon))
+        distances = ((points - query) ** 2).sum(axis=1)
+        assert distances[row] <= distances.min() + 1e-15
+
+
+def test_reverse_geocoding():
+    gazetteer = get_gazetteer()
+    place = gazetteer.reverse(41.0138, 28.9497)
+    assert place["name"] == "Istanbul" and place["distance_km"] < 0.1
+    assert gazetteer.reverse(0.0, -150.0, max_distance_km=100) is None
+
+    birth = parse_birth_data({"date": "1990-07-15", "time": "14:30",
+                              "latitude": 39.92, "longitude": 32.85})
+    assert birth["place"]["country_code"] == "TR" and birth["place"]["distance_km"] < 10
+
+    with app.test_client() as client:
+        data = client.get('/places/reverse?lat=38.42&lon=27.14').get_json()
+        assert data["place"]["name"] == "İzmir"
+        assert data["timezone"] == "Europe/Istanbul"
+        assert client.get('/places/reverse?lat=95&lon=0').status_code == 400
+        assert client.get('/places/reverse?lat=x').status_code == 400
+
+
+def test_border_coordinates_keep_the_polygon_zone():
+    # Nearest cities are across the border (Badajoz, Przemysl)
+    birth = parse_birth_data({"date": "1990-07-15", "time": "14:30",
+                              "latitude": 38.88, "longitude": -7.05})
+    assert birth["place"]["country_code"] == "ES"
+    assert birth["timezone"] == "Europe/Lisbon" and birth["utc_offset"] == "+01:00"
+    birth = parse_birth_data({"date": "1990-07-15", "time": "14:30",
+                              "latitude": 49.78, "longitude": 22.95})
+    assert birth["place"]["country_code"] == "PL"
+    assert birth["timezone"] in ("Europe/Kyiv", "Europe/Kiev") and birth["utc_offset"] == "+03:00"
+
+
+if __name__ == "__main__":
+    test_normalize_folds_turkish_letters()
+    test_prefix_search_ranks_primary_names_by_population()
+    test_resolve_uses_context_parts()
+    test_birth_location_is_resolved_without_coordinates()
+    test_places_search_endpoint()
+    test_nearest_matches_brute_force()
+    test_reverse_geocoding()
+    test_border_coordinates_keep_the_polygon_zone()
+    print("Test result: PASSED")
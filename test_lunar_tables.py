@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Test the Moon phase table, the eclipse catalogue and their endpoints
+"""
+import sys
+import os
+import datetime
+import tempfile
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import lunar_tables
+from app import app
+
+# 2024-01-01 to 2026-01-01 00:00 UT
+START_JD, END_JD = 2460310.5, 2461041.5
+
+
+def build_tables():
+    tmp = tempfile.mkdtemp()
+    path = os.path.join(tmp, 'lunar_tables.bin')
+    lunar_tables.build(path, START_JD, END_JD)
+    return lunar_tables.LunarTables(path)
+
+
+def test_phases_and_eclipses():
+    tables = build_tables()
+    assert tables.days == 731
+
+    april = tables.phases(datetime.date(2024, 4, 1), datetime.date(2024, 4, 30))
+    assert len(april) == 30
+    assert [(d["date"], d["phase"]) for d in april if d["phase"] in lunar_tables.PRINCIPAL_PHASES] == [
+        ("2024-04-02", "last_quarter"), ("2024-04-08", "new_moon"),
+        ("2024-04-15", "first_quarter"), ("2024-04-23", "full_moon")]
+    assert april[7]["illumination"] < 0.01 and april[23]["illumination"] > 0.98
+
+    try:
+        tables.phases(datetime.date(2023, 12, 31), datetime.date(2024, 1, 2))
+        assert False, "expected ValueError"
+    except ValueError:
+        pass
+
+    # Total solar eclipse 2024-04-08, greatest eclipse 18:17 UT over Mexico
+    solar = tables.eclipses(START_JD, END_JD, 'solar')
+    assert len(solar) == 4
+    total = solar[0]
+    assert total["time"].startswith("2024-04-08T18:17") and total["type"] == "total"
+    assert total["saros"] == 139 and abs(total["magnitude"] - 1.0566) < 0.002
+
+    # Total lunar eclipse 2025-03-14, umbral magnitude 1.178
+    lunar = tables.next_eclipse(lunar_tables.date_to_jd(datetime.date(2025, 1, 1)), 'lunar')
+    assert lunar["time"].startswith("2025-03-14") and lunar["type"] == "total"
+    assert abs(lunar["magnitude"] - 1.178) < 0.01
+
+    previous = tables.next_eclipse(lunar_tables.date_to_jd(datetime.date(2024, 4, 8)), previous=True)
+    assert previous["kind"] == "lunar" and previous["time"].startswith("2024-03-25")
+    assert previous["type"] == "penumbral"
+    assert tables.next_eclipse(END_JD) is None
+
+
+def test_lunar_endpoints():
+    lunar_tables._tables = build_tables()
+    try:
+        with app.test_client() as client:
+            data = client.get('/moon/phases?start=2024-04-08&end=2024-04-09').get_json()
+            assert [d["phase"] for d in data["phases"]] == ["new_moon", "waxing_crescent"]
+            assert client.get('/moon/phases?start=2030-01-01').status_code == 400
+            assert client.get('/moon/phases?start=april').status_code == 400
+
+            data = client.get('/eclipses?start=2024-01-01&end=2025-01-01').get_json()
+            assert [e["kind"] for e in data["eclipses"]] == ["lunar", "solar", "lunar", "solar"]
+            assert client.get('/eclipses?start=2024-01-01&end=2025-01-01&kind=x').status_code == 400
+
+            data = client.get('/eclipses/next?date=2024-04-09&kind=solar').get_json()
+            assert data["eclipse"]["type"] == "annular"
+            data = client.get('/eclipses/previous?date=2024-04-09&kind=solar').get_json()
+            assert data["eclipse"]["time"].startswith("2024-04-08")
+    finally:
+        lunar_tables._tables = None
+
+
+if __name__ == "__main__":
+    test_phases_and_eclipses()
+    test_lunar_endpoints()
+    print("Test result: PASSED")
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Test the incremental Moon timetable and the /moon/timetable endpoint
+"""
+import sys
+import os
+import tempfile
+
+import numpy as np
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import moon_timetable
+from app import app
+from aspects import MAJOR_ASPECTS
+from ephemeris_backends import get_backend
+
+# 2024-01-01, 2024-03-01 and 2024-05-01 00:00 UT
+JAN, MAR, MAY = 2460310.5, 2460370.5, 2460431.5
+
+
+def test_extend_matches_a_full_build():
+    tmp = tempfile.mkdtemp()
+    full_path = os.path.join(tmp, 'full.bin')
+    path = os.path.join(tmp, 'moon.bin')
+    moon_timetable.build(full_path, JAN, MAY)
+    moon_timetable.build(path, JAN, MAR)
+    before = len(moon_timetable.MoonTimetable(path))
+    assert moon_timetable.extend(path, MAY) > 0
+    assert moon_timetable.extend(path, MAY) == 0
+
+    full = moon_timetable.MoonTimetable(full_path)._periods
+    extended = moon_timetable.MoonTimetable(path)._periods
+    assert len(extended) == len(full) and len(full) > before
+    assert np.all(extended['sign'] == full['sign'])
+    assert np.allclose(extended['ingress'], full['ingress'], atol=1e-4)
+    assert np.allclose(extended['last_aspect'], full['last_aspect'], atol=1e-4, equal_nan=True)
+    assert np.all(extended['ingress'][1:] == extended['next_ingress'][:-1])
+
+
+def test_void_of_course_has_no_aspect():
+    tmp = tempfile.mkdtemp()
+    path = os.path.join(tmp, 'moon.bin')
+    moon_timetable.build(path, MAR, MAY)
+    timetable = moon_timetable.MoonTimetable(path)
+
+    # Moon enters Capricorn 2024-04-01 04:05 UT, void from the trine to Mercury at 22:54 the day before
+    period = timetable.at(2460401.75)
+    assert period["sign"] == "Capricorn" and period["ingress"].startswith("2024-04-01T04:05")
+    previous = timetable.at(2460401.0)
+    assert previous["last_aspect"] == {"time": previous["void_of_course"]["start"],
+                                       "aspect": "trine", "body": "Mercury"}
+    assert previous["void_of_course"]["start"].startswith("2024-03-31T22:54")
+
+    swe = get_backend('swisseph')
+    angles = np.array([angle for angle, _ in MAJOR_ASPECTS.values()])
+    for record in timetable._periods[::4]:
+        start = record['ingress'] if np.isnan(record['last_aspect']) else record['last_aspect']
+        for jd in np.linspace(start + 0.01, record['next_ingress'] - 0.01, 20):
+            positions = swe.planets(jd, moon_timetable.PLANETS)
+            moon = positions['Moon']['lon']
+            assert int(moon // 30) == record['sign']
+        # Separations move monotonically here, so no aspect angle lies between the ends
+        ends = [swe.planets(jd, moon_timetable.PLANETS) for jd in (start + 0.001, record['next_ingress'])]
+        for body in moon_timetable.ASPECT_BODIES:
+            a, b = (abs((p[body]['lon'] - p['Moon']['lon'] + 180) % 360 - 180) for p in ends)
+            assert not np.any((angles > min(a, b)) & (angles < max(a, b))), (record, body)
+
+
+def test_timetable_endpoint():
+    tmp = tempfile.mkdtemp()
+    path = os.path.join(tmp, 'moon.bin')
+    moon_timetable.build(path, MAR, MAY)
+    moon_timetable._timetable = moon_timetable.MoonTimetable(path)
+    try:
+        with app.test_client() as client:
+            data = client.get('/moon/timetable?start=2024-04-01&end=2024-04-08').get_json()
+            assert [p["sign"] for p in data["periods"]] == ["Sagittarius", "Capricorn", "Aquarius", "Pisces",
+                                                            "Aries"]
+            data = client.get('/moon/timetable?start=2024-04-01T12:00').get_json()
+            assert [p["sign"] for p in data["periods"]] == ["Capricorn"]
+            data = client.get('/moon/timetable?start=2024-04-01&end=2024-04-08&void=true').get_json()
+            assert data["count"] == 4 and data["periods"][0]["void_of_course"]["end"].startswith("2024-04-01")
+            assert client.get('/moon/timetable?start=2024-04-01&end=2024-03-01').status_code == 400
+            assert client.get('/moon/timetable?start=2030-01-01').status_code == 400
+            assert client.get('/moon/timetable').status_code == 400
+
+            # A nightly extend is picked up without a restart
+            moon_timetable.extend(path, MAY + 30)
+            assert moon_timetable.get_moon_timetable().end_jd > MAY + 20
+            assert client.get('/moon/timetable?start=2024-05-20').status_code == 200
+    finally:
+        moon_timetable._timetable = None
+
+
+if __name__ == "__main__":
+    test_extend_matches_a_full_build()
+    test_void_of_course_has_no_aspect()
+    test_timetable_endpoint()
+    print("Test result: PASSED")
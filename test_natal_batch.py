@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Test the /natal/batch endpoint locally
+"""
+import sys
+import os
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import app
+
+RECORDS = [
+    {"date": "1990-01-15", "time": "14:30", "latitude": 40.7128, "longitude": -74.0060},
+    {"date": "1985-07-04", "time": "08:15", "latitude": 41.0082, "longitude": 28.9784},
+    {"date": "1985-07-04"},
+    {"birth_date": "2000-02-29", "birth_time": "23:59", "birth_location": "Istanbul"},
+    {"date": "1975-11-30", "time": "06:00", "latitude": -33.8688, "longitude": 151.2093},
+]
+
+
+def test_batch_matches_single_requests():
+    with app.test_client() as client:
+        response = client.post('/natal/batch', json={"records": RECORDS})
+        assert response.status_code == 200
+
+        data = response.get_json()
+        assert data["count"] == len(RECORDS)
+        assert data["errors"] == 1
+        assert [r["index"] for r in data["results"]] == list(range(len(RECORDS)))
+        assert data["results"][2]["error"] == "Latitude and longitude are required"
+
+        for record, result in zip(RECORDS, data["results"]):
+            if "error" in result:
+                continue
+            single = client.post('/natal', json=record).get_json()
+            assert result["planets"] == single["planets"]
+            assert result["ascendant_degree"] == single["ascendant_degree"]
+
+
+def test_batch_rejects_empty_and_oversized_requests():
+    with app.test_client() as client:
+        assert client.post('/natal/batch', json={"records": []}).status_code == 400
+        too_many = RECORDS * (app.config['NATAL_BATCH_MAX_RECORDS'] // len(RECORDS) + 1)
+        assert client.post('/natal/batch', json={"records": too_many}).status_code == 400
+
+
+if __name__ == "__main__":
+    test_batch_matches_single_requests()
+    test_batch_rejects_empty_and_oversized_requests()
+    print("Test result: PASSED")
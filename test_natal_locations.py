@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Test location-only recomputation: planets are reused for the same instant
+"""
+import sys
+import os
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import app, natal_cache, planet_cache
+
+BIRTH = {"date": "1988-03-21", "time": "09:45", "latitude": 41.0082, "longitude": 28.9784}
+
+
+def test_corrected_city_reuses_planets():
+    natal_cache.clear()
+    planet_cache.clear()
+    with app.test_client() as client:
+        first = client.post('/natal', json=BIRTH).get_json()
+        assert first["served_from_cache"] == {"chart": False, "planets": False, "angles": False}
+
+        moved = client.post('/natal', json=dict(BIRTH, latitude=39.9334, longitude=32.8597)).get_json()
+        assert moved["served_from_cache"] == {"chart": False, "planets": True, "angles": False}
+        assert moved["planets"] == first["planets"]
+        assert moved["ascendant_degree"] != first["ascendant_degree"]
+
+        again = client.post('/natal', json=BIRTH).get_json()
+        assert again["served_from_cache"]["chart"] is True
+
+
+def test_candidate_cities_in_one_request():
+    with app.test_client() as client:
+        response = client.post('/natal/locations', json={
+            "date": "1979-12-01", "time": "18:20",
+            "locations": [
+                {"latitude": 38.4237, "longitude": 27.1428},
+                {"latitude": 36.8969, "longitude": 30.7133},
+                {"latitude": "unknown", "longitude": 30.7133},
+            ]
+        })
+        assert response.status_code == 200
+
+        results = response.get_json()["results"]
+        assert results[0]["planets"] == results[1]["planets"]
+        assert results[1]["served_from_cache"]["planets"] is True
+        assert "error" in results[2]
+
+        single = client.post('/natal', json={"date": "1979-12-01", "time": "18:20",
+                                             "latitude": 36.8969, "longitude": 30.7133}).get_json()
+        assert single["ascendant_degree"] == results[1]["ascendant_degree"]
+
+
+if __name__ == "__main__":
+    test_corrected_city_reuses_planets()
+    test_candidate_cities_in_one_request()
+    print("Test result: PASSED")
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Test secondary progressions, solar arc directions and the /progressions endpoint
+"""
+import sys
+import os
+import datetime
+import time
+
+import numpy as np
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import app
+from celestial_events import date_to_jd
+from chebyshev_ephemeris import get_ephemeris
+from ephemeris_backends import get_backend, julian_day
+from natal_chart import PLANETS
+from progressions import TROPICAL_YEAR, month_starts, progress, progressed_chart
+
+BIRTH = {"date": "1990-05-15", "time": "14:30", "latitude": 41.0082, "longitude": 28.9784}
+NATAL_JD = julian_day("1990-05-15", "14:30", "+03:00")
+
+
+def test_progressed_positions_match_the_ephemeris():
+    targets = [date_to_jd(datetime.date(2000 + i, 1, 1)) for i in range(0, 40, 7)]
+    jds, solar_arc, progressed, directed = progress(NATAL_JD, 100.0, targets)
+    swe = get_backend('swisseph')
+    natal_sun = swe.planets(NATAL_JD, ['Sun'])['Sun']['lon']
+    for row, target in enumerate(targets):
+        expected_jd = NATAL_JD + (target - NATAL_JD) / TROPICAL_YEAR
+        assert abs(jds[row] - expected_jd) < 1e-9
+        planets = swe.planets(expected_jd, PLANETS)
+        for column, body in enumerate(PLANETS):
+            assert abs((progressed[row, column] - planets[body]['lon'] + 180) % 360 - 180) < 1e-3
+        arc = (planets['Sun']['lon'] - natal_sun) % 360.0
+        assert abs(solar_arc[row] - arc) < 1e-3
+        assert abs(progressed[row, -1] - (100.0 + solar_arc[row]) % 360.0) < 1e-9
+        # Directed Sun is the progressed Sun
+        assert abs(directed[row, 0] - progressed[row, 0]) < 1e-6
+
+
+def test_solar_arc_is_about_a_degree_a_year():
+    chart = progressed_chart(NATAL_JD, 100.0, datetime.date(2020, 5, 15))
+    assert 28.0 < chart["solar_arc"] < 31.0
+    assert chart["progressed_moment"].startswith("1990-06-14")
+
+
+def test_timeline_is_monthly_and_fast():
+    dates = month_starts(datetime.date(2024, 3, 15), 2)
+    assert len(dates) == 24 and dates[0] == datetime.date(2024, 3, 1) and dates[-1] == datetime.date(2026, 2, 1)
+
+    targets = [date_to_jd(d) for d in month_starts(datetime.date(2000, 1, 1), 100)]
+    start = time.perf_counter()
+    _, solar_arc, _, _ = progress(NATAL_JD, 100.0, targets)
+    assert time.perf_counter() - start < 0.5
+    assert np.all(np.diff(solar_arc) > 0)
+
+
+def test_progressions_endpoint():
+    with app.test_client() as client:
+        data = client.post('/progressions', json=dict(BIRTH, target_date="2020-05-15")).get_json()
+        assert data["target_date"] == "2020-05-15" and set(data["progressed"]) == set(PLANETS + ["Ascendant"])
+        assert data["directed"]["Sun"] == data["progressed"]["Sun"]
+        # The reported backend is the one the progressed positions came from
+        assert data["ephemeris_backend"] == ('chebyshev' if get_ephemeris() else 'swisseph')
+        assert data["natal_ephemeris_backend"] == app.config['EPHEMERIS_BACKEND']
+
+        timeline = client.post('/progressions', json=dict(BIRTH, timeline={"start": "2024-01-01", "years": 5}))
+        timeline = timeline.get_json()["timeline"]
+        assert len(timeline["dates"]) == 60 and len(timeline["progressed"]["Moon"]) == 60
+        assert timeline["dates"][12] == "2025-01-01"
+
+        assert client.post('/progressions', json=dict(BIRTH, target_date="soon")).status_code == 400
+        assert client.post('/progressions', json=dict(BIRTH, timeline={"start": "2024-01-01",
+                                                                       "years": 1000})).status_code == 400
+
+
+if __name__ == "__main__":
+    test_progressed_positions_match_the_ephemeris()
+    test_solar_arc_is_about_a_degree_a_year()
+    test_timeline_is_monthly_and_fast()
+    test_progressions_endpoint()
+    print("Test result: PASSED")
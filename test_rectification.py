@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Test the birth-time rectification search and the /rectification endpoint
+"""
+import sys
+import os
+import time
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+import swisseph as swe
+
+from app import app
+from ephemeris_backends import julian_day
+from rectification import (clock_minutes, explain, natal_angles, rectify, score_candidates,
+                           transit_longitudes)
+
+MIDNIGHT = julian_day("1990-05-15", "00:00", "+03:00")
+EVENTS = [julian_day(d, "12:00", "+00:00") for d in ("2008-09-01", "2012-06-20", "2015-02-10",
+                                                      "2019-11-05", "2021-03-15")]
+
+
+def test_angles_match_swisseph():
+    jds = MIDNIGHT + np.arange(0, 1440, 97) / 1440.0
+    angles = natal_angles(jds, 41.0, 29.0)
+    for jd, (ascendant, mc) in zip(jds, angles):
+        exact = swe.houses(jd, 41.0, 29.0, b'B')[1]
+        assert abs((ascendant - exact[0] + 180.0) % 360.0 - 180.0) < 0.01
+        assert abs((mc - exact[1] + 180.0) % 360.0 - 180.0) < 0.01
+
+
+def test_coarse_to_fine_finds_the_exhaustive_best():
+    transits = transit_longitudes(EVENTS)
+    minutes = np.arange(1440)
+    scores = score_candidates(MIDNIGHT + minutes / 1440.0, 41.0, 29.0, np.array(EVENTS), transits)
+
+    start = time.perf_counter()
+    candidates, scored = rectify(MIDNIGHT, 0, 1439, EVENTS, 41.0, 29.0, top=3, max_workers=1)
+    elapsed = time.perf_counter() - start
+    assert elapsed < 2.0, elapsed
+    assert scored < 1440
+    best = candidates[0]
+    assert best["time"] == f"{minutes[np.argmax(scores)] // 60:02d}:{minutes[np.argmax(scores)] % 60:02d}"
+    assert abs(best["score"] - scores.max()) < 1e-3
+    assert [c["score"] for c in candidates] == sorted((c["score"] for c in candidates), reverse=True)
+    # Hits explain the score
+    assert abs(sum(h["strength"] for h in best["hits"]) - best["score"]) < 0.01
+
+
+def test_pool_matches_inline():
+    jds = MIDNIGHT + np.arange(0, 1440, 5) / 1440.0
+    transits = transit_longitudes(EVENTS)
+    from rectification import _score_on_pool
+    inline = score_candidates(jds, 41.0, 29.0, np.array(EVENTS), transits)
+    pooled = _score_on_pool(jds, 41.0, 29.0, np.array(EVENTS), transits, max_workers=2)
+    assert np.allclose(inline, pooled)
+
+
+def test_explain_reports_hits():
+    transits = transit_longitudes(EVENTS[:1])
+    hits = explain(MIDNIGHT + 0.5, 41.0, 29.0, EVENTS[:1], transits, ["graduation"])
+    assert all(h["event"] == "graduation" and 0 < h["strength"] and h["orb"] <= 2.0 for h in hits)
+
+
+def test_clock_minutes():
+    assert clock_minutes("06:30") == 390
+    for bad in ("24:00", "noon", None):
+        try:
+            clock_minutes(bad)
+            assert False, "expected ValueError"
+        except ValueError:
+            pass
+
+
+def test_rectification_endpoint():
+    client = app.test_client()
+    body = {"date": "1990-05-15", "latitude": 41.0, "longitude": 29.0,
+            "window": {"start": "06:00", "end": "18:00"}, "top": 3,
+            "events": [{"date": "2008-09-01", "label": "graduation"}, "2012-06-20", "2015-02-10"]}
+    response = client.post('/rectification', json=body)
+    assert response.status_code == 200
+    result = response.get_json()
+    assert len(result["candidates"]) == 3
+    assert all("06:00" <= c["time"] <= "18:00" and c["ascendant"] for c in result["candidates"])
+
+    assert client.post('/rectification', json=dict(body, events=[])).status_code == 400
+    assert client.post('/rectification', json=dict(body, events=["1980-01-01"])).status_code == 400
+    assert client.post('/rectification', json=dict(body, window={"start": "18:00", "end": "06:00"})).status_code == 400
+
+
+if __name__ == "__main__":
+    test_angles_match_swisseph()
+    test_coarse_to_fine_finds_the_exhaustive_best()
+    test_pool_matches_inline()
+    test_explain_reports_hits()
+    test_clock_minutes()
+    test_rectification_endpoint()
+    print("Test result: PASSED")
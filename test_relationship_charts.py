@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Test composite and Davison charts and their endpoints
+"""
+import sys
+import os
+
+import numpy as np
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import app
+from chart_cache import ChartCache
+from ephemeris_backends import get_backend
+from natal_chart import PLANETS, birth_julian_day, parse_birth_data
+from relationship_charts import cached_relationship_chart, davison_chart, midpoints
+
+PERSON = {"date": "1990-05-15", "time": "14:30", "latitude": 41.0082, "longitude": 28.9784}
+PARTNER = {"date": "1988-11-02", "time": "08:15", "latitude": 39.9334, "longitude": 32.8597}
+
+
+def test_midpoints_wrap_around():
+    assert np.allclose(midpoints([350.0, 10.0, 0.0, 100.0], [10.0, 350.0, 90.0, 300.0]),
+                       [0.0, 0.0, 45.0, 20.0])
+    # Shorter arc across 0 Aries and symmetric in the arguments
+    rng = np.random.default_rng(0)
+    a, b = rng.uniform(0, 360, 1000), rng.uniform(0, 360, 1000)
+    assert np.allclose(np.cos(np.radians(midpoints(a, b))), np.cos(np.radians(midpoints(b, a))))
+    half_arc = np.abs((midpoints(a, b) - a + 180.0) % 360.0 - 180.0)
+    assert np.all(half_arc <= 90.0 + 1e-9)
+
+
+def test_davison_is_cast_for_the_midpoint():
+    person, partner = parse_birth_data(PERSON), parse_birth_data(PARTNER)
+    chart = davison_chart(person, partner, 'swisseph')
+    jd = (birth_julian_day(person) + birth_julian_day(partner)) / 2.0
+    planets = get_backend('swisseph').planets(jd, PLANETS)
+    assert all(abs(chart["planets"][p]["degree"] - round(planets[p]["lon"], 2)) < 1e-9 for p in PLANETS)
+    assert chart["location"] == {"latitude": 40.4708, "longitude": 30.919}
+
+    # Across the antimeridian the location midpoint stays on the short side
+    east = dict(person, longitude=179.0)
+    west = dict(partner, longitude=-177.0)
+    assert davison_chart(east, west, 'swisseph')["location"]["longitude"] == -179.0
+
+
+def test_relationship_cache_is_order_independent():
+    cache, natal_cache = ChartCache(), ChartCache()
+    person, partner = parse_birth_data(PERSON), parse_birth_data(PARTNER)
+    for kind in ('composite', 'davison'):
+        chart, cached = cached_relationship_chart(kind, person, partner, cache, natal_cache, 'swisseph')
+        assert not cached
+        again, cached = cached_relationship_chart(kind, partner, person, cache, natal_cache, 'swisseph')
+        assert cached and again is chart
+    assert len(cache) == 2
+
+
+def test_relationship_endpoints():
+    with app.test_client() as client:
+        person = client.post('/natal', json=PERSON).get_json()
+        partner = client.post('/natal', json=PARTNER).get_json()
+        composite = client.post('/composite', json={"person": PERSON, "partner": PARTNER}).get_json()
+        assert composite["kind"] == "composite"
+        for p in PLANETS:
+            expected = midpoints(person["planets"][p]["degree"], partner["planets"][p]["degree"])
+            assert abs(composite["planets"][p]["degree"] - round(float(expected), 2)) < 1e-9
+        assert composite["ascendant_degree"] == round(float(midpoints(person["ascendant_degree"],
+                                                                      partner["ascendant_degree"])), 2)
+
+        davison = client.post('/davison', json={"person": PARTNER, "partner": PERSON}).get_json()
+        assert davison["kind"] == "davison" and davison["moment"].startswith("1989-08-08T20:52")
+        again = client.post('/davison', json={"person": PERSON, "partner": PARTNER}).get_json()
+        assert again["served_from_cache"] and again["planets"] == davison["planets"]
+
+        assert client.post('/composite', json={"person": PERSON}).status_code == 400
+        assert client.post('/davison', json={"person": PERSON, "partner": {"date": "x"}}).status_code == 400
+
+
+if __name__ == "__main__":
+    test_midpoints_wrap_around()
+    test_davison_is_cast_for_the_midpoint()
+    test_relationship_cache_is_order_independent()
+    test_relationship_endpoints()
+    print("Test result: PASSED")
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Test the solar and lunar return finder and the /returns endpoint
+"""
+import sys
+import os
+import time
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import app
+from chebyshev_ephemeris import get_ephemeris
+from ephemeris_backends import get_backend, julian_day
+from returns import lunar_returns, return_charts, solar_return
+
+BIRTH = {"date": "1990-05-15", "time": "14:30", "latitude": 41.0082, "longitude": 28.9784}
+NATAL_JD = julian_day("1990-05-15", "14:30", "+03:00")
+
+
+def separation(body, jd):
+    swe = get_backend('swisseph')
+    lon = swe.planets(jd, [body])[body]['lon']
+    natal = swe.planets(NATAL_JD, [body])[body]['lon']
+    return abs((lon - natal + 180.0) % 360.0 - 180.0)
+
+
+def test_solar_return_is_exact():
+    for year in (1991, 2000, 2025, 2060):
+        jd = solar_return(NATAL_JD, year)
+        assert separation('Sun', jd) < 1e-4
+        # Within a day of the birthday
+        assert abs(jd - (NATAL_JD + (year - 1990) * 365.2422)) < 1.5
+
+
+def test_a_year_of_lunar_returns():
+    start, end = julian_day("2025-01-01", "00:00", "+00:00"), julian_day("2026-01-01", "00:00", "+00:00")
+    jds = lunar_returns(NATAL_JD, start, end)
+    assert len(jds) in (13, 14) and all(start <= jd < end for jd in jds)
+    assert all(separation('Moon', jd) < 1e-3 for jd in jds)
+    gaps = [b - a for a, b in zip(jds, jds[1:])]
+    assert all(26.5 < gap < 28.5 for gap in gaps)
+
+    began = time.perf_counter()
+    charts = return_charts('lunar', NATAL_JD, 2025, 41.0082, 28.9784, 'swisseph')
+    elapsed = time.perf_counter() - began
+    assert len(charts) == len(jds)
+    # Single-digit milliseconds per return, with a margin for slow CI machines
+    assert elapsed / len(charts) < 0.05
+
+
+def test_returns_endpoint():
+    with app.test_client() as client:
+        natal = client.post('/natal', json=BIRTH).get_json()
+        data = client.post('/returns', json=dict(BIRTH, year=2025)).get_json()
+        assert data["count"] == 1 and data["returns"][0]["moment"].startswith("2025-05-14T22:47")
+        assert data["returns"][0]["planets"]["Sun"] == natal["planets"]["Sun"]
+        assert data["ephemeris_backend"] == app.config['EPHEMERIS_BACKEND']
+        assert data["return_search_backend"] == ('chebyshev' if get_ephemeris() else 'swisseph')
+
+        lunar = client.post('/returns', json=dict(BIRTH, kind="lunar", year=2025,
+                                                  return_location="Ankara")).get_json()
+        assert lunar["count"] in (13, 14) and lunar["location"]["place"] == "Ankara"
+        assert all(r["planets"]["Moon"]["sign"] == natal["planets"]["Moon"]["sign"] for r in lunar["returns"])
+
+        assert client.post('/returns', json=dict(BIRTH, kind="mars")).status_code == 400
+        assert client.post('/returns', json=dict(BIRTH, year=2500)).status_code == 400
+        assert client.post('/returns', json=dict(BIRTH, return_location="Qwxyzville")).status_code == 400
+
+
+if __name__ == "__main__":
+    test_solar_return_is_exact()
+    test_a_year_of_lunar_returns()
+    test_returns_endpoint()
+    print("Test result: PASSED")
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Test the shared current-sky snapshot and the endpoints using it
+"""
+import sys
+import os
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import app
+from ephemeris_backends import get_backend
+from sky_snapshot import SkyService
+
+
+class FakeClock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_one_computation_per_window():
+    clock = FakeClock(1700000000.0)
+    service = SkyService('swisseph', resolution=60, clock=clock)
+    try:
+        first = service.current()
+        for _ in range(1000):
+            assert service.current() is first
+        assert service.computations == 1
+
+        clock.now += 61
+        second = service.current()
+        assert second is not first and service.computations == 2
+        assert second.timestamp - first.timestamp == 60
+        assert service.stats()["requests"] == 1002
+    finally:
+        service.stop()
+
+
+def test_snapshot_matches_the_backend():
+    service = SkyService('swisseph', resolution=60, clock=FakeClock(1700000030.0))
+    try:
+        snapshot = service.current()
+        assert snapshot.moment.second == 0
+        expected = get_backend('swisseph').planets(snapshot.jd, ['Moon'])['Moon']['lon']
+        assert snapshot.planets['Moon']['degree'] == round(expected, 2)
+    finally:
+        service.stop()
+
+
+def test_sky_and_horary_endpoints():
+    with app.test_client() as client:
+        sky = client.get('/sky/now').get_json()
+        assert set(sky["planets"]) >= {"Sun", "Moon", "Saturn"}
+
+        chart = client.post('/horary', json={"latitude": 41.0082, "longitude": 28.9784,
+                                             "question": "?"}).get_json()
+        assert "ascendant" in chart and chart["question"] == "?"
+        assert client.post('/horary', json={"location": "Ankara"}).status_code == 200
+        assert client.post('/horary', json={}).status_code == 400
+
+
+if __name__ == "__main__":
+    test_one_computation_per_window()
+    test_snapshot_matches_the_backend()
+    test_sky_and_horary_endpoints()
+    print("Test result: PASSED")
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Test the synastry scores and the /synastry endpoint
+"""
+import sys
+import os
+
+import numpy as np
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import app
+from aspects import AspectSet
+from synastry import (ASPECT_HARMONY, PAIR_WEIGHTS, POINTS, SYNASTRY_ORB_FACTOR, cross_aspects,
+                      synastry_scores)
+
+PERSON = {"date": "1990-05-15", "time": "14:30", "latitude": 41.0082, "longitude": 28.9784}
+PARTNER = {"date": "1988-11-02", "time": "08:15", "latitude": 39.9334, "longitude": 32.8597}
+
+
+def test_scores_match_a_pairwise_loop():
+    rng = np.random.default_rng(1)
+    person = rng.uniform(0, 360, len(POINTS))
+    others = rng.uniform(0, 360, (25, len(POINTS)))
+    aspects = AspectSet(orb_factor=SYNASTRY_ORB_FACTOR)
+    index, orb, score, harmony, tension = synastry_scores(person, others, aspects)
+    assert index.shape == (25, len(POINTS), len(POINTS)) and score.shape == (25,)
+
+    for c in range(len(others)):
+        single = synastry_scores(person, others[c], aspects)
+        assert np.isclose(single[2][0], score[c])
+        expected_harmony = expected_tension = 0.0
+        for aspect in cross_aspects(index[c], orb[c], aspects):
+            i, j = POINTS.index(aspect["partner"]), POINTS.index(aspect["person"])
+            k = aspects.names.index(aspect["aspect"])
+            value = ASPECT_HARMONY[aspect["aspect"]] * (1 - abs(orb[c, i, j]) / aspects.orbs[k]) * PAIR_WEIGHTS[i, j]
+            if value > 0:
+                expected_harmony += value
+            else:
+                expected_tension -= value
+        assert np.isclose(harmony[c], expected_harmony) and np.isclose(tension[c], expected_tension)
+        assert 0 <= score[c] <= 100
+
+
+def test_identical_charts_are_harmonious():
+    person = np.array([10.0, 100.0, 200.0, 250.0, 300.0, 40.0, 160.0, 70.0])
+    _, _, score, _, _ = synastry_scores(person, person)
+    assert score[0] > 50
+    # Every point squared by the other chart
+    _, _, score, _, tension = synastry_scores(person, (person + 90.0) % 360.0)
+    assert tension[0] > 0 and score[0] < 50
+
+
+def test_orb_overrides_score_by_their_own_orb():
+    rng = np.random.default_rng(2)
+    person = rng.uniform(0, 360, len(POINTS))
+    others = rng.uniform(0, 360, (25, len(POINTS)))
+    aspects = AspectSet(orbs={"trine": 2.0, "square": 10.0}, orb_factor=SYNASTRY_ORB_FACTOR)
+    index, orb, score, harmony, tension = synastry_scores(person, others, aspects)
+    assert np.all(np.isfinite(score)) and np.all((score >= 0) & (score <= 100))
+    assert np.all(np.abs(orb[index == aspects.names.index("trine")]) <= 2.0)
+    for c in range(len(others)):
+        expected = 0.0
+        for aspect in cross_aspects(index[c], orb[c], aspects):
+            i, j = POINTS.index(aspect["partner"]), POINTS.index(aspect["person"])
+            exactness = 1 - abs(orb[c, i, j]) / aspects.orbs[aspects.names.index(aspect["aspect"])]
+            assert 0.0 <= exactness <= 1.0
+            expected += ASPECT_HARMONY[aspect["aspect"]] * exactness * PAIR_WEIGHTS[i, j]
+        assert np.isclose(harmony[c] - tension[c], expected)
+
+    with app.test_client() as client:
+        pair = client.post('/synastry', json={"person": PERSON, "partner": PARTNER,
+                                              "orbs": {"trine": 2}}).get_json()
+        assert pair["orbs"]["trine"] == 2 and 0 <= pair["score"] <= 100
+        for orb_value in [0, -3, "nan", "inf"]:
+            assert client.post('/synastry', json={"person": PERSON, "partner": PARTNER,
+                                                  "orbs": {"trine": orb_value}}).status_code == 400
+
+
+def test_synastry_endpoint():
+    with app.test_client() as client:
+        pair = client.post('/synastry', json={"person": PERSON, "partner": PARTNER}).get_json()
+        assert 0 <= pair["score"] <= 100 and pair["count"] == len(pair["aspects"]) > 0
+        assert pair["person"]["planets"]["Sun"]["sign"] == "Taurus"
+
+        candidates = [dict(PARTNER, id="a"), dict(PERSON, id="self"), {"date": "bad"},
+                      dict(PARTNER, time="20:00", id="b")]
+        ranked = client.post('/synastry', json={"person": PERSON, "candidates": candidates}).get_json()
+        assert ranked["count"] == 3 and [e["index"] for e in ranked["errors"]] == [2]
+        scores = [r["score"] for r in ranked["ranking"]]
+        assert scores == sorted(scores, reverse=True)
+        assert {r["id"] for r in ranked["ranking"]} == {"a", "self", "b"}
+        assert next(r for r in ranked["ranking"] if r["id"] == "a")["score"] == pair["score"]
+        assert all(len(r["top_aspects"]) <= 3 for r in ranked["ranking"])
+
+        assert client.post('/synastry', json={"person": PERSON}).status_code == 400
+        assert client.post('/synastry', json={"person": PERSON, "candidates": []}).status_code == 400
+        assert client.post('/synastry', json={"person": PERSON, "partner": PARTNER,
+                                              "aspects": ["biquintile"]}).status_code == 400
+
+
+if __name__ == "__main__":
+    test_scores_match_a_pairwise_loop()
+    test_identical_charts_are_harmonious()
+    test_orb_overrides_score_by_their_own_orb()
+    test_synastry_endpoint()
+    print("Test result: PASSED")
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Test the relocation heatmap tiles and their disk cache
+"""
+import sys
+import os
+import struct
+import tempfile
+import time
+import zlib
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+
+import tiles
+from app import app
+from astrocartography import LINE_BODIES, body_coordinates
+from ephemeris_backends import julian_day
+from tiles import TILE_SIZE, TileCache, chart_id, encode_png, favorability, tile_bounds
+
+JD = julian_day("1990-05-15", "14:30", "+03:00")
+BIRTH = {"date": "1990-05-15", "time": "14:30", "latitude": 41.0082, "longitude": 28.9784,
+         "utc_offset": "+03:00"}
+
+
+def decode_png(data):
+    """(height, width, 4) pixels of an unfiltered RGBA PNG as written by encode_png"""
+    assert data[:8] == b'\x89PNG\r\n\x1a\n'
+    width, height = struct.unpack('>II', data[16:24])
+    idat_length = struct.unpack('>I', data[33:37])[0]
+    raw = np.frombuffer(zlib.decompress(data[41:41 + idat_length]), dtype=np.uint8)
+    return raw.reshape(height, width * 4 + 1)[:, 1:].reshape(height, width, 4)
+
+
+def test_png_round_trip():
+    rgba = np.random.default_rng(1).integers(0, 256, (16, 8, 4), dtype=np.uint8)
+    assert np.array_equal(decode_png(encode_png(rgba)), rgba)
+
+
+def test_tile_bounds():
+    latitudes, longitudes = tile_bounds(0, 0, 0)
+    assert len(latitudes) == len(longitudes) == TILE_SIZE
+    assert latitudes[0] > 84.9 and latitudes[-1] < -84.9
+    assert abs(longitudes[0] + 180.0) < 1.0 and abs(longitudes[-1] - 180.0) < 1.0
+    latitudes, longitudes = tile_bounds(1, 1, 0)
+    assert latitudes.min() > 0.0 and longitudes.min() > 0.0
+
+
+def test_heatmap_peaks_on_the_lines():
+    ra, dec, sidereal = body_coordinates(JD)
+    venus = LINE_BODIES.index('Venus')
+    meridian = (ra[venus] - sidereal + 180.0) % 360.0 - 180.0
+    # On the Venus MC line at the equator versus 90 degrees of longitude away
+    latitudes = np.array([0.0])
+    value = favorability(ra[venus:venus + 1], dec[venus:venus + 1], sidereal, latitudes,
+                         np.array([meridian, meridian + 45.0]), ['Venus'])
+    assert abs(value[0, 0] - 1.0) < 1e-9 and value[0, 1] < 0.01
+
+
+def test_tiles_are_cached_and_pruned():
+    directory = tempfile.mkdtemp()
+    cache = TileCache(directory, max_bytes=200000)
+    chart = cache.register(JD)
+    assert chart == chart_id(JD) and cache.coordinates(chart)["bodies"] == LINE_BODIES
+
+    started = time.perf_counter()
+    data, cached = cache.tile(chart, 2, 1, 1)
+    render_time = time.perf_counter() - started
+    assert not cached and decode_png(data).shape == (TILE_SIZE, TILE_SIZE, 4)
+    assert render_time < 0.5
+
+    assert cache.tile(chart, 2, 1, 1) == (data, True)
+    assert cache.tile("0" * 24, 0, 0, 0) is None
+
+    for x in range(4):
+        for y in range(4):
+            cache.tile(chart, 2, x, y)
+    on_disk = sum(os.path.getsize(os.path.join(directory, chart, name))
+                  for name in os.listdir(os.path.join(directory, chart)) if name.endswith('.png'))
+    assert on_disk <= 200000
+    # The registration survives pruning
+    assert os.path.exists(os.path.join(directory, chart, 'chart.json'))
+
+
+def test_unused_charts_are_pruned_across_workers():
+    directory = tempfile.mkdtemp()
+    first, second = TileCache(directory, max_bytes=300000), TileCache(directory, max_bytes=300000)
+    old = first.register(JD)
+    first.tile(old, 1, 0, 0)
+    os.utime(os.path.join(directory, old, '1_0_0.png'), (0, 0))
+    os.utime(os.path.join(directory, old, 'chart.json'), (0, 0))
+    assert old in first._charts
+
+    # The second worker's writes alone push the directory over the budget
+    for i in range(40):
+        second.register(JD + i + 1)
+    recent = second.register(JD + 100)
+    for x in range(4):
+        for y in range(4):
+            second.tile(recent, 2, x, y)
+    first.tile(recent, 0, 0, 0)
+
+    sizes = [os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(directory) for name in names]
+    assert sum(sizes) <= 300000
+    assert not os.path.exists(os.path.join(directory, old))
+    # Pruned by the other worker: this one drops its copy when it tries to render
+    assert first.tile(old, 1, 0, 0) is None and old not in first._charts
+    assert os.path.exists(os.path.join(directory, recent, 'chart.json'))
+
+
+def test_tile_endpoints():
+    tiles._cache = TileCache(tempfile.mkdtemp())
+    client = app.test_client()
+    registered = client.post('/tiles', json=BIRTH).get_json()
+    url = registered["tiles"].format(z=3, x=4, y=2)
+    assert url == f"/tiles/{registered['chart']}/3/4/2"
+
+    first = client.get(url)
+    assert first.status_code == 200 and first.mimetype == 'image/png'
+    assert first.headers["X-Tile-Cache"] == "miss"
+    assert "max-age=31536000" in first.headers["Cache-Control"]
+    second = client.get(url)
+    assert second.headers["X-Tile-Cache"] == "hit" and second.data == first.data
+    assert client.get(url, headers={"If-None-Match": first.headers["ETag"]}).status_code == 304
+
+    assert client.get(f"/tiles/{registered['chart']}/3/8/0").status_code == 404
+    assert client.get("/tiles/..%2F..%2Fetc/0/0/0").status_code == 404
+    assert client.get(f"/tiles/{'f' * 24}/0/0/0").status_code == 404
+
+    lines = client.post('/astrocartography', json=BIRTH).get_json()
+    assert "tiles" not in lines
+    lines = client.post('/astrocartography', json=dict(BIRTH, tiles=True)).get_json()
+    assert lines["tiles"] == registered["tiles"]
+
+
+if __name__ == "__main__":
+    test_png_round_trip()
+    test_tile_bounds()
+    test_heatmap_peaks_on_the_lines()
+    test_tiles_are_cached_and_pruned()
+    test_unused_charts_are_pruned_across_workers()
+    test_tile_endpoints()
+    print("Test result: PASSED")
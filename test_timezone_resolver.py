@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Test historical UTC offset resolution for birth data
+"""
+import sys
+import os
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from natal_chart import BirthDataError, parse_birth_data
+from timezone_resolver import normalize_offset, resolve_offset
+
+ISTANBUL = (41.0082, 28.9784)
+
+
+def test_turkish_offsets_follow_historical_rules():
+    assert resolve_offset(*ISTANBUL, 1990, 1, 15, 14, 30) == ('Europe/Istanbul', '+02:00')
+    assert resolve_offset(*ISTANBUL, 1990, 7, 15, 14, 30) == ('Europe/Istanbul', '+03:00')
+    assert resolve_offset(*ISTANBUL, 2020, 1, 15, 14, 30) == ('Europe/Istanbul', '+03:00')
+
+
+def test_transition_day_uses_the_local_time():
+    # US DST started 2021-03-14 at 02:00 local time
+    assert resolve_offset(40.7128, -74.0060, 2021, 3, 14, 1, 30)[1] == '-05:00'
+    assert resolve_offset(40.7128, -74.0060, 2021, 3, 14, 12, 0)[1] == '-04:00'
+
+
+def test_explicit_offset_and_zone_override_lookup():
+    birth = {"date": "1990-01-15", "time": "14:30", "latitude": 40.7, "longitude": -74.0}
+    assert parse_birth_data(dict(birth, utc_offset='+5:30'))["utc_offset"] == '+05:30'
+    assert parse_birth_data(dict(birth, timezone='Asia/Tokyo'))["utc_offset"] == '+09:00'
+    assert normalize_offset('-3') == '-03:00'
+
+    for bad in [dict(birth, timezone='Mars/Olympus'), dict(birth, utc_offset='+25:00')]:
+        try:
+            parse_birth_data(bad)
+        except BirthDataError:
+            continue
+        raise AssertionError(f"expected BirthDataError for {bad}")
+
+
+if __name__ == "__main__":
+    test_turkish_offsets_follow_historical_rules()
+    test_transition_day_uses_the_local_time()
+    test_explicit_offset_and_zone_override_lookup()
+    print("Test result: PASSED")
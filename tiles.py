@@ -0,0 +1,289 @@
+"""
+Relocation heatmap tiles for slippy maps.
+
+A chart is registered once with the equatorial positions of its bodies
+(astrocartography.body_coordinates) and gets an id derived from its
+instant; tiles are rendered lazily from those positions. A pixel's value
+is the sum over bodies of a favorability weight times how close the body
+is to an angle there: Gaussian in the body's altitude for the ASC/DSC
+lines and in its hour angle from the meridian for the MC/IC lines. A tile
+is a handful of (256 x 256) array expressions per body, with row and
+column factors computed once, encoded as an RGBA PNG (green favorable,
+red challenging, transparent neutral).
+
+Rendered tiles are files under TILE_CACHE_DIR shared by all workers.
+Hits refresh the file's modification time, and when the directory grows
+past its byte budget the least recently used tiles are deleted down to
+PRUNE_TO of the budget. A chart counts as used when any of its files was,
+and goes with its directory once its tiles are gone. Each worker only
+sees its own writes, so it re-scans the directory after writing
+RESCAN_FRACTION of the budget to take the others' into account.
+"""
+import hashlib
+import json
+import math
+import os
+import shutil
+import struct
+import threading
+import zlib
+
+import numpy as np
+
+from astrocartography import LINE_BODIES, body_coordinates
+from natal_chart import DEFAULT_EPHEMERIS_BACKEND
+
+DATA_DIR = os.environ.get('ASTRO_DATA_DIR',
+                          os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data'))
+DEFAULT_DIR = os.environ.get('TILE_CACHE_DIR', os.path.join(DATA_DIR, 'tiles'))
+DEFAULT_MAX_BYTES = int(os.environ.get('TILE_CACHE_MAX_MB', 256)) * 1024 * 1024
+
+TILE_SIZE = 256
+# Part of the chart id: bump when the rendering changes so cached tiles are not reused
+STYLE_VERSION = 1
+
+# Traditional benefics attract, malefics repel; outer planets mildly challenging
+FAVORABILITY = {
+    'Sun': 0.5, 'Moon': 0.25, 'Mercury': 0.25, 'Venus': 1.0, 'Mars': -0.75,
+    'Jupiter': 1.0, 'Saturn': -1.0, 'Uranus': -0.25, 'Neptune': -0.25, 'Pluto': -0.5,
+}
+# Width of a line's influence in degrees (about 330 km at the equator)
+INFLUENCE_DEGREES = 3.0
+
+# Fraction of the byte budget left after pruning
+PRUNE_TO = 0.8
+# Bytes written by this worker, as a fraction of the budget, between directory scans
+RESCAN_FRACTION = 1 / 16
+
+_FAVORABLE = np.array([39, 174, 96], dtype=np.uint8)
+_CHALLENGING = np.array([192, 57, 43], dtype=np.uint8)
+_MAX_ALPHA = 200
+
+
+def chart_id(jd, backend=None):
+    """Tile chart id for a UT julian day; the lines only depend on the instant"""
+    key = f"{STYLE_VERSION}|{backend or DEFAULT_EPHEMERIS_BACKEND}|{jd:.6f}"
+    return hashlib.blake2b(key.encode('utf-8'), digest_size=12).hexdigest()
+
+
+def tile_bounds(z, x, y):
+    """Pixel centre latitudes (rows) and longitudes (columns) of a Web Mercator tile"""
+    scale = TILE_SIZE * 2 ** z
+    offsets = np.arange(TILE_SIZE) + 0.5
+    longitudes = (x * TILE_SIZE + offsets) / scale * 360.0 - 180.0
+    latitudes = np.degrees(np.arctan(np.sinh(np.pi * (1.0 - 2.0 * (y * TILE_SIZE + offsets) / scale))))
+    return latitudes, longitudes
+
+
+def favorability(ra, dec, sidereal, latitudes, longitudes, bodies=None):
+    """(rows, columns) weighted closeness to the angle lines of every body"""
+    bodies = bodies or LINE_BODIES
+    phi = np.radians(latitudes)[:, None]
+    sin_phi, cos_phi = np.sin(phi), np.cos(phi)
+    width = math.radians(INFLUENCE_DEGREES)
+    value = np.zeros((len(latitudes), len(longitudes)))
+    for body, alpha, delta in zip(bodies, np.radians(ra), np.radians(dec)):
+        hour_angle = np.radians(sidereal + longitudes)[None, :] - alpha
+        # Near the horizon the altitude in radians is its sine
+        sin_altitude = sin_phi * math.sin(delta) + cos_phi * math.cos(delta) * np.cos(hour_angle)
+        horizon = np.exp(-(sin_altitude / width) ** 2)
+        # Distance from the meridian (MC or IC) along the parallel
+        meridian = (hour_angle + np.pi / 2.0) % np.pi - np.pi / 2.0
+        meridian = np.exp(-(meridian * cos_phi / width) ** 2)
+        value += FAVORABILITY[body] * np.maximum(horizon, meridian)
+    return value
+
+
+def encode_png(rgba):
+    """PNG bytes of an (height, width, 4) uint8 array"""
+    height, width = rgba.shape[:2]
+    # Filter type 0 (none) in front of every row
+    raw = np.concatenate([np.zeros((height, 1), dtype=np.uint8), rgba.reshape(height, width * 4)], axis=1)
+
+    def chunk(kind, data):
+        return (struct.pack('>I', len(data)) + kind + data
+                + struct.pack('>I', zlib.crc32(kind + data) & 0xffffffff))
+
+    header = struct.pack('>IIBBBBB', width, height, 8, 6, 0, 0, 0)
+    return (b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header)
+            + chunk(b'IDAT', zlib.compress(raw.tobytes(), 6)) + chunk(b'IEND', b''))
+
+
+def render_tile(coordinates, z, x, y):
+    """PNG of one tile for a chart's {"ra", "dec", "sidereal", "bodies"}"""
+    latitudes, longitudes = tile_bounds(z, x, y)
+    value = favorability(np.array(coordinates["ra"]), np.array(coordinates["dec"]), coordinates["sidereal"],
+                         latitudes, longitudes, coordinates["bodies"])
+    value = np.clip(value, -1.0, 1.0)
+    rgba = np.zeros((TILE_SIZE, TILE_SIZE, 4), dtype=np.uint8)
+    rgba[..., :3] = np.where((value >= 0)[..., None], _FAVORABLE, _CHALLENGING)
+    rgba[..., 3] = np.round(np.abs(value) * _MAX_ALPHA).astype(np.uint8)
+    return encode_png(rgba)
+
+
+class TileCache:
+    """Registered charts and their rendered tiles in a size-bounded directory"""
+
+    def __init__(self, directory=DEFAULT_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._charts = {}
+        self._lock = threading.RLock()
+        self._bytes = None
+        self._unscanned = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _chart_dir(self, chart):
+        return os.path.join(self.directory, chart)
+
+    def register(self, jd, backend=None):
+        """Store a chart's body positions once, returns its id"""
+        chart = chart_id(jd, backend)
+        path = os.path.join(self._chart_dir(chart), 'chart.json')
+        try:
+            # Already registered: mark it used so pruning keeps it
+            os.utime(path)
+            return chart
+        except FileNotFoundError:
+            pass
+        ra, dec, sidereal = body_coordinates(jd, LINE_BODIES, backend)
+        coordinates = {"ra": ra.tolist(), "dec": dec.tolist(), "sidereal": sidereal, "bodies": LINE_BODIES}
+        os.makedirs(self._chart_dir(chart), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(coordinates, f)
+        os.replace(tmp_path, path)
+        self._added(os.path.getsize(path))
+        return chart
+
+    def coordinates(self, chart):
+        """Registered positions of a chart, None if unknown"""
+        with self._lock:
+            coordinates = self._charts.get(chart)
+        if coordinates is None:
+            try:
+                with open(os.path.join(self._chart_dir(chart), 'chart.json')) as f:
+                    coordinates = json.load(f)
+            except (FileNotFoundError, ValueError):
+                return None
+            with self._lock:
+                if len(self._charts) >= 1024:
+                    self._charts.clear()
+                self._charts[chart] = coordinates
+        return coordinates
+
+    def tile(self, chart, z, x, y):
+        """(PNG bytes, served from cache) of a tile, None for an unregistered chart"""
+        path = os.path.join(self._chart_dir(chart), f"{z}_{x}_{y}.png")
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path)
+            self.hits += 1
+            return data, True
+        except FileNotFoundError:
+            pass
+        coordinates = self.coordinates(chart)
+        if coordinates is None:
+            return None
+        data = render_tile(coordinates, z, x, y)
+        self.misses += 1
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except FileNotFoundError:
+            # Pruned by another worker since this one loaded it
+            self._forget(chart)
+            return None
+        self._added(len(data))
+        return data, False
+
+    def _forget(self, chart):
+        with self._lock:
+            self._charts.pop(chart, None)
+
+    def _added(self, size):
+        with self._lock:
+            self._unscanned += size
+            if self._bytes is None or self._unscanned >= self.max_bytes * RESCAN_FRACTION:
+                self._bytes = sum(size for files in self._scan().values() for _, size, _ in files)
+                self._unscanned = 0
+            else:
+                self._bytes += size
+            if self._bytes > self.max_bytes:
+                self.prune()
+
+    def _scan(self):
+        """{chart: [(path, size, mtime)]} of the tiles and registration of every chart"""
+        try:
+            directories = [entry for entry in os.scandir(self.directory) if entry.is_dir()]
+        except FileNotFoundError:
+            return {}
+        charts = {}
+        for directory in directories:
+            files = charts[directory.name] = []
+            for entry in os.scandir(directory.path):
+                if entry.name.endswith('.png') or entry.name == 'chart.json':
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    files.append((entry.path, stat.st_size, stat.st_mtime))
+        return charts
+
+    def prune(self):
+        """Delete least recently used tiles and charts down to PRUNE_TO of the budget
+
+        Other workers' files count too. A chart's registration is as recent
+        as its last used tile, so it is only reached once they are all gone,
+        and then its directory is removed with it.
+        """
+        with self._lock:
+            files = []
+            for chart, entries in self._scan().items():
+                used = max((mtime for _, _, mtime in entries), default=0.0)
+                for path, size, mtime in entries:
+                    registration = os.path.basename(path) == 'chart.json'
+                    files.append((used if registration else mtime, registration, chart, path, size))
+                if not any(os.path.basename(path) == 'chart.json' for path, _, _ in entries):
+                    # Left over from a chart pruned while a tile was written
+                    files.append((used, True, chart, None, 0))
+            files.sort(key=lambda f: f[:2])
+            total = sum(f[4] for f in files)
+            for _, registration, chart, path, size in files:
+                if total <= self.max_bytes * PRUNE_TO:
+                    break
+                if registration:
+                    shutil.rmtree(self._chart_dir(chart), ignore_errors=True)
+                    self._charts.pop(chart, None)
+                else:
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass
+                total -= size
+            self._bytes = total
+            self._unscanned = 0
+
+    def stats(self):
+        return {"directory": self.directory, "max_bytes": self.max_bytes, "bytes": self._bytes,
+                "hits": self.hits, "misses": self.misses}
+
+
+# === Per-process instance === #
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_tile_cache():
+    """The tile cache of this worker, sharing its directory with the others"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = TileCache()
+    return _cache
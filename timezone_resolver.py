@@ -0,0 +1,103 @@
+"""
+Offline UTC offset resolution for birth data.
+
+The zone comes from timezonefinder's precompiled polygon index and the
+offset from the IANA tz rules (zoneinfo) for that zone at the local birth
+date and time, so a 1985 Istanbul birth gets +02:00/+03:00 DST instead of
+today's fixed +03:00. Both are loaded once per process; offsets are
+memoized per (zone, date) since they only change on transition days.
+"""
+import datetime
+import re
+import threading
+from functools import lru_cache
+
+_OFFSET_RE = re.compile(r'^([+-])(\d{1,2}):(\d{2})(?::(\d{2}))?$')
+
+_finder = None
+_finder_lock = threading.Lock()
+
+
+class TimezoneError(ValueError):
+    """Raised for unknown zone names or malformed UTC offsets"""
+
+
+def _get_finder():
+    global _finder
+    if _finder is None:
+        with _finder_lock:
+            if _finder is None:
+                from timezonefinder import TimezoneFinder
+                _finder = TimezoneFinder(in_memory=True)
+    return _finder
+
+
+def zone_at(latitude, longitude):
+    """IANA zone name for a coordinate, None if the index has no answer"""
+    return _get_finder().timezone_at(lng=float(longitude), lat=float(latitude))
+
+
+@lru_cache(maxsize=64)
+def _zone(name):
+    from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise TimezoneError(f"Unknown timezone '{name}'")
+
+
+@lru_cache(maxsize=65536)
+def _day_offsets(zone_name, year, month, day):
+    """Offsets at the start and end of a local day, equal unless it has a transition"""
+    tz = _zone(zone_name)
+    start = datetime.datetime(year, month, day, 0, 0, tzinfo=tz).utcoffset()
+    end = datetime.datetime(year, month, day, 23, 59, 59, tzinfo=tz).utcoffset()
+    return start, end
+
+
+def utc_offset(zone_name, year, month, day, hour, minute, second=0):
+    """UTC offset (timedelta) of a local wall-clock time in a zone
+
+    Times skipped or repeated by a DST change resolve to the offset in force
+    before the change (fold=0).
+    """
+    start, end = _day_offsets(zone_name, year, month, day)
+    if start == end:
+        return start
+    local = datetime.datetime(year, month, day, hour, minute, second, tzinfo=_zone(zone_name))
+    return local.utcoffset()
+
+
+def format_offset(offset):
+    """timedelta to the '+HH:MM[:SS]' form flatlib and julian_day() read"""
+    seconds = int(offset.total_seconds())
+    sign = '-' if seconds < 0 else '+'
+    hours, rest = divmod(abs(seconds), 3600)
+    minutes, seconds = divmod(rest, 60)
+    text = f"{sign}{hours:02d}:{minutes:02d}"
+    return text + f":{seconds:02d}" if seconds else text
+
+
+def normalize_offset(value):
+    """Validate a client supplied UTC offset such as '+3', '+03:00' or '-05:30'"""
+    text = str(value).strip()
+    if re.match(r'^[+-]?\d{1,2}$', text):
+        text = (text if text[0] in '+-' else '+' + text) + ':00'
+    match = _OFFSET_RE.match(text)
+    if not match or int(match.group(2)) > 14 or int(match.group(3)) >= 60:
+        raise TimezoneError(f"Invalid UTC offset '{value}'")
+    sign, hours, minutes, seconds = match.groups()
+    offset = datetime.timedelta(hours=int(hours), minutes=int(minutes), seconds=int(seconds or 0))
+    return format_offset(-offset if sign == '-' else offset)
+
+
+def resolve_offset(latitude, longitude, year, month, day, hour, minute, second=0, zone_name=None):
+    """(zone name, '+HH:MM') for a local birth time at a coordinate
+
+    zone_name skips the polygon lookup when the client already knows the
+    zone. Returns (None, None) when the coordinate has no zone.
+    """
+    zone_name = zone_name or zone_at(latitude, longitude)
+    if zone_name is None:
+        return None, None
+    return zone_name, format_offset(utc_offset(zone_name, year, month, day, hour, minute, second))